@@ -1,23 +1,21 @@
-from flask import Flask
-import requests
 from sgp4.api import Satrec, jday
 from datetime import datetime
+import os
+import sys
 
-app = Flask(__name__)
+# The TLE client and the API app are shared with the service in ../project;
+# `flask --app coordinates run` serves the app from its factory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'project'))
+from tle_client import client_for
+from service import create_app
 
-# Function to fetch TLE data from the API
+# Function to fetch TLE data, served from the shared cache when fresh
 def fetch_tle_data(norad_id, api_key):
-    url = f"https://api.n2yo.com/rest/v1/satellite/tle/{norad_id}?apiKey={api_key}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        try:
-            tle_data = response.json()['tle']
-            return tle_data
-        except KeyError:
-            raise Exception("TLE data not found in the response")
-    else:
-        raise Exception(f"Failed to fetch TLE data. Status Code: {response.status_code}")
+    return client_for(api_key).fetch(norad_id)
+
+# Function to fetch TLE data from the API, with the pooled client's timeouts and retries
+def request_tle_data(norad_id, api_key):
+    return client_for(api_key).request_tle(str(norad_id).strip())
 
 # Function to calculate satellite position
 def calculate_position(tle_line1, tle_line2, timestamp):
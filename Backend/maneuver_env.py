@@ -0,0 +1,209 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Two-body mechanics are shared with the orbit code in ../project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'project'))
+from equation import elements_to_state, propagate_states
+
+# Impulse directions in the satellite's radial / along-track / cross-track frame
+ACTIONS = np.array([
+    [0, 0, 0],   # coast
+    [1, 0, 0],   # +radial
+    [-1, 0, 0],  # -radial
+    [0, 1, 0],   # +along-track
+    [0, -1, 0],  # -along-track
+    [0, 0, 1],   # +cross-track
+    [0, 0, -1],  # -cross-track
+], dtype=np.float64)
+
+POSITION_SCALE = 100.0  # km, relative positions in the observation are divided by this
+VELOCITY_SCALE = 15.0   # km/s, likewise for relative velocities
+
+
+def rtn_basis(r, v):
+    """Radial, along-track and cross-track unit vectors as rows, shaped (M, 3, 3)."""
+    radial = r / np.linalg.norm(r, axis=-1, keepdims=True)
+    normal = np.cross(r, v)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    return np.stack([radial, np.cross(normal, radial), normal], axis=1)
+
+
+def rotate(vectors, axes, angles):
+    """Rodrigues rotation of (M, 3) vectors about unit (M, 3) axes by (M,) angles."""
+    cos, sin = np.cos(angles)[:, np.newaxis], np.sin(angles)[:, np.newaxis]
+    dot = np.einsum('mi,mi->m', axes, vectors)[:, np.newaxis]
+    return vectors * cos + np.cross(axes, vectors) * sin + axes * dot * (1 - cos)
+
+
+class ManeuverEnv:
+    """
+    Collision-avoidance environment stepping `num_envs` independent
+    satellite/debris encounters at once.
+
+    Each instance puts a debris object on a crossing orbit that would pass
+    within a couple of kilometres of the satellite partway through the
+    episode. Every step the agent picks one of `ACTIONS`, applied as an
+    impulsive delta-v of `delta_v` km/s while fuel lasts, then both objects
+    are propagated `dt` seconds on Kepler orbits.
+
+    Observations are float32 rows of the debris' relative position and
+    velocity in the satellite's RTN frame plus the fuel and time left, so the
+    (num_envs, state_size) array goes straight into `DQNSatelliteAgent.act`
+    and `remember`. Finished instances are reset automatically.
+    """
+
+    state_size = 8
+    action_size = len(ACTIONS)
+
+    def __init__(self, num_envs=64, dt=30.0, max_steps=120, delta_v=0.002, fuel=0.02, collision_distance=1.0,
+                 safe_distance=10.0, collision_penalty=100.0, fuel_penalty=0.1, seed=None):
+        self.num_envs = num_envs
+        self.dt = dt
+        self.max_steps = max_steps
+        self.delta_v = delta_v
+        self.fuel_capacity = fuel
+        self.collision_distance = collision_distance
+        self.safe_distance = safe_distance
+        self.collision_penalty = collision_penalty
+        self.fuel_penalty = fuel_penalty
+        self.rng = np.random.default_rng(seed)
+
+        self.r = np.zeros((num_envs, 3))
+        self.v = np.zeros((num_envs, 3))
+        self.debris_r = np.zeros((num_envs, 3))
+        self.debris_v = np.zeros((num_envs, 3))
+        self.fuel = np.zeros(num_envs)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self):
+        """Start a fresh encounter in every instance and return the (num_envs, state_size) observations."""
+        self._reset(np.ones(self.num_envs, dtype=bool))
+        return self._observe()
+
+    def _reset(self, mask):
+        count = int(mask.sum())
+        if not count:
+            return
+        rng = self.rng
+
+        # Low Earth orbits, nearly circular, with arbitrary orientation
+        r, v = elements_to_state(
+            rng.uniform(6778.0, 7378.0, count),
+            rng.uniform(0.0, 0.01, count),
+            np.arccos(rng.uniform(-1.0, 1.0, count)),
+            rng.uniform(0.0, 2 * np.pi, count),
+            rng.uniform(0.0, 2 * np.pi, count),
+            rng.uniform(0.0, 2 * np.pi, count),
+        )
+
+        # Place the debris at the satellite's position at the time of closest
+        # approach, moving at the same speed in a rotated direction, and wind
+        # it back to the start of the episode
+        tca = rng.uniform(0.3, 0.8, count) * self.max_steps * self.dt
+        r_ca, v_ca = propagate_states(r, v, tca)
+        offset = rng.normal(size=(count, 3))
+        offset *= rng.uniform(0.0, 2 * self.collision_distance, (count, 1)) / np.linalg.norm(offset, axis=1,
+                                                                                              keepdims=True)
+        axes = r_ca / np.linalg.norm(r_ca, axis=1, keepdims=True)
+        angles = rng.uniform(np.radians(10), np.radians(170), count) * rng.choice([-1.0, 1.0], count)
+        debris_r, debris_v = propagate_states(r_ca + offset, rotate(v_ca, axes, angles), -tca)
+
+        self.r[mask], self.v[mask] = r, v
+        self.debris_r[mask], self.debris_v[mask] = debris_r, debris_v
+        self.fuel[mask] = self.fuel_capacity
+        self.steps[mask] = 0
+
+    def _observe(self):
+        basis = rtn_basis(self.r, self.v)
+        relative_r = np.einsum('mij,mj->mi', basis, self.debris_r - self.r) / POSITION_SCALE
+        relative_v = np.einsum('mij,mj->mi', basis, self.debris_v - self.v) / VELOCITY_SCALE
+        return np.concatenate([
+            relative_r,
+            relative_v,
+            (self.fuel / self.fuel_capacity)[:, np.newaxis],
+            (1 - self.steps / self.max_steps)[:, np.newaxis],
+        ], axis=1).astype(np.float32)
+
+    def step(self, actions):
+        """
+        Apply one action per instance and advance every encounter by `dt`.
+
+        Args:
+            actions: (num_envs,) integer indices into `ACTIONS`
+
+        Returns:
+            (next_states, rewards, dones, info). `next_states` are the
+            observations the actions led to, for the replay memory; for
+            finished instances they are terminal, and the observations to act
+            on next (with those instances reset) are in info['observations'].
+            info also holds the minimum separation over the step in km
+            ('missDistance') and the 'collision' flags.
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+        # Impulsive burn in the RTN frame, only while the budget allows it
+        burn = ACTIONS[actions] * self.delta_v
+        burn[self.fuel < self.delta_v - 1e-12] = 0.0
+        cost = np.linalg.norm(burn, axis=1)
+        self.v += np.einsum('mji,mj->mi', rtn_basis(self.r, self.v), burn)
+        self.fuel -= cost
+
+        # Closest approach within the step, with the relative motion taken as
+        # linear, so a fast encounter between two samples is not missed
+        relative_r = self.debris_r - self.r
+        relative_v = self.debris_v - self.v
+        speed2 = np.einsum('mi,mi->m', relative_v, relative_v)
+        s = np.clip(-np.einsum('mi,mi->m', relative_r, relative_v) / np.maximum(speed2, 1e-12), 0.0, self.dt)
+        miss_distance = np.linalg.norm(relative_r + relative_v * s[:, np.newaxis], axis=1)
+
+        self.r, self.v = propagate_states(self.r, self.v, self.dt)
+        self.debris_r, self.debris_v = propagate_states(self.debris_r, self.debris_v, self.dt)
+        self.steps += 1
+
+        collision = miss_distance < self.collision_distance
+        proximity = np.clip(1 - miss_distance / self.safe_distance, 0.0, 1.0)
+        rewards = -proximity - self.fuel_penalty * cost / self.delta_v - self.collision_penalty * collision
+        dones = collision | (self.steps >= self.max_steps)
+
+        next_states = self._observe()
+        self._reset(dones)
+        info = {
+            'observations': self._observe() if dones.any() else next_states,
+            'missDistance': miss_distance,
+            'collision': collision,
+        }
+        return next_states, rewards.astype(np.float32), dones, info
+
+
+if __name__ == '__main__':
+    from transformer import DQNSatelliteAgent
+
+    parser = argparse.ArgumentParser(description="Train the DQN agent on batched collision-avoidance encounters")
+    parser.add_argument('--envs', type=int, default=64, help="Encounters stepped together")
+    parser.add_argument('--steps', type=int, default=1000, help="Batched environment steps")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    env = ManeuverEnv(num_envs=args.envs, seed=args.seed)
+    agent = DQNSatelliteAgent(env.state_size, env.action_size, memory_size=100000, target_update_interval=100)
+
+    states = env.reset()
+    collisions = 0
+    started = time.perf_counter()
+    for _ in range(args.steps):
+        actions = agent.act(states)
+        next_states, rewards, dones, info = env.step(actions)
+        agent.remember(states, actions, rewards, next_states, dones)
+        collisions += int(info['collision'].sum())
+        states = info['observations']
+        if len(agent.memory) >= args.batch_size:
+            agent.replay(args.batch_size)
+    elapsed = time.perf_counter() - started
+
+    transitions = args.steps * args.envs
+    print(f"{transitions} transitions in {elapsed:.1f} s ({transitions / elapsed:.0f}/s), {collisions} collisions")
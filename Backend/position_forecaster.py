@@ -0,0 +1,99 @@
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+
+# Function to persist the scaler fitted on the training data, so inference
+# normalises with the training statistics instead of refitting on each sample
+def save_scaler(scaler, path):
+    np.savez(path, mean=scaler.mean_, scale=scaler.scale_)
+
+
+# Function to fit the scaler on the [x, y, z, Vx, Vy, Vz] training states and
+# save it where PositionForecaster looks for it
+def fit_scaler(states, path='position_scaler.npz'):
+    scaler = StandardScaler().fit(np.reshape(states, (-1, np.shape(states)[-1])))
+    save_scaler(scaler, path)
+    return scaler
+
+
+class PositionForecaster:
+    """
+    Autoregressive rollout of the satellite position model for many
+    satellites at once.
+
+    The model and the training scaler are loaded once. Every step is a single
+    compiled forward pass over the whole batch, and the sliding windows live in
+    one preallocated buffer that is written in place.
+    """
+
+    def __init__(self, model_path='satellite_position_model.h5', scaler_path='position_scaler.npz', n_steps=10,
+                 max_batch_size=4096):
+        # TensorFlow is imported here so importing this module stays cheap
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+        from tensorflow.keras.losses import MeanSquaredError
+
+        self.model = load_model(model_path, custom_objects={'mse': MeanSquaredError()})
+        scaler = np.load(scaler_path)
+        self.mean = scaler['mean'].astype(np.float32)
+        self.scale = scaler['scale'].astype(np.float32)
+        self.n_steps = n_steps
+        self.n_features = self.mean.shape[0]
+        self.max_batch_size = max_batch_size
+
+        # A fixed signature with a free batch dimension traces the graph once
+        self._step = tf.function(
+            lambda window: self.model(window, training=False),
+            input_signature=[tf.TensorSpec([None, n_steps, self.n_features], tf.float32)],
+        )
+
+    def forecast(self, sequences, num_predictions):
+        """
+        Predict the next `num_predictions` positions for each satellite.
+
+        Args:
+            sequences: (n_sats, n_steps, 6) unscaled [x, y, z, Vx, Vy, Vz]
+                histories, or a single (n_steps, 6) history
+
+        Returns:
+            (n_sats, num_predictions, 3) predicted [x, y, z] in input units
+        """
+        sequences = np.asarray(sequences, dtype=np.float32)
+        single = sequences.ndim == 2
+        if single:
+            sequences = sequences[np.newaxis]
+
+        predictions = np.empty((sequences.shape[0], num_predictions, 3), dtype=np.float32)
+        for first in range(0, sequences.shape[0], self.max_batch_size):
+            batch = slice(first, first + self.max_batch_size)
+            predictions[batch] = self._rollout(sequences[batch], num_predictions)
+
+        # Back from the scaled feature space to input units
+        predictions = predictions * self.scale[:3] + self.mean[:3]
+        return predictions[0] if single else predictions
+
+    def _rollout(self, sequences, num_predictions):
+        n_sats = sequences.shape[0]
+        # Room for the history plus every prediction; window k is the view
+        # buffer[:, k:k + n_steps], so shifting the window never copies
+        buffer = np.zeros((n_sats, self.n_steps + num_predictions, self.n_features), dtype=np.float32)
+        buffer[:, :self.n_steps] = (sequences - self.mean) / self.scale
+
+        for k in range(num_predictions):
+            pred = self._step(buffer[:, k:k + self.n_steps]).numpy()
+            # Insert predicted values into the next position; velocities stay zero
+            buffer[:, k + self.n_steps, :3] = pred
+        return buffer[:, self.n_steps:, :3]
+
+
+if __name__ == '__main__':
+    # Fit the training scaler from the states the model was trained on, e.g.
+    #   python position_forecaster.py training_states.npy position_scaler.npz
+    # where the .npy (or .csv) holds rows of [x, y, z, Vx, Vy, Vz]
+    import sys
+
+    if len(sys.argv) not in (2, 3):
+        raise SystemExit("Usage: python position_forecaster.py TRAINING_STATES [SCALER_PATH]")
+    source = sys.argv[1]
+    states = np.load(source) if source.endswith('.npy') else np.loadtxt(source, delimiter=',', ndmin=2)
+    fit_scaler(states, *sys.argv[2:])
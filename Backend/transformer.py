@@ -1,15 +1,49 @@
 import numpy as np
-import random
-from collections import deque
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from tensorflow.keras.optimizers import Adam
+
+class ReplayBuffer:
+    """
+    Fixed-capacity experience memory in preallocated NumPy ring buffers.
+
+    Transitions are written in place (one at a time or as a batch) and a
+    minibatch is sampled with a single fancy-indexing gather per field.
+    """
+
+    def __init__(self, capacity, state_size):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng()
+
+    def __len__(self):
+        return self.size
+
+    def add(self, states, actions, rewards, next_states, dones):
+        states = np.reshape(states, (-1, self.states.shape[1]))
+        count = states.shape[0]
+        index = (self.position + np.arange(count)) % self.capacity
+        self.states[index] = states
+        self.actions[index] = actions
+        self.rewards[index] = rewards
+        self.next_states[index] = np.reshape(next_states, (-1, self.states.shape[1]))
+        self.dones[index] = dones
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size):
+        index = self.rng.choice(self.size, batch_size, replace=False)
+        return (self.states[index], self.actions[index], self.rewards[index],
+                self.next_states[index], self.dones[index])
 
 class DQNSatelliteAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, memory_size=2000, target_update_interval=None):
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
+        self.memory = ReplayBuffer(memory_size, state_size)
         self.gamma = 0.95  # discount rate
         self.epsilon = 1.0  # exploration rate
         self.epsilon_min = 0.01
@@ -17,31 +51,65 @@ class DQNSatelliteAgent:
         self.learning_rate = 0.001
         self.model = self._build_model()
 
+        # Optional frozen copy of the network for computing targets, synced
+        # every `target_update_interval` replay steps
+        self.target_update_interval = target_update_interval
+        self.target_model = None
+        self.replay_steps = 0
+        if target_update_interval:
+            from tensorflow.keras.models import clone_model
+
+            self.target_model = clone_model(self.model)
+            self.update_target_model()
+
     def _build_model(self):
+        # Keras is imported on first use so the replay buffer and the
+        # environment can be used without loading TensorFlow
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense
+        from tensorflow.keras.optimizers import Adam
+
         model = Sequential()
         model.add(Dense(24, input_dim=self.state_size, activation='relu'))
         model.add(Dense(24, activation='relu'))
         model.add(Dense(self.action_size, activation='linear'))
-        model.compile(loss='mse', optimizer=Adam(lr=self.learning_rate))
+        model.compile(loss='mse', optimizer=Adam(learning_rate=self.learning_rate))
         return model
 
+    def update_target_model(self):
+        self.target_model.set_weights(self.model.get_weights())
+
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
     def act(self, state):
-        if np.random.rand() <= self.epsilon:
-            return random.randrange(self.action_size)
-        act_values = self.model.predict(state)
-        return np.argmax(act_values[0])
+        # A single state gives one action; a (n, state_size) batch from a
+        # vectorized environment gives one per row from a single forward pass
+        states = np.reshape(state, (-1, self.state_size))
+        actions = np.random.randint(self.action_size, size=states.shape[0])
+        greedy = np.random.rand(states.shape[0]) > self.epsilon
+        if greedy.any():
+            actions[greedy] = np.argmax(self.model.predict_on_batch(states[greedy]), axis=1)
+        return actions[0] if np.ndim(state) == 1 or states.shape[0] == 1 else actions
 
     def replay(self, batch_size):
-        minibatch = random.sample(self.memory, batch_size)
-        for state, action, reward, next_state, done in minibatch:
-            target = reward
-            if not done:
-                target = reward + self.gamma * np.amax(self.model.predict(next_state)[0])
-            target_f = self.model.predict(state)
-            target_f[0][action] = target
-            self.model.fit(state, target_f, epochs=1, verbose=0)
+        states, actions, rewards, next_states, dones = self.memory.sample(batch_size)
+
+        # Q-values for the sampled states and their successors; without a
+        # target network both come from one forward pass
+        if self.target_model is None:
+            q_values = self.model.predict_on_batch(np.concatenate([states, next_states]))
+            q_values, q_next = q_values[:batch_size], q_values[batch_size:]
+        else:
+            q_values = self.model.predict_on_batch(states)
+            q_next = self.target_model.predict_on_batch(next_states)
+
+        targets = rewards + self.gamma * np.amax(q_next, axis=1) * ~dones
+        q_values[np.arange(batch_size), actions] = targets
+        self.model.train_on_batch(states, q_values)
+
+        self.replay_steps += 1
+        if self.target_model is not None and self.replay_steps % self.target_update_interval == 0:
+            self.update_target_model()
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
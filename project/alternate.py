@@ -1,5 +1,13 @@
 from typing import List, Dict
 
+import numpy as np
+
+from equation import MU_EARTH
+
+MIN_ALTITUDE = 200
+EARTH_RADIUS = 6378
+MAX_E = 0.9
+
 
 def generate_orbital_variations(base_a: float, base_e: float, variations: int = 4) -> List[Dict]:
     """
@@ -13,10 +21,6 @@ def generate_orbital_variations(base_a: float, base_e: float, variations: int =
     Returns:
         List of dictionaries containing orbital equations and their parameters
     """
-    MIN_ALTITUDE = 200
-    EARTH_RADIUS = 6378
-    MAX_E = 0.9
-
     min_a = EARTH_RADIUS + MIN_ALTITUDE
 
     equations = []
@@ -77,15 +81,174 @@ def generate_orbital_variations(base_a: float, base_e: float, variations: int =
     return valid_equations
 
 
-base_semi_major = 42165  # km
-base_eccentricity = 0.0002945
+def _speed(r, a):
+    # Vis-viva: orbital speed (km/s) at radius r on an orbit of semi-major axis a
+    return np.sqrt(MU_EARTH * (2 / r - 1 / a))
+
+
+def _plane_change(v1, v2, angle):
+    # Single burn that changes speed from v1 to v2 and turns the plane by `angle`
+    return np.sqrt(v1**2 + v2**2 - 2 * v1 * v2 * np.cos(angle))
 
-variations = generate_orbital_variations(base_semi_major, base_eccentricity)
 
-for orbit in variations:
-    print(f"\n{orbit['name']}:")
-    print(f"Equation: {orbit['equation']}")
-    print(f"Semi-major axis: {orbit['parameters']['semi_major_axis']} km")
-    print(f"Eccentricity: {orbit['parameters']['eccentricity']}")
-    print(f"Periapsis: {orbit['periapsis']:.1f} km")
-    print(f"Apoapsis: {orbit['apoapsis']:.1f} km")
+def sweep_orbits(base_a, base_e, base_i, semi_major_axes, eccentricities, inclinations, bi_elliptic_ratio=2.0):
+    """
+    Evaluate every candidate orbit of the grid semi_major_axes x
+    eccentricities x inclinations against one or many base orbits.
+
+    Transfers leave from the base periapsis and arrive at the candidate
+    apoapsis, where the plane change is combined with the circularising burn
+    (Hohmann). The bi-elliptic alternative climbs to `bi_elliptic_ratio`
+    times the higher of the two radii and turns the plane there. Both are
+    computed for every candidate and the cheaper one is kept.
+
+    Args:
+        base_a, base_e, base_i: Base orbit(s), km and radians, floats or (S,)
+        semi_major_axes, eccentricities, inclinations: 1-D candidate values
+
+    Returns:
+        Dict of (S, G) arrays, G being the grid size
+    """
+    base_a, base_e, base_i = (np.atleast_1d(np.asarray(x, dtype=np.float64))[:, np.newaxis]
+                              for x in np.broadcast_arrays(base_a, base_e, base_i))
+    a, e, i = (x.ravel()[np.newaxis] for x in np.meshgrid(semi_major_axes, eccentricities, inclinations,
+                                                             indexing='ij'))
+    periapsis, apoapsis = a * (1 - e), a * (1 + e)
+    base_periapsis, base_apoapsis = base_a * (1 - base_e), base_a * (1 + base_e)
+    plane = np.abs(i - base_i)
+    r1, r2 = base_periapsis, apoapsis
+
+    # Hohmann-style transfer ellipse between r1 and r2
+    transfer = (r1 + r2) / 2
+    hohmann_delta_v = (np.abs(_speed(r1, transfer) - _speed(r1, base_a))
+                       + _plane_change(_speed(r2, transfer), _speed(r2, a), plane))
+    hohmann_time = np.pi * np.sqrt(transfer**3 / MU_EARTH)
+
+    # Bi-elliptic: r1 up to rb, then down to r2, plane change at rb
+    rb = bi_elliptic_ratio * np.maximum(r1, r2)
+    first, second = (r1 + rb) / 2, (rb + r2) / 2
+    bi_elliptic_delta_v = (np.abs(_speed(r1, first) - _speed(r1, base_a))
+                           + _plane_change(_speed(rb, first), _speed(rb, second), plane)
+                           + np.abs(_speed(r2, a) - _speed(r2, second)))
+    bi_elliptic_time = np.pi * (np.sqrt(first**3 / MU_EARTH) + np.sqrt(second**3 / MU_EARTH))
+
+    bi_elliptic = bi_elliptic_delta_v < hohmann_delta_v
+    valid = (periapsis > EARTH_RADIUS + MIN_ALTITUDE) & (e < MAX_E)
+    shape = np.broadcast_shapes(a.shape, base_a.shape)
+    return {
+        'semi_major_axis': np.broadcast_to(a, shape),
+        'eccentricity': np.broadcast_to(e, shape),
+        'inclination': np.broadcast_to(i, shape),
+        'periapsis': np.broadcast_to(periapsis, shape),
+        'apoapsis': np.broadcast_to(apoapsis, shape),
+        'valid': np.broadcast_to(valid, shape),
+        'hohmann_delta_v': hohmann_delta_v,
+        'hohmann_time': hohmann_time,
+        'bi_elliptic_delta_v': bi_elliptic_delta_v,
+        'bi_elliptic_time': bi_elliptic_time,
+        'bi_elliptic': bi_elliptic,
+        'delta_v': np.where(bi_elliptic, bi_elliptic_delta_v, hohmann_delta_v),
+        'transfer_time': np.where(bi_elliptic, bi_elliptic_time, hohmann_time),
+        # Radial gap between the candidate and base shells; zero while they
+        # still overlap and a conjunction between the two remains possible
+        'clearance': np.maximum(np.maximum(periapsis - base_apoapsis, base_periapsis - apoapsis), 0.0),
+    }
+
+
+def _dominated(points, by):
+    # Rows of `points` that some row of `by` dominates, built column by column
+    no_worse = np.ones((len(points), len(by)), dtype=bool)
+    better = np.zeros((len(points), len(by)), dtype=bool)
+    for column in range(points.shape[1]):
+        no_worse &= by[:, column] <= points[:, column, np.newaxis]
+        better |= by[:, column] < points[:, column, np.newaxis]
+    return (no_worse & better).any(axis=1)
+
+
+def pareto_front(objectives, mask=None, block_size=256):
+    """
+    Boolean mask of the non-dominated rows of an (N, k) array of objectives,
+    all minimised. Rows outside `mask` neither qualify nor dominate.
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    candidates = np.arange(len(objectives)) if mask is None else np.flatnonzero(mask)
+    # In lexicographic order a row can only be dominated by rows before it, so
+    # each block is screened against the front found so far, then the few
+    # survivors against each other
+    order = candidates[np.lexsort(objectives[candidates].T[::-1])]
+    front_points = np.empty((0, objectives.shape[1]))
+    front = np.zeros(len(objectives), dtype=bool)
+    for start in range(0, len(order), block_size):
+        index = order[start:start + block_size]
+        index = index[~_dominated(objectives[index], front_points)]
+        survivors = ~_dominated(objectives[index], objectives[index])
+        front_points = np.concatenate([front_points, objectives[index[survivors]]])
+        front[index[survivors]] = True
+    return front
+
+
+def plan_orbit_changes(base_a: float, base_e: float, base_i: float = 0.0, semi_major_axes=None,
+                       eccentricities=None, inclinations=None, min_clearance: float = 0.0) -> List[Dict]:
+    """
+    Pareto-optimal orbit changes for one satellite, trading delta-v and
+    transfer time against clearance from the current orbit.
+
+    Args:
+        base_a: Base semi-major axis (km)
+        base_e: Base eccentricity
+        base_i: Base inclination (radians)
+        semi_major_axes, eccentricities, inclinations: Candidate grid; by
+            default 0.7-1.5 times base_a, e up to 0.3 and +/-5 degrees
+        min_clearance: Minimum radial gap (km) to the current orbit's shell
+
+    Returns:
+        List of dictionaries containing orbital equations and their
+        parameters, cheapest first
+    """
+    if semi_major_axes is None:
+        semi_major_axes = np.linspace(max(base_a * 0.7, EARTH_RADIUS + MIN_ALTITUDE), base_a * 1.5, 50)
+    if eccentricities is None:
+        eccentricities = np.linspace(0.0, 0.3, 20)
+    if inclinations is None:
+        inclinations = base_i + np.radians(np.linspace(-5.0, 5.0, 11))
+
+    sweep = {key: value[0] for key, value in sweep_orbits(base_a, base_e, base_i, semi_major_axes,
+                                                          eccentricities, inclinations).items()}
+    objectives = np.stack([sweep['delta_v'], sweep['transfer_time'], -sweep['clearance']], axis=1)
+    front = pareto_front(objectives, sweep['valid'] & (sweep['clearance'] >= min_clearance))
+    order = np.flatnonzero(front)[np.argsort(sweep['delta_v'][front], kind='stable')]
+
+    # Strings are only built for the handful of candidates that are returned
+    results = []
+    for k in order:
+        a, e = float(sweep['semi_major_axis'][k]), float(sweep['eccentricity'][k])
+        results.append({
+            'name': 'Bi-elliptic Transfer' if sweep['bi_elliptic'][k] else 'Hohmann Transfer',
+            'parameters': {
+                'semi_major_axis': a,
+                'eccentricity': e,
+                'inclination': float(np.degrees(sweep['inclination'][k])),
+            },
+            'equation': f'r = {a:.1f}(1 - {e:.4f}²)/(1 + {e:.4f}cos(θ))',
+            'periapsis': float(sweep['periapsis'][k]),
+            'apoapsis': float(sweep['apoapsis'][k]),
+            'delta_v': float(sweep['delta_v'][k]),
+            'transfer_time': float(sweep['transfer_time'][k]),
+            'clearance': float(sweep['clearance'][k]),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    base_semi_major = 42165  # km
+    base_eccentricity = 0.0002945
+
+    variations = generate_orbital_variations(base_semi_major, base_eccentricity)
+
+    for orbit in variations:
+        print(f"\n{orbit['name']}:")
+        print(f"Equation: {orbit['equation']}")
+        print(f"Semi-major axis: {orbit['parameters']['semi_major_axis']} km")
+        print(f"Eccentricity: {orbit['parameters']['eccentricity']}")
+        print(f"Periapsis: {orbit['periapsis']:.1f} km")
+        print(f"Apoapsis: {orbit['apoapsis']:.1f} km")
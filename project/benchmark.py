@@ -0,0 +1,427 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from catalog import line_checksum
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Backend')
+
+
+def canned_tles(count, seed=0):
+    """
+    Valid, checksummed TLEs for `count` made-up LEO objects with today's
+    epoch, so SGP4 propagates them without decay errors.
+
+    Returns:
+        Dict of NORAD ID (str) to two-line text
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc)
+    epoch = f"{now:%y}{now.timetuple().tm_yday:03d}.50000000"
+    tles = {}
+    for k in range(count):
+        norad_id = 10000 + k
+        line1 = f"1 {norad_id:05d}U 98067A   {epoch}  .00001000  00000-0  10000-3 0  999"
+        line2 = (f"2 {norad_id:05d} {rng.uniform(0, 110):8.4f} {rng.uniform(0, 360):8.4f} "
+                 f"{int(rng.uniform(0, 0.02) * 1e7):07d} {rng.uniform(0, 360):8.4f} {rng.uniform(0, 360):8.4f} "
+                 f"{rng.uniform(13.5, 16.0):11.8f}{12345:5d}")
+        tles[str(norad_id)] = f"{line1}{line_checksum(line1)}\r\n{line2}{line_checksum(line2)}"
+    return tles
+
+
+class StubN2YOServer:
+    """
+    Local stand-in for the n2yo TLE endpoint serving canned TLEs, with an
+    optional artificial `latency` in seconds per request.
+    """
+
+    def __init__(self, tles, latency=0.0, host='127.0.0.1', port=0):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                norad_id = self.path.split('/tle/')[-1].split('?')[0]
+                if norad_id in stub.tles:
+                    body = json.dumps({'info': {'satid': int(norad_id)}, 'tle': stub.tles[norad_id]})
+                else:
+                    body = json.dumps({'info': {'satid': 0}, 'tle': ''})
+                body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.tles = tles
+        self.latency = latency
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_port}/rest/v1/satellite"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def summarize(name, samples, operations=1, **extra):
+    """Latency statistics in seconds for one benchmark; `operations` is the work done per sample."""
+    samples = np.asarray(samples, dtype=np.float64)
+    result = {
+        'name': name,
+        'samples': int(samples.size),
+        'mean': float(samples.mean()),
+        'median': float(np.median(samples)),
+        'p95': float(np.percentile(samples, 95)),
+        'min': float(samples.min()),
+        'opsPerSecond': float(operations / samples.mean()),
+    }
+    result.update(extra)
+    return result
+
+
+def measure(function, repeat=20, warmup=2):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_parsing(tles, repeat):
+    from satellite_registry import SatelliteRecord, SatelliteRegistry
+
+    items = list(tles.items())
+    registry = SatelliteRegistry()
+    for norad_id, tle_data in items:
+        registry.get_tle(norad_id, tle_data)
+
+    def parse():
+        for norad_id, tle_data in items:
+            line1, line2 = tle_data.splitlines()
+            SatelliteRecord(norad_id, line1, line2)
+
+    def lookup():
+        for norad_id, tle_data in items:
+            registry.get_tle(norad_id, tle_data)
+
+    return [
+        summarize('tle_parse', measure(parse, repeat), len(items), satellites=len(items)),
+        summarize('tle_registry_hit', measure(lookup, repeat), len(items), satellites=len(items)),
+    ]
+
+
+def bench_propagation(tles, repeat):
+    from frames import teme_to_geodetic
+    from service.positions import calculate_position
+    from propagation import propagate, propagate_window, time_grid
+    from satellite_registry import SatelliteRegistry
+
+    registry = SatelliteRegistry()
+    satellites = [registry.get_tle(norad_id, tle_data) for norad_id, tle_data in tles.items()]
+    now = datetime.utcnow()
+    timestamps = [now.replace(microsecond=0)] * 11
+
+    def single():
+        for timestamp in timestamps:
+            calculate_position(satellites[0], timestamp)
+
+    def batch():
+        propagate_window(satellites, now, 600, 60)
+
+    # A day at one-minute steps through TEME -> ECEF -> geodetic
+    offsets, jd, fr = time_grid(now, 86340, 60)
+    _, positions, _ = propagate(satellites, jd, fr)
+
+    return [
+        summarize('sgp4_single', measure(single, repeat), len(timestamps)),
+        summarize('sgp4_batch', measure(batch, repeat), len(satellites) * 11, satellites=len(satellites), timesteps=11),
+        summarize('teme_to_geodetic', measure(lambda: teme_to_geodetic(positions, jd, fr), repeat),
+                  positions.shape[0] * positions.shape[1], satellites=len(satellites), timesteps=offsets.size),
+    ]
+
+
+def bench_orbits(repeat):
+    import equation
+    from alternate import generate_orbital_variations, plan_orbit_changes
+
+    def get_orbit():
+        equation.get_orbit(equation.mean_motion, equation.eccentricity, equation.raan, equation.inclination,
+                           equation.arg_perigee, equation.mean_anomaly)
+
+    return [
+        summarize('get_orbit', measure(get_orbit, repeat)),
+        summarize('orbital_variations', measure(lambda: generate_orbital_variations(42165, 0.0002945), repeat)),
+        summarize('orbit_change_sweep', measure(lambda: plan_orbit_changes(7000, 0.001, 0.9), repeat)),
+    ]
+
+
+def bench_trajectory_format(tles, repeat, satellites=100, samples=1440):
+    """JSON against the binary trajectory encodings for a day of positions at one-minute steps."""
+    import gzip
+
+    from propagation import positions_to_dicts, propagate_window
+    from satellite_registry import SatelliteRegistry
+    from trajectory_format import encode_trajectory
+
+    registry = SatelliteRegistry()
+    items = list(tles.items())[:satellites]
+    records = [registry.get_tle(norad_id, tle_data) for norad_id, tle_data in items]
+    now = datetime.utcnow()
+    _, positions, _, _ = propagate_window(records, now, (samples - 1) * 60, 60)
+    norad_ids = [norad_id for norad_id, _ in items]
+
+    def as_json():
+        return json.dumps({norad_id: positions_to_dicts(positions[i]) for i, norad_id in enumerate(norad_ids)}).encode()
+
+    encoders = [
+        ('trajectory_json', as_json),
+        ('trajectory_float32', lambda: encode_trajectory(positions, now, 60, norad_ids)),
+        ('trajectory_delta', lambda: encode_trajectory(positions, now, 60, norad_ids, encoding='delta')),
+    ]
+    results = []
+    for name, encode in encoders:
+        payload = encode()
+        results.append(summarize(name, measure(encode, repeat), satellites=len(records), timesteps=samples,
+                                 bytes=len(payload), gzipBytes=len(gzip.compress(payload, compresslevel=5))))
+    return results
+
+
+def bench_passes(tles, repeat, stations=20):
+    """A day of passes for every canned satellite over stations spread across latitudes."""
+    from passes import GroundStation, predict_passes
+    from satellite_registry import SatelliteRegistry
+
+    registry = SatelliteRegistry()
+    satellites = [registry.get_tle(norad_id, tle_data) for norad_id, tle_data in tles.items()]
+    ground_stations = [GroundStation(f'station{k}', latitude, 360.0 * k / stations, 0.0, 5.0)
+                       for k, latitude in enumerate(np.linspace(-75, 75, stations))]
+    now = datetime.utcnow()
+    found = len(predict_passes(satellites, ground_stations, now))  # Doubles as the warm-up
+    return [summarize('pass_prediction', measure(lambda: predict_passes(satellites, ground_stations, now), repeat, 0),
+                      satellites=len(satellites), stations=stations, passes=found)]
+
+
+def bench_refresh(tles, repeat, changed=0.02, horizon=21600):
+    """Screening the canned catalog from scratch against re-screening after a refresh changes `changed` of it."""
+    from conjunction import ConjunctionScreening
+    from satellite_registry import SatelliteRegistry
+
+    registry = SatelliteRegistry()
+    satellites = [registry.get_tle(norad_id, tle_data) for norad_id, tle_data in tles.items()]
+    count = max(1, int(len(satellites) * changed))
+    # The same NORAD IDs with other elements, as a refresh would bring
+    updated = [SatelliteRegistry().get_tle(norad_id, tle_data)
+               for norad_id, tle_data in list(canned_tles(count, seed=1).items())]
+    now = datetime.utcnow()
+    screening = ConjunctionScreening(satellites, now, horizon, 60, 50.0)
+    return [
+        summarize('screening_full', measure(lambda: ConjunctionScreening(satellites, now, horizon, 60, 50.0),
+                                            repeat, 0), satellites=len(satellites), horizon=horizon),
+        summarize('screening_incremental', measure(lambda: screening.update(updated), repeat, 0),
+                  satellites=len(satellites), changed=count, horizon=horizon),
+    ]
+
+
+def bench_forecast(repeat, model_path=None, scaler_path=None, satellites=256, num_predictions=10):
+    """
+    Rollout of predict_next_positions. Without a trained model a small
+    untrained LSTM of the same input shape stands in; its speed, not its
+    output, is what is measured.
+    """
+    sys.path.append(BACKEND_DIR)
+    try:
+        from model_testing import n_steps, predict_next_positions
+        from position_forecaster import PositionForecaster
+    except ImportError as e:
+        return [{'name': 'predict_next_positions', 'skipped': str(e)}]
+
+    with tempfile.TemporaryDirectory() as directory:
+        stand_in = model_path is None
+        if stand_in:
+            from tensorflow.keras.layers import LSTM, Dense, Input
+            from tensorflow.keras.models import Sequential
+
+            model = Sequential([Input((n_steps, 6)), LSTM(50), Dense(3)])
+            model.compile(loss='mse')
+            model_path = os.path.join(directory, 'model.h5')
+            scaler_path = os.path.join(directory, 'scaler.npz')
+            model.save(model_path)
+            np.savez(scaler_path, mean=np.zeros(6), scale=np.ones(6))
+        forecaster = PositionForecaster(model_path, scaler_path, n_steps)
+
+    sequences = np.random.default_rng(0).normal(size=(satellites, n_steps, 6))
+    return [
+        summarize('predict_next_positions', measure(lambda: predict_next_positions(forecaster, sequences[0],
+                                                                                   num_predictions), repeat),
+                  num_predictions, satellites=1, standIn=stand_in),
+        summarize('predict_next_positions_batch', measure(lambda: predict_next_positions(forecaster, sequences,
+                                                                                         num_predictions), repeat),
+                  satellites * num_predictions, satellites=satellites, standIn=stand_in),
+    ]
+
+
+def bench_api(tles, requests_per_level, concurrency_levels, latency):
+    """
+    End-to-end /api/positions through a real HTTP server, with n2yo replaced
+    by the stub. Runs in-process, with the shared client pointed at the stub.
+    """
+    import logging
+
+    import requests
+    from werkzeug.serving import make_server
+
+    results = []
+    with StubN2YOServer(tles, latency) as stub:
+        os.environ['N2YO_BASE_URL'] = stub.base_url
+        os.environ.setdefault('N2YO_API_KEY', 'benchmark')
+        from service import create_app
+        from tle_client import default_client
+
+        default_client.base_url = stub.base_url
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/api/positions"
+
+        norad_ids = list(tles)
+        rng = np.random.default_rng(0)
+        session = requests.Session()
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=max(concurrency_levels)))
+
+        def call(pair):
+            started = time.perf_counter()
+            response = session.post(url, json={'sat1Id': pair[0], 'sat2Id': pair[1]})
+            elapsed = time.perf_counter() - started
+            return elapsed, response.status_code
+
+        try:
+            for concurrency in concurrency_levels:
+                pairs = [tuple(rng.choice(norad_ids, 2, replace=False)) for _ in range(requests_per_level)]
+                upstream_before = stub.requests
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    outcomes = list(pool.map(call, pairs))
+                wall = time.perf_counter() - started
+                failures = sum(1 for _, status in outcomes if status != 200)
+                results.append(summarize(f'api_positions_c{concurrency}', [elapsed for elapsed, _ in outcomes],
+                                         concurrency=concurrency, requestsPerSecond=len(outcomes) / wall,
+                                         failures=failures, upstreamRequests=stub.requests - upstream_before))
+        finally:
+            server.shutdown()
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Benchmarks whose median got slower than the baseline by more than
+    `tolerance` (a fraction).
+    """
+    previous = {result['name']: result for result in baseline['results'] if 'median' in result}
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None or 'median' not in result:
+            continue
+        ratio = result['median'] / before['median']
+        result['baselineRatio'] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(result['name'])
+    return regressions
+
+
+SUITES = ['parsing', 'propagation', 'orbits', 'format', 'passes', 'refresh', 'forecast', 'api']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark TLE parsing, propagation, orbit tools and the API")
+    parser.add_argument('--suites', default=','.join(SUITES), help=f"Comma-separated subset of {','.join(SUITES)}")
+    parser.add_argument('--satellites', type=int, default=500, help="Canned TLEs to parse, propagate and serve")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200, help="API requests per concurrency level")
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help="Stub n2yo latency in seconds")
+    parser.add_argument('--model', help="Trained position model for the forecast suite")
+    parser.add_argument('--scaler', help="Scaler .npz saved with the position model")
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help="Earlier output to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed median slowdown before failing")
+    args = parser.parse_args()
+
+    suites = args.suites.split(',')
+    tles = canned_tles(args.satellites)
+    results = []
+    if 'parsing' in suites:
+        results += bench_parsing(tles, args.repeat)
+    if 'propagation' in suites:
+        results += bench_propagation(tles, args.repeat)
+    if 'orbits' in suites:
+        results += bench_orbits(args.repeat)
+    if 'format' in suites:
+        results += bench_trajectory_format(tles, args.repeat)
+    if 'passes' in suites:
+        results += bench_passes(tles, max(1, args.repeat // 5))
+    if 'refresh' in suites:
+        results += bench_refresh(tles, max(1, args.repeat // 5))
+    if 'forecast' in suites:
+        results += bench_forecast(args.repeat, args.model, args.scaler)
+    if 'api' in suites:
+        results += bench_api(tles, args.requests, [int(c) for c in args.concurrency.split(',')],
+                             args.upstream_latency)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    report = {'environment': environment(), 'results': results, 'regressions': regressions}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        if 'skipped' in result:
+            print(f"{result['name']:32} skipped: {result['skipped']}")
+        else:
+            print(f"{result['name']:32} median {result['median'] * 1e3:10.3f} ms  {result['opsPerSecond']:12.1f} ops/s")
+    if regressions:
+        sys.exit(f"Slower than {args.baseline}: {', '.join(regressions)}")
@@ -0,0 +1,214 @@
+import argparse
+import threading
+
+import numpy as np
+
+from tle_cache import tle_epoch
+
+MU_EARTH = 398600.4418  # Earth's gravitational parameter in km^3/s^2
+
+# One fixed-width row per object; sorted by NORAD ID so lookups are a binary
+# search, and saved as a plain .npy so it can be memory-mapped read-only
+CATALOG_DTYPE = np.dtype([
+    ('norad_id', '<i4'),
+    ('name', 'S24'),
+    ('line1', 'S69'),
+    ('line2', 'S69'),
+    ('epoch', '<f8'),         # Unix time
+    ('inclination', '<f4'),   # degrees
+    ('eccentricity', '<f8'),
+    ('mean_motion', '<f8'),   # revolutions per day
+    ('perigee', '<f4'),       # radius, km
+    ('apogee', '<f4'),        # radius, km
+])
+
+
+def line_checksum(line):
+    """Modulo-10 TLE checksum: digits count at face value and '-' as 1."""
+    return sum(int(c) if c.isdigit() else c == '-' for c in line[:68]) % 10
+
+
+def valid_tle(tle_line1, tle_line2):
+    if len(tle_line1) < 69 or len(tle_line2) < 69:
+        return False
+    if not (tle_line1.startswith('1 ') and tle_line2.startswith('2 ')):
+        return False
+    if tle_line1[2:7] != tle_line2[2:7]:
+        return False
+    return (tle_line1[68].isdigit() and line_checksum(tle_line1) == int(tle_line1[68])
+            and tle_line2[68].isdigit() and line_checksum(tle_line2) == int(tle_line2[68]))
+
+
+def parse_catalog(lines):
+    """
+    Parse TLE or 3LE text into a sorted catalog array.
+
+    A line before a TLE pair that is not itself a TLE line is taken as the
+    object name (a leading "0 " is dropped). Pairs with a bad checksum or
+    mismatched NORAD IDs are skipped; for duplicate IDs the newest epoch wins.
+
+    Returns:
+        (catalog, rejected) where rejected is the number of skipped pairs
+    """
+    rows = []
+    rejected = 0
+    name = ''
+    lines = [line.rstrip() for line in lines]
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('1 ') and i + 1 < len(lines) and lines[i + 1].startswith('2 '):
+            tle_line1, tle_line2 = line, lines[i + 1]
+            i += 2
+            if not valid_tle(tle_line1, tle_line2):
+                rejected += 1
+                name = ''
+                continue
+            try:
+                rows.append(_catalog_row(name, tle_line1, tle_line2))
+            except ValueError:
+                rejected += 1
+            name = ''
+            continue
+        if line.strip():
+            name = line[2:].strip() if line.startswith('0 ') else line.strip()
+        i += 1
+
+    catalog = np.array(rows, dtype=CATALOG_DTYPE)
+    # Newest epoch first within each ID, then keep the first row per ID
+    catalog = catalog[np.lexsort((-catalog['epoch'], catalog['norad_id']))]
+    keep = np.ones(catalog.size, dtype=bool)
+    keep[1:] = catalog['norad_id'][1:] != catalog['norad_id'][:-1]
+    return catalog[keep], rejected
+
+
+def _catalog_row(name, tle_line1, tle_line2):
+    inclination = float(tle_line2[8:16])
+    eccentricity = float('0.' + tle_line2[26:33].strip())
+    mean_motion = float(tle_line2[52:63])
+    n = mean_motion * 2 * np.pi / 86400  # rad/s
+    semi_major_axis = (MU_EARTH / n**2) ** (1 / 3)
+    return (
+        int(tle_line1[2:7]),
+        name[:24].encode('ascii', 'replace'),
+        tle_line1[:69].encode('ascii'),
+        tle_line2[:69].encode('ascii'),
+        tle_epoch(tle_line1).timestamp(),
+        inclination,
+        eccentricity,
+        mean_motion,
+        semi_major_axis * (1 - eccentricity),
+        semi_major_axis * (1 + eccentricity),
+    )
+
+
+class TLECatalog:
+    """
+    Array-backed store of element sets indexed by NORAD ID.
+
+    The base array may be a read-only memory map; newer element sets from
+    n2yo are kept in a small overlay until they are merged with `compact`.
+    """
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._overlay = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, path):
+        with open(path, 'r', encoding='ascii', errors='replace') as f:
+            catalog, _ = parse_catalog(f)
+        return cls(catalog)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
+
+    def save(self, path):
+        np.save(path, self.compact())
+
+    def __len__(self):
+        extra = sum(1 for norad_id in self._overlay if self._index(norad_id) is None)
+        return len(self._catalog) + extra
+
+    def __contains__(self, norad_id):
+        return self.tle(norad_id) is not None
+
+    @property
+    def norad_ids(self):
+        return np.union1d(self._catalog['norad_id'], np.array(list(self._overlay), dtype=np.int32))
+
+    @property
+    def array(self):
+        return self._catalog
+
+    def _index(self, norad_id):
+        ids = self._catalog['norad_id']
+        i = np.searchsorted(ids, norad_id)
+        if i < ids.size and ids[i] == norad_id:
+            return i
+        return None
+
+    def tle(self, norad_id):
+        """Raw two-line text for `norad_id`, or None if it is not catalogued."""
+        try:
+            norad_id = int(norad_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            if norad_id in self._overlay:
+                return self._overlay[norad_id]
+        i = self._index(norad_id)
+        if i is None:
+            return None
+        row = self._catalog[i]
+        return f"{row['line1'].decode()}\n{row['line2'].decode()}"
+
+    def update(self, norad_id, tle_data):
+        """Record a newer element set, e.g. from an n2yo refresh."""
+        with self._lock:
+            self._overlay[int(norad_id)] = tle_data.strip()
+
+    def compact(self):
+        """Return the base array with the overlay merged in."""
+        with self._lock:
+            overlay = list(self._overlay.values())
+        if not overlay:
+            return np.asarray(self._catalog)
+        lines = [line for tle_data in overlay for line in tle_data.splitlines()]
+        updates, _ = parse_catalog(lines)
+        base = np.asarray(self._catalog)
+        base = base[~np.isin(base['norad_id'], updates['norad_id'])]
+        merged = np.concatenate([base, updates])
+        return merged[np.argsort(merged['norad_id'], kind='stable')]
+
+    def records(self, registry, norad_ids=None):
+        """SatelliteRecords for `norad_ids` (default: the whole catalog); unknown IDs are skipped."""
+        if norad_ids is None:
+            norad_ids = self.norad_ids.tolist()
+        records = []
+        for norad_id in norad_ids:
+            tle_data = self.tle(norad_id)
+            if tle_data is not None:
+                records.append(registry.get_tle(norad_id, tle_data))
+        return records
+
+
+def load_catalog(path):
+    """Open a catalog from a .npy store (memory-mapped) or a TLE/3LE text file."""
+    if path.endswith('.npy'):
+        return TLECatalog.load(path)
+    return TLECatalog.from_text(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a TLE/3LE catalog file into a compact .npy store")
+    parser.add_argument('source', help="TLE or 3LE text file")
+    parser.add_argument('destination', help="Output .npy file")
+    args = parser.parse_args()
+
+    with open(args.source, 'r', encoding='ascii', errors='replace') as f:
+        catalog, rejected = parse_catalog(f)
+    np.save(args.destination, catalog)
+    print(f"Stored {len(catalog)} objects in {args.destination} ({rejected} rejected)")
@@ -0,0 +1,506 @@
+import threading
+
+import numpy as np
+
+from propagation import propagate_chunks, propagate_samples, start_jday, time_grid
+from tca import refine_samples
+
+# Cells are packed into one int64 key with 21 bits per axis, which covers
+# +/-1,048,576 cells: enough for GEO distances down to 0.05 km cells
+_CELL_BITS = 21
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+_NEIGHBOURS = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+
+# Scales that map conjunction quantities onto the [0, 1] range the risk
+# model in risk_factor.py was trained on
+MAX_RELATIVE_SPEED = 15.0  # km/s
+MAX_TIME_OFFSET = 86400.0  # s
+MAX_RADIUS = 50000.0  # km
+
+# Bound on the relative acceleration of two orbiting objects (twice surface
+# gravity), i.e. on how far a pair drifts from straight-line relative motion
+MAX_RELATIVE_ACCELERATION = 0.02  # km/s^2
+
+# Satellite-samples propagated at once when screening SatelliteRecords: 24 MB
+# per float64 state array however large the catalog or long the window
+SCREEN_CHUNK_STATES = 1 << 20
+
+
+def _cell_keys(cells):
+    shifted = cells + _CELL_OFFSET
+    return (shifted[:, 0] << (2 * _CELL_BITS)) | (shifted[:, 1] << _CELL_BITS) | shifted[:, 2]
+
+
+def close_pairs(positions, threshold):
+    """
+    Find all pairs of points closer than `threshold` with a uniform grid.
+
+    Points are hashed into cubic cells of side `threshold`, so only points in
+    the 27 neighbouring cells need a distance check. Non-finite points (failed
+    propagation) are ignored.
+
+    Args:
+        positions: (N, 3) array in km
+        threshold: Distance threshold in km
+
+    Returns:
+        (i, j, distance) arrays with i < j
+    """
+    valid = np.flatnonzero(np.isfinite(positions).all(axis=1))
+    if valid.size < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    points = positions[valid]
+    cells = np.floor(points / threshold).astype(np.int64)
+    keys = _cell_keys(cells)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    first = []
+    second = []
+    for offset in _NEIGHBOURS:
+        neighbour_keys = _cell_keys(cells + offset)
+        lo = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+        hi = np.searchsorted(sorted_keys, neighbour_keys, side='right')
+        counts = hi - lo
+        total = counts.sum()
+        if total == 0:
+            continue
+        # Expand each [lo, hi) range into explicit candidate indices
+        source = np.repeat(np.arange(points.shape[0]), counts)
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        target = order[np.arange(total) + starts]
+        keep = source < target
+        first.append(source[keep])
+        second.append(target[keep])
+
+    if not first:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    first = np.concatenate(first)
+    second = np.concatenate(second)
+    distance = np.linalg.norm(points[first] - points[second], axis=1)
+    close = distance <= threshold
+    return valid[first[close]], valid[second[close]], distance[close]
+
+
+def close_pairs_to(positions, subset, threshold):
+    """
+    Find the pairs between points in `subset` and any other point closer
+    than `threshold`, with the grid of `close_pairs` but querying only the
+    neighbourhoods of the subset.
+
+    Args:
+        positions: (N, 3) array in km
+        subset: Indices into positions
+        threshold: Distance threshold in km
+
+    Returns:
+        (i, j, distance) arrays with i < j, each pair once
+    """
+    empty = np.empty(0, dtype=np.int64)
+    finite = np.isfinite(positions).all(axis=1)
+    valid = np.flatnonzero(finite)
+    subset = np.asarray(subset, dtype=np.int64)
+    subset = subset[finite[subset]]
+    if subset.size == 0 or valid.size < 2:
+        return empty, empty, np.empty(0)
+
+    keys = _cell_keys(np.floor(positions[valid] / threshold).astype(np.int64))
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # All 27 neighbourhoods of the (few) query points in one lookup
+    query_cells = np.floor(positions[subset] / threshold).astype(np.int64)
+    neighbour_keys = _cell_keys((query_cells[:, np.newaxis] + _NEIGHBOURS).reshape(-1, 3))
+    lo = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+    counts = np.searchsorted(sorted_keys, neighbour_keys, side='right') - lo
+    total = counts.sum()
+    if total == 0:
+        return empty, empty, np.empty(0)
+    first = np.repeat(np.repeat(subset, len(_NEIGHBOURS)), counts)
+    starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    second = valid[order[np.arange(total) + starts]]
+    keep = first != second
+    first, second = first[keep], second[keep]
+
+    # Pairs of two subset points were found from both ends
+    i, j = np.minimum(first, second), np.maximum(first, second)
+    _, unique = np.unique(i * positions.shape[0] + j, return_index=True)
+    i, j = i[unique], j[unique]
+    distance = np.linalg.norm(positions[i] - positions[j], axis=1)
+    close = distance <= threshold
+    return i[close], j[close], distance[close]
+
+
+def shells_overlap(i, j, perigees, apogees, threshold):
+    """True where the radial shells [perigee, apogee] of i and j come within `threshold` km."""
+    gap = np.maximum(perigees[i], perigees[j]) - np.minimum(apogees[i], apogees[j])
+    return gap <= threshold
+
+
+def shell_candidates(perigees, apogees, threshold):
+    """
+    Mask of objects whose radial shell comes within `threshold` km of at
+    least one other object's shell; the rest can never be in a conjunction.
+    """
+    order = np.argsort(perigees, kind='stable')
+    starts = perigees[order] - threshold
+    ends = apogees[order]
+
+    # Sorted by start, an interval overlaps an earlier one if the furthest
+    # earlier end reaches it, and a later one if the next start is within it
+    overlaps = np.zeros(order.size, dtype=bool)
+    overlaps[1:] |= np.maximum.accumulate(ends)[:-1] >= starts[1:]
+    overlaps[:-1] |= starts[1:] <= ends[:-1]
+
+    mask = np.empty(order.size, dtype=bool)
+    mask[order] = overlaps
+    return mask
+
+
+def screen(positions, threshold, velocities=None, perigees=None, apogees=None):
+    """
+    Screen propagated states for close approaches.
+
+    Args:
+        positions: (N, T, 3) positions in km
+        threshold: Report pairs whose sampled separation is within this (km)
+        velocities: Optional (N, T, 3) velocities in km/s for relative speed
+        perigees, apogees: Optional (N,) radii in km; objects and pairs
+            whose shells cannot come within `threshold` are dropped before
+            any distance check
+
+    Returns:
+        Dict of arrays sorted by miss distance: 'i', 'j', 'distance' (km),
+        'time_index' and, with velocities, 'relative_speed' (km/s). Each pair
+        appears once, at its closest sampled approach.
+    """
+    n_sats = positions.shape[0]
+    active = np.arange(n_sats)
+    if perigees is not None and apogees is not None:
+        perigees = np.asarray(perigees, dtype=np.float64)
+        apogees = np.asarray(apogees, dtype=np.float64)
+        active = np.flatnonzero(shell_candidates(perigees, apogees, threshold))
+    else:
+        perigees = apogees = None
+
+    pair_keys, distances, time_indexes = _screen_chunk(positions, 0, threshold, active, perigees, apogees)
+    found = _closest(pair_keys, distances, n_sats, time_index=time_indexes)
+    if velocities is not None:
+        relative = velocities[found['i'], found['time_index']] - velocities[found['j'], found['time_index']]
+        found['relative_speed'] = np.linalg.norm(relative, axis=1)
+    return found
+
+
+def _screen_chunk(positions, first_time, threshold, active, perigees=None, apogees=None, subset=None,
+                  search=None):
+    # Pairs among the `active` rows of an (N, t, 3) chunk starting at sample
+    # `first_time` sampled within `search` km (default `threshold`) whose
+    # shells come within `threshold`, or only those involving `subset`
+    # (positions in `active`), as (pair keys, distances, time indexes)
+    n_sats = positions.shape[0]
+    search = threshold if search is None else search
+    pair_keys = []
+    distances = []
+    time_indexes = []
+    for t in range(positions.shape[1]):
+        if subset is None:
+            i, j, distance = close_pairs(positions[active, t], search)
+        else:
+            i, j, distance = close_pairs_to(positions[active, t], subset, search)
+        i, j = active[i], active[j]
+        if perigees is not None and i.size:
+            keep = shells_overlap(i, j, perigees, apogees, threshold)
+            i, j, distance = i[keep], j[keep], distance[keep]
+        pair_keys.append(i * n_sats + j)
+        distances.append(distance)
+        time_indexes.append(np.full(i.size, first_time + t))
+    return np.concatenate(pair_keys), np.concatenate(distances), np.concatenate(time_indexes)
+
+
+def _closest(pair_keys, distances, n_sats, **columns):
+    # Keep the closest approach of every pair, with its `columns`, then rank
+    # pairs by it
+    order = np.lexsort((distances, pair_keys))
+    pair_keys = pair_keys[order]
+    first = np.ones(pair_keys.size, dtype=bool)
+    first[1:] = pair_keys[1:] != pair_keys[:-1]
+    distances = distances[order][first]
+    ranked = np.argsort(distances, kind='stable')
+    found = {
+        'i': pair_keys[first][ranked] // n_sats,
+        'j': pair_keys[first][ranked] % n_sats,
+        'distance': distances[ranked],
+    }
+    found.update((name, values[order][first][ranked]) for name, values in columns.items())
+    return found
+
+
+def candidate_threshold(threshold, step):
+    """
+    Sampled separation (km) within which a pair may pass within `threshold`
+    between samples: every instant is within step / 2 of a sample, and no
+    pair closes faster than MAX_RELATIVE_SPEED.
+    """
+    return threshold + MAX_RELATIVE_SPEED * step / 2
+
+
+def _may_approach(dr, dv, step, threshold):
+    # True where the relative motion from a sample's (dr, dv) can come within
+    # `threshold` within step / 2 of it: straight-line motion, allowing for
+    # MAX_RELATIVE_ACCELERATION
+    half = step / 2
+    speed2 = np.einsum('ij,ij->i', dv, dv)
+    tau = np.clip(-np.einsum('ij,ij->i', dr, dv) / np.where(speed2 == 0, 1, speed2), -half, half)
+    miss = np.linalg.norm(dr + dv * tau[:, np.newaxis], axis=1)
+    return miss <= threshold + MAX_RELATIVE_ACCELERATION * half**2 / 2
+
+
+def _refine_candidates(satrecs, candidates, jd0, fr0, offsets, step, threshold, states=None):
+    # Refine sampled candidates (pair keys, distances, time indexes) to their
+    # closest approach and keep those within `threshold`, as (pair keys, miss
+    # distances, time offsets, relative speeds). Candidates that cannot come
+    # that close are dropped first, from `states` (positions, velocities,
+    # first time index) of their chunk or else by propagating the pair
+    pair_keys, _, time_indexes = candidates
+    n_sats = len(satrecs)
+    i, j = pair_keys // n_sats, pair_keys % n_sats
+    sample = offsets[time_indexes]
+    if states is None:
+        jd, fr = np.full(sample.size, jd0), fr0 + sample / 86400.0
+        r1, v1 = propagate_samples(satrecs, i, jd, fr)
+        r2, v2 = propagate_samples(satrecs, j, jd, fr)
+        dr, dv = r1 - r2, v1 - v2
+    else:
+        positions, velocities, first = states
+        t = time_indexes - first
+        dr, dv = positions[i, t] - positions[j, t], velocities[i, t] - velocities[j, t]
+    keep = _may_approach(dr.astype(np.float64), dv.astype(np.float64), step, threshold)
+    i, j, pair_keys, sample = i[keep], j[keep], pair_keys[keep], sample[keep]
+
+    t, miss, speed = refine_samples(satrecs, i, j, jd0, fr0, sample, step, (offsets[0], offsets[-1]))
+    close = miss <= threshold
+    return pair_keys[close], miss[close], t[close], speed[close]
+
+
+def _refined_closest(parts, n_sats):
+    pair_keys, distances, time_offsets, speeds = (np.concatenate(part) for part in zip(*parts))
+    return _closest(pair_keys, distances, n_sats, time_offset=time_offsets, relative_speed=speeds)
+
+
+def _chunk_samples(n_sats):
+    return max(1, SCREEN_CHUNK_STATES // max(n_sats, 1))
+
+
+def _propagate_states(satellites, start, horizon, step):
+    # Generator over (first sample, float32 (N, t, 3) positions and
+    # velocities) chunks, NaN where propagation failed
+    first = 0
+    for _, positions, velocities, errors in propagate_chunks(satellites, start, horizon, step,
+                                                             _chunk_samples(len(satellites))):
+        positions, velocities = positions.astype(np.float32), velocities.astype(np.float32)
+        positions[errors != 0] = np.nan
+        velocities[errors != 0] = np.nan
+        yield first, positions, velocities
+        first += positions.shape[1]
+
+
+def _screen_satellites(satellites, start, horizon, step, threshold, store=None):
+    # Screen SatelliteRecords chunk by chunk in time, copying positions into
+    # `store` (N, T, 3) when given
+    offsets, _, _ = time_grid(start, horizon, step)
+    jd0, fr0 = start_jday(start)
+    satrecs = [satellite.satrec for satellite in satellites]
+    perigees = np.array([satellite.perigee for satellite in satellites])
+    apogees = np.array([satellite.apogee for satellite in satellites])
+    active = np.flatnonzero(shell_candidates(perigees, apogees, threshold))
+    search = candidate_threshold(threshold, step)
+
+    parts = []
+    for first, positions, velocities in _propagate_states(satellites, start, horizon, step):
+        if store is not None:
+            store[:, first:first + positions.shape[1]] = positions
+        candidates = _screen_chunk(positions, first, threshold, active, perigees, apogees, search=search)
+        parts.append(_refine_candidates(satrecs, candidates, jd0, fr0, offsets, step, threshold,
+                                        (positions, velocities, first)))
+    return _refined_closest(parts, len(satellites))
+
+
+def screen_catalog(satellites, start, horizon=86400, step=60, threshold=10.0):
+    """
+    Propagate SatelliteRecords over a window and list close approaches.
+
+    The window is propagated and screened a chunk of samples at a time, so
+    memory stays flat however large the catalog. A pair can pass within
+    `threshold` between samples, so samples are searched out to
+    `candidate_threshold(threshold, step)` and each candidate is refined to
+    its time of closest approach with `tca.refine_samples`; only refined
+    approaches within `threshold` are reported.
+
+    Returns:
+        List of conjunction dicts ranked by miss distance at closest approach
+    """
+    satellites = list(satellites)
+    found = _screen_satellites(satellites, start, horizon, step, threshold)
+    return _conjunctions(found, satellites)
+
+
+def _conjunctions(found, satellites, limit=None):
+    return [
+        {
+            'sat1': satellites[i].norad_id,
+            'sat2': satellites[j].norad_id,
+            'missDistance': float(distance),
+            'timeOffset': float(offset),
+            'relativeSpeed': float(speed),
+        }
+        for i, j, distance, offset, speed in zip(
+            found['i'][:limit].tolist(), found['j'][:limit].tolist(), found['distance'][:limit],
+            found['time_offset'][:limit], found['relative_speed'][:limit])
+    ]
+
+
+class ConjunctionScreening:
+    """
+    Close approaches among SatelliteRecords over a fixed window, kept current
+    as their element sets change.
+
+    The positions of every satellite are kept after the first screening, so
+    `update` only re-propagates the satellites it is given, drops the
+    conjunctions they were part of and screens them against the rest. A
+    refresh that changes a few percent of the catalog then costs a few
+    percent of the propagation of a full screening. Positions are
+    propagated in chunks and kept as float32, which is metre-level at GEO
+    distances; velocities are not kept. Conjunctions are refined to their
+    time of closest approach, as in `screen_catalog`.
+    """
+
+    def __init__(self, satellites, start, horizon=86400, step=60, threshold=10.0):
+        self.start = start
+        self.horizon = horizon
+        self.step = step
+        self.threshold = threshold
+        self.satellites = list(satellites)
+        self._rows = {satellite.norad_id: row for row, satellite in enumerate(self.satellites)}
+        self._lock = threading.Lock()
+        self._updating = threading.Lock()
+        # Incremented by every update, so holders can tell when to republish
+        self.version = 0
+
+        self.offsets, _, _ = time_grid(start, horizon, step)
+        self._positions = np.empty((len(self.satellites), self.offsets.size, 3), dtype=np.float32)
+        self._perigees = np.array([satellite.perigee for satellite in self.satellites])
+        self._apogees = np.array([satellite.apogee for satellite in self.satellites])
+        self._found = _screen_satellites(self.satellites, start, horizon, step, threshold, self._positions)
+
+    def __contains__(self, norad_id):
+        return norad_id in self._rows
+
+    def __len__(self):
+        return len(self.satellites)
+
+    def conjunctions(self, limit=None):
+        """Conjunction dicts as from `screen_catalog`, the closest `limit` of them."""
+        with self._lock:
+            return _conjunctions(self._found, self.satellites, limit)
+
+    def update(self, satellites):
+        """
+        Replace the element sets of SatelliteRecords already screened (by
+        NORAD ID), add any new ones, and re-screen only those.
+
+        Returns:
+            Number of conjunctions the updated satellites are now part of
+        """
+        satellites = list({satellite.norad_id: satellite for satellite in satellites}.values())
+        if not satellites:
+            return 0
+        with self._updating:
+            return self._update(satellites)
+
+    def _update(self, satellites):
+        # Readers only see the satellite list and the conjunctions, which are
+        # swapped in whole, so positions can be rewritten in place
+        with self._lock:
+            all_satellites = list(self.satellites)
+            rows = dict(self._rows)
+        for satellite in satellites:
+            if satellite.norad_id not in rows:
+                rows[satellite.norad_id] = len(all_satellites)
+                all_satellites.append(None)
+            all_satellites[rows[satellite.norad_id]] = satellite
+        changed = np.array([rows[satellite.norad_id] for satellite in satellites])
+
+        n_sats = len(all_satellites)
+        grow = n_sats - self._positions.shape[0]
+        if grow:
+            self._positions = np.concatenate([self._positions, np.empty((grow,) + self._positions.shape[1:],
+                                                                        dtype=np.float32)])
+            self._perigees = np.concatenate([self._perigees, np.empty(grow)])
+            self._apogees = np.concatenate([self._apogees, np.empty(grow)])
+        positions, perigees, apogees = self._positions, self._perigees, self._apogees
+        for first, chunk, _ in _propagate_states(satellites, self.start, self.horizon, self.step):
+            positions[changed, first:first + chunk.shape[1]] = chunk
+        perigees[changed] = [satellite.perigee for satellite in satellites]
+        apogees[changed] = [satellite.apogee for satellite in satellites]
+
+        # Only objects whose shells come near a changed one can meet it
+        threshold = self.threshold
+        order = np.argsort(perigees[changed])
+        lows = perigees[changed][order]
+        highs = np.maximum.accumulate(apogees[changed][order])
+        below = np.searchsorted(lows, apogees + threshold, side='right')
+        near = (below > 0) & (highs[np.maximum(below - 1, 0)] >= perigees - threshold)
+        active = np.flatnonzero(near)
+        local = np.flatnonzero(np.isin(active, changed))
+
+        candidates = _screen_chunk(positions, 0, threshold, active, perigees, apogees, local,
+                                   candidate_threshold(threshold, self.step))
+        jd0, fr0 = start_jday(self.start)
+        found = _refined_closest([_refine_candidates([satellite.satrec for satellite in all_satellites], candidates,
+                                                     jd0, fr0, self.offsets, self.step, threshold)], n_sats)
+
+        # No kept conjunction involves a changed satellite, so the two sets
+        # are disjoint and only need merging by distance
+        kept = ~(np.isin(self._found['i'], changed) | np.isin(self._found['j'], changed))
+        merged = {key: np.concatenate([self._found[key][kept], found[key]]) for key in found}
+        ranked = np.argsort(merged['distance'], kind='stable')
+        merged = {key: values[ranked] for key, values in merged.items()}
+
+        with self._lock:
+            self.satellites = all_satellites
+            self._rows = rows
+            self._found = merged
+            self.version += 1
+        return found['i'].size
+
+
+def risk_features(conjunctions, satellites, threshold=10.0):
+    """
+    Build the (n, 10, 1) input expected by the risk_factor.keras model.
+
+    Args:
+        conjunctions: Conjunction dicts from `screen_catalog`
+        satellites: Mapping of NORAD ID to SatelliteRecord
+        threshold: Screening threshold used to normalise miss distance
+    """
+    features = np.empty((len(conjunctions), 10))
+    for row, conjunction in enumerate(conjunctions):
+        sat1 = satellites[conjunction['sat1']]
+        sat2 = satellites[conjunction['sat2']]
+        features[row] = [
+            conjunction['missDistance'] / threshold,
+            conjunction['relativeSpeed'] / MAX_RELATIVE_SPEED,
+            conjunction['timeOffset'] / MAX_TIME_OFFSET,
+            sat1.semi_major_axis / MAX_RADIUS,
+            sat2.semi_major_axis / MAX_RADIUS,
+            sat1.eccentricity,
+            sat2.eccentricity,
+            sat1.inclination / np.pi,
+            sat2.inclination / np.pi,
+            min(sat1.perigee, sat2.perigee) / MAX_RADIUS,
+        ]
+    return np.clip(features, 0.0, 1.0)[:, :, np.newaxis]
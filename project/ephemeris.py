@@ -0,0 +1,240 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from propagation import propagate, start_jday
+
+
+class Ephemeris:
+    """
+    States of one satellite tabulated at a fixed step, answered at arbitrary
+    times by cubic Hermite interpolation on position and velocity.
+    """
+
+    def __init__(self, satellite, start, horizon, step):
+        self.norad_id = satellite.norad_id
+        self.checksum = satellite.checksum
+        if not 0 < step <= horizon:
+            raise ValueError("An ephemeris needs a positive step no longer than its horizon")
+        self.start = start
+        self.step = float(step)
+        self.count = int(horizon // step) + 1
+        self.horizon = (self.count - 1) * self.step
+
+        self.jd0, self.fr0 = start_jday(start)
+        offsets = np.arange(self.count, dtype=np.float64) * self.step
+        errors, positions, velocities = propagate([satellite], np.full(self.count, self.jd0),
+                                                  self.fr0 + offsets / 86400.0)
+        self.errors = errors[0]
+        self.valid = self.errors == 0
+        self.accuracy = None
+        self._satellite = satellite
+
+        # Hermite cubic per segment as polynomial coefficients in s in [0, 1],
+        # so a lookup is a gather and a Horner evaluation
+        p0, p1 = positions[0, :-1], positions[0, 1:]
+        m0, m1 = velocities[0, :-1] * self.step, velocities[0, 1:] * self.step
+        self._coefficients = np.stack([
+            p0,
+            m0,
+            3 * (p1 - p0) - 2 * m0 - m1,
+            2 * (p0 - p1) + m0 + m1,
+        ], axis=1)
+
+    def covers(self, offsets):
+        return np.all((offsets >= 0) & (offsets <= self.horizon))
+
+    def interpolate(self, offsets):
+        """
+        Interpolated states at `offsets` seconds after `start`.
+
+        Returns:
+            positions (km) and velocities (km/s), each (len(offsets), 3); NaN
+            where a neighbouring tabulated state failed to propagate
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        k = self._segments(offsets)
+        s = (offsets / self.step - k)[:, np.newaxis]
+        c0, c1, c2, c3 = np.moveaxis(self._coefficients[k], 1, 0)
+
+        positions = c0 + s * (c1 + s * (c2 + s * c3))
+        velocities = (c1 + s * (2 * c2 + s * (3 * c3))) / self.step
+
+        bad = ~(self.valid[k] & self.valid[k + 1])
+        positions[bad] = np.nan
+        velocities[bad] = np.nan
+        return positions, velocities
+
+    def error_codes(self, offsets):
+        """SGP4 error code at each offset: the worse of the tabulated states either side, 0 if both propagated."""
+        k = self._segments(np.asarray(offsets, dtype=np.float64))
+        return np.maximum(self.errors[k], self.errors[k + 1])
+
+    def _segments(self, offsets):
+        return np.clip((offsets // self.step).astype(np.int64), 0, self.count - 2)
+
+    def error(self, samples=1000, seed=0):
+        """
+        Compare interpolation against direct SGP4 at random offsets.
+
+        Returns:
+            Dict with the maximum and RMS position error in km
+        """
+        offsets = np.random.default_rng(seed).uniform(0, self.horizon, samples)
+        interpolated, _ = self.interpolate(offsets)
+        _, direct, _ = propagate([self._satellite], np.full(samples, self.jd0), self.fr0 + offsets / 86400.0)
+        difference = np.linalg.norm(interpolated - direct[0], axis=1)
+        difference = difference[np.isfinite(difference)]
+        return {
+            'maxError': float(difference.max()) if difference.size else 0.0,
+            'rmsError': float(np.sqrt(np.mean(difference**2))) if difference.size else 0.0,
+        }
+
+
+class EphemerisCache:
+    """
+    Ephemerides for frequently queried satellites.
+
+    Each table spans `horizon` seconds at `step`; a step is accepted only if
+    its measured interpolation error is within `max_error` km, otherwise it is
+    halved. Tables are rebuilt when the TLE checksum changes or a query falls
+    outside the window. `admit` decides which satellites are worth a table.
+    """
+
+    def __init__(self, horizon=86400, step=120, max_error=0.01, max_entries=256):
+        self.horizon = horizon
+        self.step = step
+        self.max_error = max_error
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._seen = OrderedDict()  # NORAD ID -> checksum of recent lookups that had no table
+        self._lock = threading.Lock()
+
+    def _build(self, satellite, start):
+        step = self.step
+        while True:
+            table = Ephemeris(satellite, start, self.horizon, step)
+            table.accuracy = table.error(samples=200)
+            if table.accuracy['maxError'] <= self.max_error or step <= 1:
+                return table
+            step /= 2
+
+    def admit(self, satellites, start, offsets):
+        """
+        Whether to answer a lookup of `offsets` seconds after `start` from
+        tables. True when every satellite has a current table covering it,
+        after building tables for satellites that missed before within the
+        last `max_entries` misses: an LRU of that size would have kept
+        their tables until now, so one-off and cycling lookups never evict
+        the tables in use. Satellites missing for the first time are only
+        remembered, and the lookup is left to SGP4.
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        with self._lock:
+            missing = [satellite for satellite in satellites if not self._covers(satellite, start, offsets)]
+            repeated = [satellite for satellite in missing
+                        if self._seen.get(satellite.norad_id) == satellite.checksum]
+            for satellite in missing:
+                self._seen[satellite.norad_id] = satellite.checksum
+                self._seen.move_to_end(satellite.norad_id)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        if len(repeated) < len(missing):
+            return False
+        for satellite in repeated:
+            self._table(satellite, start, offsets)
+            with self._lock:
+                self._seen.pop(satellite.norad_id, None)
+        return True
+
+    # Must be called with the lock held
+    def _covers(self, satellite, start, offsets):
+        table = self._tables.get(satellite.norad_id)
+        return (table is not None and table.checksum == satellite.checksum
+                and table.covers(offsets + (start - table.start).total_seconds()))
+
+    def states(self, satellite, start, offsets):
+        """
+        Positions and velocities of `satellite` at `offsets` seconds after
+        `start`, interpolated from a cached table.
+        """
+        table, shifted = self._table(satellite, start, np.asarray(offsets, dtype=np.float64))
+        return table.interpolate(shifted)
+
+    def propagate(self, satellites, start, offsets):
+        """
+        Interpolated counterpart of `propagation.propagate` at `offsets`
+        seconds after `start`, for windows no longer than `horizon`.
+
+        Returns:
+            errors (n_sats, n_times), positions and velocities
+            (n_sats, n_times, 3) in km and km/s; NaN where errors is nonzero
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        errors = np.zeros((len(satellites), offsets.size), dtype=np.int64)
+        positions = np.empty((len(satellites), offsets.size, 3))
+        velocities = np.empty((len(satellites), offsets.size, 3))
+        for i, satellite in enumerate(satellites):
+            table, shifted = self._table(satellite, start, offsets)
+            positions[i], velocities[i] = table.interpolate(shifted)
+            errors[i] = table.error_codes(shifted)
+        return errors, positions, velocities
+
+    def _table(self, satellite, start, offsets):
+        # The cached table covering `offsets` after `start` and the offsets
+        # shifted into it, rebuilt from `start` on a new TLE or when the
+        # query runs past the cached window
+        key = satellite.norad_id
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None and table.checksum == satellite.checksum:
+                shifted = offsets + (start - table.start).total_seconds()
+                if table.covers(shifted):
+                    self.hits += 1
+                    self._tables.move_to_end(key)
+                    return table, shifted
+            self.misses += 1
+
+        table = self._build(satellite, start)
+        if not table.covers(offsets):
+            raise ValueError(f"Requested offsets fall outside the {table.horizon} s ephemeris window")
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_entries:
+                self._tables.popitem(last=False)
+        return table, offsets
+
+    def invalidate(self, norad_id):
+        with self._lock:
+            self._tables.pop(str(norad_id).strip(), None)
+
+    def refresh(self, satellite):
+        """
+        Rebuild the cached table of `satellite` for a new element set over
+        the same window, so queries after a TLE refresh do not pay for the
+        rebuild. Satellites without a table are left alone.
+
+        Returns:
+            True if a table was rebuilt
+        """
+        with self._lock:
+            table = self._tables.get(satellite.norad_id)
+        if table is None or table.checksum == satellite.checksum:
+            return False
+        table = self._build(satellite, table.start)
+        with self._lock:
+            if satellite.norad_id in self._tables:
+                self._tables[satellite.norad_id] = table
+        return True
+
+    def stats(self):
+        with self._lock:
+            accuracy = {key: table.accuracy for key, table in self._tables.items()}
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(accuracy), 'accuracy': accuracy}
+
+
+default_ephemerides = EphemerisCache()
@@ -1,39 +1,201 @@
 import numpy as np
-from astropy import units as u
-from poliastro.bodies import Earth
-from poliastro.twobody import Orbit
-from poliastro.constants import GM_earth
 
-# Orbital elements
-mean_motion = 1.00270383 * np.pi * 2 * u.rad / u.day
-eccentricity = 0.0002945 * u.one
-raan = 206.8784 * u.deg
-inclination = 0.0135 * u.deg
-arg_perigee = 5.6523 * u.deg
-mean_anomaly = 96.6140 * u.deg
+GM_EARTH = 3.986004418e14  # m^3/s^2, same value as poliastro.constants.GM_earth
+MU_EARTH = GM_EARTH / 1e9  # km^3/s^2
 
 
-def get_orbit(mean_motion, eccentricity, raan, inclination, arg_perigee, mean_anomaly):
+# Orbital elements; astropy is only imported when they or get_orbit are used,
+# so the array functions below stay cheap to import
+def __getattr__(name):
+    from astropy import units as u
+
+    elements = {
+        'mean_motion': 1.00270383 * np.pi * 2 * u.rad / u.day,
+        'eccentricity': 0.0002945 * u.one,
+        'raan': 206.8784 * u.deg,
+        'inclination': 0.0135 * u.deg,
+        'arg_perigee': 5.6523 * u.deg,
+        'mean_anomaly': 96.6140 * u.deg,
+    }
+    if name not in elements:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals().update(elements)
+    return elements[name]
+
+
+def solve_kepler(mean_anomaly, eccentricity, tolerance=1e-12, max_iterations=50):
+    """
+    Solve Kepler's equation E - e sin(E) = M for arrays of M and e (radians)
+    with Newton's method.
+    """
+    mean_anomaly = np.asarray(mean_anomaly, dtype=np.float64)
+    eccentricity = np.broadcast_to(np.asarray(eccentricity, dtype=np.float64), mean_anomaly.shape)
+    E = np.where(eccentricity < 0.8, mean_anomaly, np.pi * np.ones_like(mean_anomaly))
+    for _ in range(max_iterations):
+        delta = (E - eccentricity * np.sin(E) - mean_anomaly) / (1 - eccentricity * np.cos(E))
+        E = E - delta
+        if np.max(np.abs(delta), initial=0.0) < tolerance:
+            break
+    return E
+
+
+def true_to_mean_anomaly(nu, eccentricity):
+    E = 2 * np.arctan2(np.sqrt(1 - eccentricity) * np.sin(nu / 2), np.sqrt(1 + eccentricity) * np.cos(nu / 2))
+    return E - eccentricity * np.sin(E)
+
+
+def perifocal_to_eci(raan, inclination, arg_perigee):
+    """
+    Rotation matrices R3(-raan) R1(-i) R3(-argp), shaped (..., 3, 3), that
+    take perifocal vectors into the inertial frame.
+    """
+    cO, sO = np.cos(raan), np.sin(raan)
+    ci, si = np.cos(inclination), np.sin(inclination)
+    cw, sw = np.cos(arg_perigee), np.sin(arg_perigee)
+    return np.stack([
+        np.stack([cO * cw - sO * sw * ci, -cO * sw - sO * cw * ci, sO * si], axis=-1),
+        np.stack([sO * cw + cO * sw * ci, -sO * sw + cO * cw * ci, -cO * si], axis=-1),
+        np.stack([sw * si, cw * si, ci], axis=-1),
+    ], axis=-2)
+
+
+def sample_orbits(semi_major_axis, eccentricity, inclination, raan, arg_perigee, nu, num_points=100):
+    """
+    Sample positions along many Keplerian orbits at once.
+
+    Points are spaced evenly in time over one period, starting from true
+    anomaly `nu`. Element arguments are floats or arrays of shape (K,) in km
+    and radians.
+
+    Returns:
+        (K, num_points, 3) float array of inertial positions in km
+    """
+    a, e, i, O, w, nu = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64))
+                                               for x in (semi_major_axis, eccentricity, inclination,
+                                                         raan, arg_perigee, nu)))
+    steps = np.linspace(0, 2 * np.pi, num_points)
+    M = true_to_mean_anomaly(nu, e)[:, np.newaxis] + steps
+    E = solve_kepler(M, e[:, np.newaxis])
+
+    # Perifocal coordinates, then a single rotation per orbit into ECI
+    x = a[:, np.newaxis] * (np.cos(E) - e[:, np.newaxis])
+    y = a[:, np.newaxis] * np.sqrt(1 - e[:, np.newaxis]**2) * np.sin(E)
+    perifocal = np.stack([x, y, np.zeros_like(x)], axis=-1)
+    return np.einsum('kij,knj->kni', perifocal_to_eci(O, i, w), perifocal)
+
+
+def elements_to_state(semi_major_axis, eccentricity, inclination, raan, arg_perigee, nu):
+    """
+    Position (km) and velocity (km/s) vectors from classical elements, for
+    arrays of K orbits at once.
+
+    Returns:
+        r, v each shaped (K, 3)
+    """
+    a, e, i, O, w, nu = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64))
+                                               for x in (semi_major_axis, eccentricity, inclination,
+                                                         raan, arg_perigee, nu)))
+    p = a * (1 - e**2)
+    r = p / (1 + e * np.cos(nu))
+    zeros = np.zeros_like(r)
+    r_perifocal = np.stack([r * np.cos(nu), r * np.sin(nu), zeros], axis=-1)
+    v_perifocal = np.stack([-np.sin(nu), e + np.cos(nu), zeros], axis=-1) * np.sqrt(MU_EARTH / p)[:, np.newaxis]
+    rotation = perifocal_to_eci(O, i, w)
+    return np.einsum('kij,kj->ki', rotation, r_perifocal), np.einsum('kij,kj->ki', rotation, v_perifocal)
+
+
+def propagate_states(r, v, dt):
+    """
+    Advance (K, 3) two-body state vectors by `dt` seconds (scalar or (K,))
+    with Lagrange f and g coefficients; orbits must be elliptical.
+    """
+    r0 = np.linalg.norm(r, axis=-1)
+    rv = np.einsum('ki,ki->k', r, v)
+    a = 1 / (2 / r0 - np.einsum('ki,ki->k', v, v) / MU_EARTH)
+    n = np.sqrt(MU_EARTH / a**3)
+
+    # Eccentric anomaly now, then after dt from Kepler's equation
+    e_cos = 1 - r0 / a
+    e_sin = rv / np.sqrt(MU_EARTH * a)
+    e = np.hypot(e_cos, e_sin)
+    E0 = np.arctan2(e_sin, e_cos)
+    E = solve_kepler(E0 - e_sin + n * dt, e)
+    dE = E - E0
+
+    f = 1 - a / r0 * (1 - np.cos(dE))
+    g = dt - (dE - np.sin(dE)) / n
+    r_new = f[:, np.newaxis] * r + g[:, np.newaxis] * v
+    r1 = np.linalg.norm(r_new, axis=-1)
+    f_dot = -np.sqrt(MU_EARTH * a) / (r1 * r0) * np.sin(dE)
+    g_dot = 1 - a / r1 * (1 - np.cos(dE))
+    return r_new, f_dot[:, np.newaxis] * r + g_dot[:, np.newaxis] * v
+
+
+def state_to_elements(r, v):
+    """
+    Classical elements of (K, 3) state vectors in km and km/s.
+
+    Returns:
+        semi-major axis (km), eccentricity, inclination, raan, argument of
+        perigee and true anomaly (radians), each shaped (K,)
+    """
+    h = np.cross(r, v)
+    r_norm = np.linalg.norm(r, axis=-1)
+    h_norm = np.linalg.norm(h, axis=-1)
+    node = np.stack([-h[:, 1], h[:, 0], np.zeros_like(h_norm)], axis=-1)
+    node_norm = np.linalg.norm(node, axis=-1)
+    e_vec = np.cross(v, h) / MU_EARTH - r / r_norm[:, np.newaxis]
+    e = np.linalg.norm(e_vec, axis=-1)
+
+    a = 1 / (2 / r_norm - np.einsum('ki,ki->k', v, v) / MU_EARTH)
+    i = np.arccos(np.clip(h[:, 2] / h_norm, -1, 1))
+    raan = np.arctan2(node[:, 1], node[:, 0]) % (2 * np.pi)
+    # Angles measured in the orbital plane from the node and from perigee
+    arg_perigee = np.arctan2(np.einsum('ki,ki->k', np.cross(node, e_vec), h) / h_norm,
+                             np.einsum('ki,ki->k', node, e_vec)) % (2 * np.pi)
+    nu = np.arctan2(np.einsum('ki,ki->k', np.cross(e_vec, r), h) / h_norm,
+                    np.einsum('ki,ki->k', e_vec, r)) % (2 * np.pi)
+    return a, e, i, raan, arg_perigee, nu
+
+
+def hohmann_delta_v(r1, r2):
+    """Total delta-v (km/s) of a Hohmann transfer between circular orbits of radii r1 and r2 (km)."""
+    r1, r2 = np.asarray(r1, dtype=np.float64), np.asarray(r2, dtype=np.float64)
+    transfer = (r1 + r2) / 2
+    first = np.abs(np.sqrt(MU_EARTH * (2 / r1 - 1 / transfer)) - np.sqrt(MU_EARTH / r1))
+    second = np.abs(np.sqrt(MU_EARTH / r2) - np.sqrt(MU_EARTH * (2 / r2 - 1 / transfer)))
+    return first + second
+
+
+def get_orbit(mean_motion, eccentricity, raan, inclination, arg_perigee, mean_anomaly, num_points=100):
+    from astropy import units as u
+
     # Calculate the semi-major axis from mean motion
     mean_motion_rad_s = mean_motion.to(u.rad / u.s).value
-    a_meters = (GM_earth.value / mean_motion_rad_s**2)**(1 / 3)  # No units yet
+    a_meters = (GM_EARTH / mean_motion_rad_s**2)**(1 / 3)  # No units yet
 
 # Apply units to the result
     a = (a_meters * u.m).to(u.km)
 
-# Create the orbit
-    orbit = Orbit.from_classical(
-        Earth, a, eccentricity, inclination, raan, arg_perigee, mean_anomaly)
+# Ellipse equation parameters in the orbital plane
+    e = eccentricity.to_value(u.one)
+    semi_minor_axis = (a * np.sqrt(1 - e**2)).value
 
-# Convert position in perifocal coordinates to ECI coordinates
-# We generate points along the orbit using true anomalies
-    num_points = 100
-    true_anomalies = np.linspace(0, 2 * np.pi, num_points) * u.rad
+# Sample one period, treating the last element as the initial true anomaly
+# like Orbit.from_classical did, with the unit attached once to the array
+    positions = sample_orbits(a.value, e, inclination.to_value(u.rad), raan.to_value(u.rad),
+                              arg_perigee.to_value(u.rad), mean_anomaly.to_value(u.rad), num_points)
+    return positions[0] * u.km, a, semi_minor_axis
 
-# Ellipse equation parameters in the orbital plane
-    semi_minor_axis = (a * np.sqrt(1 - eccentricity**2)).value
 
-# Print the equation of the ellipse in the orbital plane
+def get_orbit_poliastro(mean_motion, eccentricity, raan, inclination, arg_perigee, mean_anomaly, num_points=100):
+    # Reference implementation, one poliastro propagation per point
+    from astropy import units as u
+    from poliastro.bodies import Earth
+    from poliastro.twobody import Orbit
 
-# Get position points in ECI coordinates
+    a = ((GM_EARTH / mean_motion.to(u.rad / u.s).value**2)**(1 / 3) * u.m).to(u.km)
+    orbit = Orbit.from_classical(Earth, a, eccentricity, inclination, raan, arg_perigee, mean_anomaly)
+    true_anomalies = np.linspace(0, 2 * np.pi, num_points) * u.rad
+    semi_minor_axis = (a * np.sqrt(1 - eccentricity**2)).value
     return [orbit.propagate(nu / orbit.n).r for nu in true_anomalies], a, semi_minor_axis
@@ -0,0 +1,122 @@
+import numpy as np
+
+from propagation import propagate, time_grid
+
+# WGS-84 ellipsoid
+WGS84_A = 6378.137  # km, equatorial radius
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)  # First eccentricity squared
+WGS84_EP2 = WGS84_E2 / (1 - WGS84_E2)  # Second eccentricity squared
+
+EARTH_ROTATION_RATE = 7.292115146706979e-5  # rad/s
+
+
+def gmst(jd, fr):
+    """
+    Greenwich mean sidereal time in radians (IAU 1982, the model TEME is
+    defined against), for arrays of Julian date pairs as used by sgp4.
+    """
+    tut1 = ((np.asarray(jd, dtype=np.float64) - 2451545.0) + fr) / 36525.0
+    seconds = ((-6.2e-6 * tut1 + 0.093104) * tut1 + (876600.0 * 3600 + 8640184.812866)) * tut1 + 67310.54841
+    return np.mod(np.radians(seconds / 240.0), 2 * np.pi)
+
+
+def teme_to_ecef(positions, jd, fr, velocities=None):
+    """
+    Rotate TEME states into the Earth-fixed frame, ignoring polar motion.
+
+    Args:
+        positions: (..., n_times, 3) positions in km, e.g. (n_sats, n_times, 3)
+            from `propagate`
+        jd, fr: (n_times,) Julian date pairs of the samples
+        velocities: optional (..., n_times, 3) velocities in km/s
+
+    Returns:
+        ECEF positions, or (positions, velocities) when velocities are given
+    """
+    theta = gmst(jd, fr)
+    cos, sin = np.cos(theta), np.sin(theta)
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+
+    ecef = np.empty(np.shape(positions))
+    ecef[..., 0] = cos * x + sin * y
+    ecef[..., 1] = cos * y - sin * x
+    ecef[..., 2] = z
+    if velocities is None:
+        return ecef
+
+    # The frame rotates, so subtract omega x r as well as rotating v
+    vx, vy = velocities[..., 0], velocities[..., 1]
+    ecef_velocities = np.empty(np.shape(velocities))
+    ecef_velocities[..., 0] = cos * vx + sin * vy + EARTH_ROTATION_RATE * ecef[..., 1]
+    ecef_velocities[..., 1] = cos * vy - sin * vx - EARTH_ROTATION_RATE * ecef[..., 0]
+    ecef_velocities[..., 2] = velocities[..., 2]
+    return ecef, ecef_velocities
+
+
+def ecef_to_geodetic(positions):
+    """
+    Geodetic coordinates on the WGS-84 ellipsoid by Bowring's method. Two
+    iterations are accurate to well under a millimetre from the surface to
+    beyond geostationary altitude.
+
+    Args:
+        positions: (..., 3) ECEF positions in km
+
+    Returns:
+        (latitude, longitude, altitude), each shaped like positions[..., 0],
+        in degrees and km
+    """
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+    p = np.hypot(x, y)
+    longitude = np.arctan2(y, x)
+
+    # Bowring's iteration, carrying the parametric latitude beta and the
+    # latitude as unnormalised (sin, cos) pairs so each step is a square
+    # root instead of three trigonometric calls
+    sin_beta, cos_beta = z, (1 - WGS84_F) * p
+    for _ in range(2):
+        norm = np.hypot(sin_beta, cos_beta)
+        sin_beta, cos_beta = sin_beta / norm, cos_beta / norm
+        sin_lat = z + WGS84_EP2 * WGS84_B * sin_beta**3
+        cos_lat = p - WGS84_E2 * WGS84_A * cos_beta**3
+        sin_beta, cos_beta = (1 - WGS84_F) * sin_lat, cos_lat
+
+    latitude = np.arctan2(sin_lat, cos_lat)
+    norm = np.hypot(sin_lat, cos_lat)
+    sin_lat, cos_lat = sin_lat / norm, cos_lat / norm
+    altitude = p * cos_lat + z * sin_lat - WGS84_A * np.sqrt(1 - WGS84_E2 * sin_lat**2)
+    return np.degrees(latitude), np.degrees(longitude), altitude
+
+
+def geodetic_to_ecef(latitude, longitude, altitude=0.0):
+    """ECEF positions (..., 3) in km of WGS-84 latitudes and longitudes in degrees and altitudes in km."""
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+    radius = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat**2)  # Prime vertical radius of curvature
+    return np.stack([
+        (radius + altitude) * cos_lat * np.cos(longitude),
+        (radius + altitude) * cos_lat * np.sin(longitude),
+        (radius * (1 - WGS84_E2) + altitude) * sin_lat,
+    ], axis=-1)
+
+
+def teme_to_geodetic(positions, jd, fr):
+    """Latitude and longitude (degrees) and altitude (km) of TEME positions; see `teme_to_ecef`."""
+    return ecef_to_geodetic(teme_to_ecef(positions, jd, fr))
+
+
+def ground_tracks(satellites, start, horizon=5400, step=60):
+    """
+    Sub-satellite points of SatelliteRecords from `start` over `horizon`
+    seconds at `step`, one SGP4 call and one frame transform for all of them.
+
+    Returns:
+        (offsets, latitude, longitude, altitude, errors); the last four are
+        (n_sats, n_times) and NaN where propagation failed
+    """
+    offsets, jd, fr = time_grid(start, horizon, step)
+    errors, positions, _ = propagate(satellites, jd, fr)
+    latitude, longitude, altitude = teme_to_geodetic(positions, jd, fr)
+    return offsets, latitude, longitude, altitude, errors
@@ -1,32 +1,220 @@
-import random
-import csv
-
-risk_hte = []
-risk_hte_path = 'risk_hte.csv'
-train_risk = []
-val_risk = []
-train_risk_path = 'train_risk.csv'
-val_risk_path = 'val_risk.csv'
-
-for _ in range(100):
-    a = []
-    a.append(random.random())  # hohhman transfer
-    a.append(random.random())  # risk factor
-    a.append((a[0] * 4 * a[1] + a[0]) / 5)
-    risk_hte.append(a)
-    a = [random.random() for _ in range(10)]  # orbital elements
-    b = random.random()  # risk factor
-    train_risk.append(a)
-    val_risk.append([b])
-
-with open(risk_hte_path, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerows(risk_hte)
-
-with open(train_risk_path, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerows(train_risk)
-
-with open(val_risk_path, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerows(val_risk)
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from conjunction import MAX_RADIUS, MAX_RELATIVE_SPEED, MAX_TIME_OFFSET
+from equation import elements_to_state, hohmann_delta_v, propagate_states, state_to_elements
+
+THRESHOLD = 10.0  # km, screening threshold the miss distance is normalised by
+HARD_BODY_RADIUS = 0.02  # km
+MAX_MANEUVER_DELTA_V = 0.05  # km/s, normalisation of the Hohmann cost feature
+EARTH_RADIUS = 6378.137  # km
+
+RISK_COLUMNS = [f'feature{k}' for k in range(10)] + ['risk']
+HTE_COLUMNS = ['hohmann', 'risk', 'combined']
+
+
+def _rotate(vectors, axes, angles):
+    cos, sin = np.cos(angles)[:, np.newaxis], np.sin(angles)[:, np.newaxis]
+    dot = np.einsum('mi,mi->m', axes, vectors)[:, np.newaxis]
+    return vectors * cos + np.cross(axes, vectors) * sin + axes * dot * (1 - cos)
+
+
+def sample_encounters(rng, count):
+    """
+    Random close approaches between two objects in low Earth orbit.
+
+    The primary's elements are drawn at random and a secondary is placed
+    within the screening threshold of it on a crossing orbit. Both are then
+    propagated on two-body orbits to their actual time of closest approach,
+    so miss distance and relative speed are measured, not drawn.
+
+    Returns:
+        Dict of (count,) arrays describing each encounter
+    """
+    r1, v1 = elements_to_state(
+        EARTH_RADIUS + rng.uniform(300.0, 2000.0, count),
+        rng.uniform(0.0, 0.02, count),
+        np.arccos(rng.uniform(-1.0, 1.0, count)),
+        rng.uniform(0.0, 2 * np.pi, count),
+        rng.uniform(0.0, 2 * np.pi, count),
+        rng.uniform(0.0, 2 * np.pi, count),
+    )
+
+    # Secondary: displaced by up to the threshold, moving at a slightly
+    # different speed in a direction rotated about the local vertical
+    offset = rng.normal(size=(count, 3))
+    offset *= rng.uniform(0.0, THRESHOLD, (count, 1)) / np.linalg.norm(offset, axis=1, keepdims=True)
+    radial = r1 / np.linalg.norm(r1, axis=1, keepdims=True)
+    angles = rng.uniform(np.radians(5), np.radians(175), count) * rng.choice([-1.0, 1.0], count)
+    r2 = r1 + offset
+    v2 = _rotate(v1, radial, angles) * rng.uniform(0.98, 1.02, (count, 1))
+
+    # Two rounds of linear closest-approach prediction, each followed by an
+    # exact two-body propagation of both objects to the predicted time
+    for _ in range(2):
+        dr, dv = r2 - r1, v2 - v1
+        dt = -np.einsum('ki,ki->k', dr, dv) / np.einsum('ki,ki->k', dv, dv)
+        r1, v1 = propagate_states(r1, v1, dt)
+        r2, v2 = propagate_states(r2, v2, dt)
+
+    a1, e1, i1, _, _, _ = state_to_elements(r1, v1)
+    a2, e2, i2, _, _, _ = state_to_elements(r2, v2)
+    return {
+        'missDistance': np.linalg.norm(r2 - r1, axis=1),
+        'relativeSpeed': np.linalg.norm(v2 - v1, axis=1),
+        'timeOffset': rng.uniform(0.0, MAX_TIME_OFFSET, count),
+        'semiMajorAxis1': a1, 'semiMajorAxis2': a2,
+        'eccentricity1': e1, 'eccentricity2': e2,
+        'inclination1': i1, 'inclination2': i2,
+        'perigee': np.minimum(a1 * (1 - e1), a2 * (1 - e2)),
+    }
+
+
+def risk_rows(encounters):
+    """
+    (count, 11) float32 rows: the 10 features built like
+    conjunction.risk_features, then the risk target.
+
+    The target is the relative collision likelihood exp(-d^2 / 2 sigma^2) of
+    the miss distance d, with a position uncertainty sigma that grows with
+    the time to closest approach.
+    """
+    rows = np.empty((len(encounters['missDistance']), 11), dtype=np.float32)
+    rows[:, :10] = np.clip(np.stack([
+        encounters['missDistance'] / THRESHOLD,
+        encounters['relativeSpeed'] / MAX_RELATIVE_SPEED,
+        encounters['timeOffset'] / MAX_TIME_OFFSET,
+        encounters['semiMajorAxis1'] / MAX_RADIUS,
+        encounters['semiMajorAxis2'] / MAX_RADIUS,
+        encounters['eccentricity1'],
+        encounters['eccentricity2'],
+        encounters['inclination1'] / np.pi,
+        encounters['inclination2'] / np.pi,
+        encounters['perigee'] / MAX_RADIUS,
+    ], axis=1), 0.0, 1.0)
+    sigma = 0.1 + 2e-5 * encounters['timeOffset']  # km
+    miss = np.maximum(encounters['missDistance'] - HARD_BODY_RADIUS, 0.0)
+    rows[:, 10] = np.exp(-miss**2 / (2 * sigma**2))
+    return rows
+
+
+def hte_rows(rng, encounters, risk):
+    """
+    (count, 3) float32 rows of Hohmann cost, risk and combined score.
+
+    The cost is the delta-v of raising the primary's orbit (taken as
+    circular) clear of the encounter by a random margin, normalised by
+    MAX_MANEUVER_DELTA_V.
+    """
+    radius = encounters['semiMajorAxis1']
+    clearance = rng.uniform(1.0, 50.0, radius.shape)  # km
+    hohmann = np.clip(hohmann_delta_v(radius, radius + clearance) / MAX_MANEUVER_DELTA_V, 0.0, 1.0)
+    rows = np.empty((radius.size, 3), dtype=np.float32)
+    rows[:, 0] = hohmann
+    rows[:, 1] = risk
+    rows[:, 2] = (hohmann * 4 * risk + hohmann) / 5
+    return rows
+
+
+def _write(rows, path, columns, fmt):
+    if fmt == 'npy':
+        np.save(path + '.npy', rows)
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.table({name: rows[:, k] for k, name in enumerate(columns)}), path + '.parquet')
+
+
+def require_format(fmt):
+    """Fail before any worker starts when the output format's writer is not installed."""
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow, which is not installed: pip install pyarrow") from None
+
+
+def generate_chunk(task):
+    """Generate and write one chunk; run in a worker process."""
+    index, count, seed, output_dir, fmt = task
+    rng = np.random.default_rng(seed)
+    encounters = sample_encounters(rng, count)
+    risk = risk_rows(encounters)
+    hte = hte_rows(rng, encounters, risk[:, 10])
+    _write(risk, os.path.join(output_dir, 'risk', f'{index:05d}'), RISK_COLUMNS, fmt)
+    _write(hte, os.path.join(output_dir, 'hte', f'{index:05d}'), HTE_COLUMNS, fmt)
+    return index, count
+
+
+def write_csv(output_dir, chunks, fmt):
+    """
+    Concatenate the shards, in order, into the CSV files the original
+    generator produced: train_risk.csv (features), val_risk.csv (targets)
+    and risk_hte.csv.
+    """
+    def read(kind, index):
+        path = os.path.join(output_dir, kind, f'{index:05d}')
+        if fmt == 'npy':
+            return np.load(path + '.npy')
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path + '.parquet')
+        return np.stack([table[name].to_numpy() for name in table.column_names], axis=1)
+
+    with open(os.path.join(output_dir, 'train_risk.csv'), 'w') as features, \
+            open(os.path.join(output_dir, 'val_risk.csv'), 'w') as targets, \
+            open(os.path.join(output_dir, 'risk_hte.csv'), 'w') as hte:
+        for index in range(chunks):
+            risk = read('risk', index)
+            np.savetxt(features, risk[:, :10], delimiter=',', fmt='%.9g')
+            np.savetxt(targets, risk[:, 10:], delimiter=',', fmt='%.9g')
+            np.savetxt(hte, read('hte', index), delimiter=',', fmt='%.9g')
+
+
+def generate(rows, output_dir, chunk_rows=100000, workers=None, seed=0, fmt='npy', csv=False):
+    """
+    Generate `rows` samples into numbered shards under output_dir/risk and
+    output_dir/hte.
+
+    Every chunk gets its own child of one SeedSequence, so the output only
+    depends on `seed` and `chunk_rows`, not on how many workers ran.
+    """
+    require_format(fmt)
+    for kind in ('risk', 'hte'):
+        os.makedirs(os.path.join(output_dir, kind), exist_ok=True)
+    chunks = -(-rows // chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    tasks = [(index, min(chunk_rows, rows - index * chunk_rows), seeds[index], output_dir, fmt)
+             for index in range(chunks)]
+    with Pool(workers) as pool:
+        for _ in pool.imap_unordered(generate_chunk, tasks):
+            pass
+    if csv:
+        write_csv(output_dir, chunks, fmt)
+    return chunks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic conjunction data for the risk models")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--output-dir', default='data/synthetic')
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['npy', 'parquet'], default='npy')
+    parser.add_argument('--csv', action='store_true', help="Also write train_risk.csv, val_risk.csv and risk_hte.csv")
+    args = parser.parse_args()
+    try:
+        require_format(args.format)
+    except ImportError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    chunks = generate(args.rows, args.output_dir, args.chunk_rows, args.workers, args.seed, args.format, args.csv)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {args.rows} rows in {chunks} chunks to {args.output_dir} in {elapsed:.1f} s")
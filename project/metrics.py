@@ -0,0 +1,160 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Default latency buckets in seconds, 1 ms to 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram with cumulative counts, in the same
+    shape as a Prometheus histogram.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """Cumulative counts per upper bound (the last one is '+Inf'), plus the count and sum."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {'buckets': cumulative, 'count': running, 'sum': total}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+def _labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class MetricsRegistry:
+    """
+    Named histograms and counters, keyed by name and labels, rendered in the
+    Prometheus text exposition format.
+
+    Values that live elsewhere (cache hit counts, upstream calls) are read at
+    scrape time through collectors rather than copied on every update.
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()  # (name, labels) -> metric
+        self._meta = {}  # name -> (type, help)
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help_text, labels, factory):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = factory()
+                self._meta.setdefault(name, (kind, help_text))
+            return metric
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        return self._get('histogram', name, help_text, labels, lambda: Histogram(buckets))
+
+    def counter(self, name, help_text, **labels):
+        return self._get('counter', name, help_text, labels, Counter)
+
+    def register(self, name, help_text, histogram, **labels):
+        """Expose an existing Histogram, e.g. one owned by a service object."""
+        return self._get('histogram', name, help_text, labels, lambda: histogram)
+
+    def collector(self, name, help_text, kind, collect):
+        """
+        Add values computed at scrape time; `collect` returns a list of
+        (labels dict, value) pairs.
+        """
+        with self._lock:
+            self._collectors.append((name, help_text, kind, collect))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.items())
+            meta = dict(self._meta)
+            collectors = list(self._collectors)
+
+        # Samples of one metric must be contiguous, whenever their labels were first seen
+        order = {name: position for position, name in enumerate(meta)}
+        metrics.sort(key=lambda item: order[item[0][0]])
+
+        lines = []
+        seen = set()
+        for (name, labels), metric in metrics:
+            if name not in seen:
+                seen.add(name)
+                kind, help_text = meta[name]
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            if isinstance(metric, Counter):
+                lines.append(f'{name}{_labels(labels)} {metric.value}')
+                continue
+            snapshot = metric.snapshot()
+            for bound, count in snapshot['buckets'].items():
+                lines.append(f'{name}_bucket{_labels(labels, ("le", bound))} {count}')
+            lines.append(f'{name}_sum{_labels(labels)} {snapshot["sum"]}')
+            lines.append(f'{name}_count{_labels(labels)} {snapshot["count"]}')
+
+        for name, help_text, kind, collect in collectors:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for labels, value in collect():
+                lines.append(f'{name}{_labels(sorted(labels.items()))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """
+    Times the stages of one request, recording each into the
+    api_stage_seconds histogram and keeping the breakdown for a
+    Server-Timing header.
+    """
+
+    def __init__(self, endpoint, registry=None):
+        self.endpoint = endpoint
+        self.registry = registry or default_metrics
+        self.durations = OrderedDict()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed
+            self.registry.histogram('api_stage_seconds', 'Time spent in each stage of an API request',
+                                    endpoint=self.endpoint, stage=name).observe(elapsed)
+
+    def server_timing(self):
+        return ', '.join(f'{name};dur={seconds * 1e3:.3f}' for name, seconds in self.durations.items())
+
+
+default_metrics = MetricsRegistry()
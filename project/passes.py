@@ -0,0 +1,274 @@
+import math
+
+import numpy as np
+from sgp4.api import SatrecArray
+
+from frames import WGS84_A, geodetic_to_ecef, teme_to_ecef
+from propagation import sample_count, start_jday
+
+# Slack on the inclination/altitude prefilter: osculating elements drift from
+# the mean elements in the TLE, and geodetic and geocentric latitude differ
+PREFILTER_MARGIN = np.radians(1.0)
+
+
+class GroundStation:
+    """A ground station on the WGS-84 ellipsoid; angles in degrees, altitude in km."""
+
+    def __init__(self, name, latitude, longitude, altitude=0.0, min_elevation=0.0):
+        self.name = name
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.altitude = float(altitude)
+        self.min_elevation = float(min_elevation)
+
+
+def _station_geometry(stations):
+    # ECEF positions and local up, east and north unit vectors, each (n_stations, 3)
+    latitude = np.array([station.latitude for station in stations])
+    longitude = np.array([station.longitude for station in stations])
+    positions = geodetic_to_ecef(latitude, longitude, np.array([station.altitude for station in stations]))
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+    sin_lon, cos_lon = np.sin(longitude), np.cos(longitude)
+    up = np.stack([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat], axis=1)
+    east = np.stack([-sin_lon, cos_lon, np.zeros_like(sin_lon)], axis=1)
+    north = np.stack([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat], axis=1)
+    return positions, up, east, north
+
+
+def visibility_candidates(satellites, stations):
+    """
+    Which satellites can ever rise above each station's elevation mask.
+
+    A satellite at most at its apogee radius r is seen above elevation e
+    only within the Earth central angle arccos(R cos(e) / r) - e of its
+    sub-satellite point, and that point never goes beyond the latitude of
+    the orbit's inclination. Pairs outside both bounds are skipped.
+
+    Returns:
+        (n_sats, n_stations) boolean array
+    """
+    inclination = np.array([satellite.inclination for satellite in satellites])
+    apogee = np.array([satellite.apogee for satellite in satellites])
+    latitude = np.radians([station.latitude for station in stations])
+    mask = np.radians([station.min_elevation for station in stations])
+
+    max_latitude = np.minimum(inclination, np.pi - inclination)[:, np.newaxis]
+    cos_reach = WGS84_A * np.cos(mask)[np.newaxis, :] / apogee[:, np.newaxis]
+    reach = np.arccos(np.clip(cos_reach, -1.0, 1.0)) - mask[np.newaxis, :]
+    return (cos_reach < 1) & (np.abs(latitude)[np.newaxis, :] <= max_latitude + reach + PREFILTER_MARGIN)
+
+
+def _sin_elevation(positions, station_positions, up):
+    """
+    Sine of the elevation of every (satellite, time) ECEF position from every
+    station, as (n_sats, n_stations, n_times), using matrix products rather
+    than forming the (n_sats, n_times, n_stations, 3) line-of-sight vectors.
+    """
+    dot_up = positions @ up.T
+    dot_station = positions @ station_positions.T
+    squared = np.einsum('stk,stk->st', positions, positions)[:, :, np.newaxis]
+    ranges = np.sqrt(squared - 2 * dot_station + np.einsum('kj,kj->k', station_positions, station_positions))
+    heights = dot_up - np.einsum('kj,kj->k', station_positions, up)
+    return (heights / ranges).transpose(0, 2, 1)
+
+
+def _runs(above, values):
+    """
+    Find the runs of consecutive True samples along the last axis.
+
+    Args:
+        above: (n_pairs, n_times) boolean array
+        values: (n_pairs, n_times) array whose largest sample is located in each run
+
+    Returns:
+        (pair, first, end, peak) index arrays: the run covers samples
+        first..end-1 and values peaks at sample `peak`
+    """
+    # Rises (+1) and sets (-1) alternate along each row, starting with a rise
+    edges = np.diff(np.pad(above, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, columns = np.nonzero(edges)
+    pair, first, end = rows[::2], columns[::2], columns[1::2]
+    if not pair.size:
+        return pair, first, end, first
+
+    # Gather every sample of every run into one flat array, then find the
+    # first sample in each run equal to the run's maximum
+    lengths = end - first
+    run_start = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    n_times = above.shape[1]
+    sample = np.repeat(pair * n_times + first - run_start, lengths) + np.arange(lengths.sum())
+    run_values = values.reshape(-1)[sample]
+    run_of = np.repeat(np.arange(pair.size), lengths)
+    hits = np.flatnonzero(run_values == np.maximum.reduceat(run_values, run_start)[run_of])
+    peak = sample[hits[np.unique(run_of[hits], return_index=True)[1]]] - pair * n_times
+    return pair, first, end, peak
+
+
+def _elevation(line_of_sight, velocities, up):
+    """
+    Sine of elevation and its rate of change (1/s) of (n, 3) ECEF
+    line-of-sight vectors and velocities, with the stations' (n, 3) up vectors.
+    """
+    ranges = np.sqrt(np.einsum('ij,ij->i', line_of_sight, line_of_sight))
+    height = np.einsum('ij,ij->i', line_of_sight, up)
+    rate = (np.einsum('ij,ij->i', velocities, up)
+            - height * np.einsum('ij,ij->i', line_of_sight, velocities) / ranges**2) / ranges
+    return height / ranges, rate
+
+
+def _azimuth(line_of_sight, east, north):
+    # Degrees clockwise from north
+    return np.degrees(np.mod(np.arctan2(np.einsum('ij,ij->i', line_of_sight, east),
+                                        np.einsum('ij,ij->i', line_of_sight, north)), 2 * np.pi))
+
+
+def _hermite(coefficients, s, step):
+    # Cubic Hermite value and derivative at fraction s of a `step` second segment
+    c0, c1, c2, c3 = coefficients
+    s = s[:, np.newaxis]
+    return c0 + s * (c1 + s * (c2 + s * c3)), (c1 + s * (2 * c2 + s * 3 * c3)) / step
+
+
+def _chunk_passes(positions, velocities, candidates, sin_mask, geometry, offsets, step, tolerance):
+    """
+    Passes of one chunk of satellites, from ECEF states (n_sats, n_times, 3)
+    on the coarse grid.
+
+    Rises and sets are bracketed between grid samples and the maximum
+    elevation between the peak sample and the neighbour the elevation rate
+    points to. Each bracket is one grid segment, bisected on a cubic Hermite
+    interpolation of the sampled positions and velocities, which over a
+    minute of a low orbit is good to well under a metre, so no further SGP4
+    calls are needed.
+    """
+    station_positions, up, east, north = geometry
+    n_stations, count = len(sin_mask), offsets.size
+    # Single precision is plenty for finding the brackets, and halves the memory
+    sin_elevation = _sin_elevation(positions.astype(np.float32), station_positions.astype(np.float32),
+                                   up.astype(np.float32))
+    above = (sin_elevation >= sin_mask[:, np.newaxis]) & candidates[:, :, np.newaxis]
+    pair, rise, end, peak = _runs(above.reshape(-1, count), sin_elevation.reshape(-1, count))
+    sats, station_index = pair // n_stations, pair % n_stations
+    n = pair.size
+
+    peak_sin, peak_rate = _elevation(positions[sats, peak] - station_positions[station_index],
+                                     velocities[sats, peak], up[station_index])
+    segment = np.concatenate([
+        np.maximum(rise - 1, 0),
+        np.minimum(end - 1, count - 2),
+        np.clip(np.where(peak_rate >= 0, peak, peak - 1), 0, count - 2),
+    ])
+    problem_sats = np.tile(sats, 3)
+    problem_stations = np.tile(station_index, 3)
+    problem_up = up[problem_stations]
+
+    # Line of sight over each segment as a cubic in the segment fraction
+    p0 = positions[problem_sats, segment] - station_positions[problem_stations]
+    p1 = positions[problem_sats, segment + 1] - station_positions[problem_stations]
+    m0 = velocities[problem_sats, segment] * step
+    m1 = velocities[problem_sats, segment + 1] * step
+    coefficients = (p0, m0, 3 * (p1 - p0) - 2 * m0 - m1, 2 * (p0 - p1) + m0 + m1)
+
+    # AOS brackets go from below to above the mask, LOS ones the other way,
+    # and TCA ones from rising to setting elevation
+    problem_mask = sin_mask[problem_stations]
+    rising = np.arange(3 * n) < n
+    on_rate = np.arange(3 * n) >= 2 * n
+    lo, hi = np.zeros(3 * n), np.ones(3 * n)
+    for _ in range(max(1, math.ceil(math.log2(step / tolerance)))):
+        middle = 0.5 * (lo + hi)
+        sin_middle, rate = _elevation(*_hermite(coefficients, middle, step), problem_up)
+        f = np.where(on_rate, rate, sin_middle - problem_mask)
+        before = (f >= 0) == rising
+        hi = np.where(before, middle, hi)
+        lo = np.where(before, lo, middle)
+    fraction = 0.5 * (lo + hi)
+
+    # Passes already in progress at the start, or still at the end, keep
+    # the window's edge
+    fraction[:n][rise == 0] = 0.0
+    fraction[n:2 * n][end == count] = 1.0
+    times = offsets[segment] + fraction * step
+    line_of_sight, line_velocity = _hermite(coefficients, fraction, step)
+    sin_final, _ = _elevation(line_of_sight, line_velocity, problem_up)
+    azimuth = _azimuth(line_of_sight[:2 * n], east[problem_stations[:2 * n]], north[problem_stations[:2 * n]])
+
+    # A TCA that could not be bracketed (at the window's edge) falls back to the peak sample
+    tca = times[2 * n:]
+    coarse_better = peak_sin > sin_final[2 * n:]
+    tca[coarse_better] = offsets[peak[coarse_better]]
+    max_sin = np.maximum(peak_sin, sin_final[2 * n:])
+    return sats, station_index, times[:n], tca, times[n:2 * n], max_sin, azimuth[:n], azimuth[n:]
+
+
+def predict_passes(satellites, stations, start, horizon=86400, step=60, tolerance=0.1, chunk_size=256):
+    """
+    Predict passes of SatelliteRecords over GroundStations.
+
+    Pairs that fail `visibility_candidates` are skipped. The remaining
+    satellites are propagated `chunk_size` at a time on a coarse `step`
+    grid, their elevations from every station computed at once, and every
+    rise, set and maximum bracketed on the grid is bisected to `tolerance`
+    seconds (see `_chunk_passes`).
+
+    A pass entirely between two grid samples is missed, so `step` should be
+    shorter than the briefest pass of interest. Passes already in progress
+    at `start`, or still in progress after `horizon`, are cut at the window.
+
+    Returns:
+        List of dicts with 'noradId', 'station', 'aos', 'tca', 'los'
+        (datetimes), 'duration' (s), 'maxElevation' and 'aosAzimuth',
+        'losAzimuth' (degrees), ordered by AOS
+    """
+    count = sample_count(horizon, step)
+    if count < 2:
+        raise ValueError("horizon must be at least one step")
+    if not satellites or not stations:
+        return []
+    jd0, fr0 = start_jday(start)
+    offsets = np.arange(count, dtype=np.float64) * step
+    jd = np.full(count, jd0)
+    fr = fr0 + offsets / 86400.0
+
+    geometry = _station_geometry(stations)
+    sin_mask = np.sin(np.radians([station.min_elevation for station in stations]))
+    candidates = visibility_candidates(satellites, stations)
+    visible = np.flatnonzero(candidates.any(axis=1))
+
+    found = []
+    for first in range(0, visible.size, chunk_size):
+        chunk = visible[first:first + chunk_size]
+        _, positions, velocities = SatrecArray([satellites[i].satrec for i in chunk]).sgp4(jd, fr)
+        positions, velocities = teme_to_ecef(positions, jd, fr, velocities)
+        passes = _chunk_passes(positions, velocities, candidates[chunk], sin_mask, geometry, offsets, step, tolerance)
+        found.append((chunk[passes[0]],) + passes[1:])
+    if not found:
+        return []
+    sats, station_index, aos, tca, los, max_sin, aos_azimuth, los_azimuth = (
+        np.concatenate(column) for column in zip(*found))
+
+    order = np.lexsort((station_index, sats, aos))
+    epoch = np.datetime64(start.replace(tzinfo=None), 'us')
+
+    def datetimes(seconds):
+        return (epoch + np.rint(seconds[order] * 1e6).astype('timedelta64[us]')).tolist()
+
+    names = [station.name for station in stations]
+    return [
+        {
+            'noradId': satellites[sat].norad_id,
+            'station': names[k],
+            'aos': a,
+            'tca': t,
+            'los': l,
+            'duration': duration,
+            'maxElevation': elevation,
+            'aosAzimuth': aos_az,
+            'losAzimuth': los_az,
+        }
+        for sat, k, a, t, l, duration, elevation, aos_az, los_az in zip(
+            sats[order].tolist(), station_index[order].tolist(), datetimes(aos), datetimes(tca), datetimes(los),
+            (los - aos)[order].tolist(), np.degrees(np.arcsin(np.clip(max_sin, -1.0, 1.0)))[order].tolist(),
+            aos_azimuth[order].tolist(), los_azimuth[order].tolist())
+    ]
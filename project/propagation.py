@@ -0,0 +1,113 @@
+import numpy as np
+from sgp4.api import SatrecArray, jday
+
+# Upper bound on samples per satellite for one propagation window
+# (24 hours at a 1 second step)
+MAX_SAMPLES = 86401
+
+# Streamed windows never hold more than one chunk, so they may be longer
+# (30 days at a 1 second step)
+MAX_STREAM_SAMPLES = 30 * 86400 + 1
+
+
+def start_jday(start):
+    """Julian date pair (jd, fr) of a datetime, keeping sub-second precision."""
+    return jday(start.year, start.month, start.day,
+                start.hour, start.minute, start.second + start.microsecond / 1e6)
+
+
+def sample_count(horizon, step, limit=MAX_SAMPLES):
+    if step <= 0 or horizon < 0:
+        raise ValueError("horizon must be non-negative and step positive")
+    count = int(horizon // step) + 1
+    if count > limit:
+        raise ValueError(f"Requested {count} samples, the limit is {limit}")
+    return count
+
+
+def time_grid(start, horizon, step):
+    """
+    Build the Julian date arrays for `start` plus every `step` seconds up to
+    and including `horizon` seconds later.
+
+    Returns:
+        (offsets, jd, fr) where offsets are seconds from `start`
+    """
+    count = sample_count(horizon, step)
+    jd0, fr0 = start_jday(start)
+    offsets = np.arange(count, dtype=np.float64) * step
+    jd = np.full(count, jd0)
+    fr = fr0 + offsets / 86400.0
+    return offsets, jd, fr
+
+
+def propagate(satellites, jd, fr):
+    """
+    Propagate SatelliteRecords at every (jd, fr) epoch in one SGP4 call.
+
+    Returns:
+        errors (n_sats, n_times), positions and velocities (n_sats, n_times, 3)
+        in km and km/s in the TEME frame
+    """
+    satrecs = SatrecArray([satellite.satrec for satellite in satellites])
+    return satrecs.sgp4(jd, fr)
+
+
+def propagate_samples(satrecs, index, jd, fr):
+    """
+    Propagate satrecs[index[k]] at (jd[k], fr[k]) for every k, with one
+    array call per distinct satellite.
+
+    Returns:
+        positions and velocities (len(index), 3) in km and km/s in the TEME
+        frame, NaN where propagation failed
+    """
+    positions = np.empty((index.size, 3))
+    velocities = np.empty((index.size, 3))
+    order = np.argsort(index, kind='stable')
+    satellites, first = np.unique(index[order], return_index=True)
+    for sat, rows in zip(satellites.tolist(), np.split(order, first[1:])):
+        errors, r, v = satrecs[sat].sgp4_array(jd[rows], fr[rows])
+        failed = errors != 0
+        r[failed] = np.nan
+        v[failed] = np.nan
+        positions[rows] = r
+        velocities[rows] = v
+    return positions, velocities
+
+
+def propagate_window(satellites, start, horizon=600, step=60):
+    """
+    Propagate SatelliteRecords from `start` over `horizon` seconds at `step`.
+
+    Returns:
+        (offsets, positions, velocities, errors) as from `time_grid` and
+        `propagate`
+    """
+    offsets, jd, fr = time_grid(start, horizon, step)
+    errors, positions, velocities = propagate(satellites, jd, fr)
+    return offsets, positions, velocities, errors
+
+
+def propagate_chunks(satellites, start, horizon, step, chunk_size=1024):
+    """
+    Generator over a propagation window `chunk_size` samples at a time, so
+    memory stays flat however long the window is.
+
+    Yields:
+        (offsets, positions, velocities, errors) for each chunk, shaped as
+        from `propagate_window`
+    """
+    count = sample_count(horizon, step, MAX_STREAM_SAMPLES)
+    jd0, fr0 = start_jday(start)
+    satrecs = SatrecArray([satellite.satrec for satellite in satellites])
+
+    for first in range(0, count, chunk_size):
+        offsets = np.arange(first, min(first + chunk_size, count), dtype=np.float64) * step
+        errors, positions, velocities = satrecs.sgp4(np.full(offsets.size, jd0), fr0 + offsets / 86400.0)
+        yield offsets, positions, velocities, errors
+
+
+def positions_to_dicts(positions):
+    """Convert an (n_times, 3) array to the API's list of {'x','y','z'} dicts."""
+    return [{'x': x, 'y': y, 'z': z} for x, y, z in positions.tolist()]
@@ -0,0 +1,144 @@
+import argparse
+import glob
+import itertools
+import os
+
+import numpy as np
+
+FEATURES = 10  # Timesteps of the risk model input, one feature each
+COLUMNS = FEATURES + 1  # Stored rows are the features followed by the risk target
+
+
+def _data_lines(f):
+    # Blank lines (e.g. a trailing newline) are not rows
+    return (line for line in f if line.strip())
+
+
+def read_csv_chunks(features_path, targets_path, chunk_rows=65536):
+    """
+    Stream the feature and target CSV files side by side.
+
+    Yields:
+        (rows, 11) float32 arrays of features followed by the target
+    """
+    with open(features_path, 'r') as features, open(targets_path, 'r') as targets:
+        feature_rows, target_rows = _data_lines(features), _data_lines(targets)
+        while True:
+            feature_lines = list(itertools.islice(feature_rows, chunk_rows))
+            target_lines = list(itertools.islice(target_rows, chunk_rows))
+            if not feature_lines and not target_lines:
+                return
+            if len(feature_lines) != len(target_lines):
+                raise ValueError(f"{features_path} and {targets_path} have different numbers of rows")
+            chunk = np.empty((len(feature_lines), COLUMNS), dtype=np.float32)
+            chunk[:, :FEATURES] = np.loadtxt(feature_lines, delimiter=',', ndmin=2, dtype=np.float32)
+            chunk[:, FEATURES:] = np.loadtxt(target_lines, delimiter=',', ndmin=2, dtype=np.float32)
+            yield chunk
+
+
+def convert_csv(features_path, targets_path, destination, chunk_rows=65536):
+    """
+    Convert the CSV pair into a single .npy file without holding it in memory:
+    rows are counted first and each chunk is written into a memory map.
+    """
+    with open(features_path, 'r') as f:
+        count = sum(1 for _ in _data_lines(f))
+    array = np.lib.format.open_memmap(destination, mode='w+', dtype=np.float32, shape=(count, COLUMNS))
+    row = 0
+    for chunk in read_csv_chunks(features_path, targets_path, chunk_rows):
+        array[row:row + len(chunk)] = chunk
+        row += len(chunk)
+    if row != count:
+        raise ValueError(f"Expected {count} rows in {features_path}, read {row}")
+    array.flush()
+    return destination
+
+
+class ShardedArray:
+    """Read-only row access across several memory-mapped (rows, 11) .npy shards."""
+
+    def __init__(self, paths):
+        self.shards = [np.load(path, mmap_mode='r') for path in paths]
+        for path, shard in zip(paths, self.shards):
+            if shard.ndim != 2 or shard.shape[1] != COLUMNS:
+                raise ValueError(f"{path} has shape {shard.shape}, expected (rows, {COLUMNS})")
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        # `index` is a sorted array of row numbers, as produced by `batches`
+        index = np.asarray(index)
+        rows = np.empty((index.size, COLUMNS), dtype=np.float32)
+        shard_of = np.searchsorted(self.offsets, index, side='right') - 1
+        for shard in np.unique(shard_of):
+            selected = shard_of == shard
+            rows[selected] = self.shards[shard][index[selected] - self.offsets[shard]]
+        return rows
+
+
+def open_rows(path):
+    """
+    Rows from a single .npy file or from a directory of .npy shards, memory
+    mapped so only the batches being read are paged in.
+    """
+    if os.path.isdir(path):
+        paths = sorted(glob.glob(os.path.join(path, '*.npy')))
+        if not paths:
+            raise FileNotFoundError(f"No .npy shards in {path}")
+        return ShardedArray(paths)
+    return ShardedArray([path])
+
+
+def split_indices(count, val_fraction=0.1, seed=0):
+    """Random, disjoint train and validation row indices."""
+    order = np.random.default_rng(seed).permutation(count)
+    val_count = int(round(count * val_fraction))
+    return np.sort(order[val_count:]), np.sort(order[:val_count])
+
+
+def batches(rows, indices, batch_size, shuffle=False, rng=None):
+    """
+    Yield (features, targets) batches shaped (batch, 10, 1) and (batch, 1).
+
+    Indices within a batch are sorted before the gather, so reads from the
+    memory map stay as sequential as the shuffle allows.
+    """
+    if shuffle:
+        indices = (rng or np.random.default_rng()).permutation(indices)
+    for start in range(0, len(indices), batch_size):
+        batch = rows[np.sort(indices[start:start + batch_size])]
+        yield batch[:, :FEATURES, np.newaxis], batch[:, FEATURES:]
+
+
+def make_dataset(rows, indices, batch_size=32, shuffle=False, seed=None):
+    """
+    A batched tf.data pipeline over `rows`, reshuffled every epoch and
+    prefetched so reading the next batch overlaps with the training step.
+    """
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed)
+    dataset = tf.data.Dataset.from_generator(
+        lambda: batches(rows, indices, batch_size, shuffle, rng),
+        output_signature=(
+            tf.TensorSpec([None, FEATURES, 1], tf.float32),
+            tf.TensorSpec([None, 1], tf.float32),
+        ),
+    )
+    # The generator's length is known, so Keras need not discover it in epoch one
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-len(indices) // batch_size)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert the risk CSV files into a memory-mappable .npy file")
+    parser.add_argument('features', help="Feature CSV, e.g. data/train_risk.csv")
+    parser.add_argument('targets', help="Target CSV, e.g. data/val_risk.csv")
+    parser.add_argument('destination', help="Output .npy file")
+    parser.add_argument('--chunk-rows', type=int, default=65536)
+    args = parser.parse_args()
+
+    convert_csv(args.features, args.targets, args.destination, args.chunk_rows)
+    print(f"Stored {len(open_rows(args.destination))} rows in {args.destination}")
@@ -1,8 +1,11 @@
-import csv
-import numpy as np
+import argparse
+import os
+
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 
+from risk_data import FEATURES, convert_csv, make_dataset, open_rows, split_indices
+
 
 def create_rnn(input_shape):
     model = Sequential()
@@ -28,27 +31,34 @@ def create_rnn(input_shape):
     return model
 
 
-input_shape = (10, 1)  # 10 timesteps with 1 feature per timestep
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the conjunction risk model")
+    parser.add_argument('--data', help="Memory-mappable .npy file or directory of .npy shards; "
+                                       "converted from the CSV files when missing")
+    parser.add_argument('--features', default='./data/train_risk.csv')
+    parser.add_argument('--targets', default='./data/val_risk.csv')
+    parser.add_argument('--val-fraction', type=float, default=0.1)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    input_shape = (FEATURES, 1)  # 10 timesteps with 1 feature per timestep
 
-X_train = []
-with open('./data/train_risk.csv', 'r') as f:
-    reader = csv.reader(f)
-    for row in reader:
-        X_train.append([float(x) for x in row])
-y_train = []
-with open('./data/val_risk.csv', 'r') as f:
-    reader = csv.reader(f)
-    for row in reader:
-        y_train.append([float(x) for x in row])
+    # Stream the CSV files into a .npy once, then train from the memory map
+    data_path = args.data or os.path.splitext(args.features)[0] + '.npy'
+    if not os.path.exists(data_path):
+        convert_csv(args.features, args.targets, data_path)
+    rows = open_rows(data_path)
 
-X_train = np.array(X_train)
-y_train = np.array(y_train)
-X_val = np.array(X_train[:100])
-y_val = np.array(y_train[:100])
+    # Held-out validation rows are disjoint from the training rows
+    train_indices, val_indices = split_indices(len(rows), args.val_fraction, args.seed)
+    train_dataset = make_dataset(rows, train_indices, args.batch_size, shuffle=True, seed=args.seed)
+    val_dataset = make_dataset(rows, val_indices, args.batch_size)
 
-model = create_rnn(input_shape)
+    model = create_rnn(input_shape)
 
-model.summary()
+    model.summary()
 
-model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=50, batch_size=32)
-model.save('risk_factor.keras')
+    model.fit(train_dataset, validation_data=val_dataset, epochs=args.epochs)
+    model.save('risk_factor.keras')
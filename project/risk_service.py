@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from conjunction import risk_features
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def load_keras_model(source):
+    """
+    Load a Keras v3 model from a path or from the archive's bytes. The
+    checked-in models are .keras archives renamed to .keras.zip, which Keras
+    refuses by extension, so anything else is loaded through a temporary copy.
+    """
+    from tensorflow.keras.models import load_model
+
+    if isinstance(source, str) and source.endswith('.keras'):
+        return load_model(source)
+    with tempfile.TemporaryDirectory() as directory:
+        copy = os.path.join(directory, 'model.keras')
+        if isinstance(source, bytes):
+            with open(copy, 'wb') as f:
+                f.write(source)
+        else:
+            shutil.copyfile(source, copy)
+        return load_model(copy)
+
+
+class _Pending:
+    __slots__ = ('rows', 'result', 'error', 'done')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Gathers rows submitted by concurrent callers into one model call.
+
+    A worker thread takes the first waiting request, then keeps collecting
+    until `max_batch_size` rows are queued or `max_wait` seconds have passed,
+    runs `predict` once on the concatenated rows and hands each caller its
+    slice of the output.
+    """
+
+    def __init__(self, predict, max_batch_size=256, max_wait=0.005):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.latency = Histogram()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name='risk-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, rows):
+        """
+        Block until `rows` have been scored and return their predictions.
+        Submissions over `max_batch_size` rows are queued as several slices,
+        so no model call exceeds it.
+        """
+        started = time.perf_counter()
+        slices = [_Pending(rows[first:first + self.max_batch_size])
+                  for first in range(0, max(len(rows), 1), self.max_batch_size)]
+        with self._ready:
+            self._queue.extend(slices)
+            self._ready.notify()
+        for pending in slices:
+            pending.done.wait()
+        self.latency.observe(time.perf_counter() - started)
+        for pending in slices:
+            if pending.error is not None:
+                raise pending.error
+        if len(slices) == 1:
+            return slices[0].result
+        return np.concatenate([pending.result for pending in slices])
+
+    def _collect(self):
+        with self._ready:
+            while not self._queue:
+                self._ready.wait()
+            batch = [self._queue.popleft()]
+            count = len(batch[0].rows)
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch_size:
+                if not self._queue:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._ready.wait(remaining):
+                        break
+                    continue
+                if count + len(self._queue[0].rows) > self.max_batch_size:
+                    break
+                batch.append(self._queue.popleft())
+                count += len(batch[-1].rows)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                rows = np.concatenate([pending.rows for pending in batch])
+                self.batch_sizes.observe(len(rows))
+                output = self.predict(rows)
+                first = 0
+                for pending in batch:
+                    pending.result = output[first:first + len(pending.rows)]
+                    first += len(pending.rows)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self):
+        return {'latencySeconds': self.latency.snapshot(), 'batchSize': self.batch_sizes.snapshot()}
+
+
+class RiskScorer:
+    """
+    Scores conjunctions with the risk_factor model and combines the risk with
+    the manoeuvre cost through the risk_vs_hohhman model.
+
+    Both models are loaded once, from paths or archive bytes; every call
+    goes through a shared `MicroBatcher`, so concurrent requests run as one
+    batched forward pass.
+    """
+
+    def __init__(self, risk_model_path='risk_factor.keras.zip', hohmann_model_path='risk_vs_hohhman.keras.zip',
+                 max_batch_size=256, max_wait=0.005):
+        import tensorflow as tf
+
+        self.risk_model = load_keras_model(risk_model_path)
+        self.hohmann_model = load_keras_model(hohmann_model_path)
+
+        # One traced graph for both models; only the batch dimension varies
+        @tf.function(input_signature=[tf.TensorSpec([None, 11], tf.float32)])
+        def predict(rows):
+            risk = self.risk_model(rows[:, :10, tf.newaxis], training=False)
+            combined = self.hohmann_model(tf.concat([rows[:, 10:], risk], axis=1), training=False)
+            return tf.concat([risk, combined], axis=1)
+
+        self._predict = predict
+        self.batcher = MicroBatcher(lambda rows: self._predict(rows).numpy(), max_batch_size, max_wait)
+
+    def score(self, features, hohmann_costs=None):
+        """
+        Args:
+            features: (n, 10) or (n, 10, 1) risk model inputs
+            hohmann_costs: (n,) normalised transfer costs in [0, 1]; zero if omitted
+
+        Returns:
+            (risk_factors, combined_risks), each a float array of shape (n,)
+        """
+        features = np.asarray(features, dtype=np.float32).reshape(-1, 10)
+        rows = np.zeros((features.shape[0], 11), dtype=np.float32)
+        rows[:, :10] = features
+        if hohmann_costs is not None:
+            rows[:, 10] = hohmann_costs
+        if not len(rows):
+            return np.empty(0), np.empty(0)
+        output = self.batcher.submit(rows)
+        return output[:, 0], output[:, 1]
+
+    def score_conjunctions(self, conjunctions, satellites, threshold=10.0):
+        """Score conjunction dicts from screening; `hohmannCost` is read from each dict when present."""
+        costs = [conjunction.get('hohmannCost', 0.0) for conjunction in conjunctions]
+        return self.score(risk_features(conjunctions, satellites, threshold), costs)
+
+    def stats(self):
+        return self.batcher.stats()
@@ -0,0 +1,95 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from sgp4.api import Satrec
+
+from tle_cache import tle_epoch
+
+
+def tle_checksum(tle_line1, tle_line2):
+    """CRC32 of both TLE lines, used to tell element sets apart."""
+    return zlib.crc32(f"{tle_line1.strip()}\n{tle_line2.strip()}".encode())
+
+
+class SatelliteRecord:
+    """
+    A parsed TLE: the compiled `Satrec` plus constants derived from it once.
+
+    Distances are in km and the period in minutes.
+    """
+
+    def __init__(self, norad_id, tle_line1, tle_line2, checksum=None):
+        self.norad_id = str(norad_id).strip()
+        self.tle_line1 = tle_line1.strip()
+        self.tle_line2 = tle_line2.strip()
+        self.checksum = tle_checksum(tle_line1, tle_line2) if checksum is None else checksum
+        self.satrec = Satrec.twoline2rv(self.tle_line1, self.tle_line2)
+        self.epoch = tle_epoch(self.tle_line1)
+
+        earth_radius = self.satrec.radiusearthkm
+        self.eccentricity = self.satrec.ecco
+        self.inclination = self.satrec.inclo  # radians
+        self.mean_motion = self.satrec.no_kozai  # radians per minute
+        self.period = 2 * np.pi / self.mean_motion
+        self.semi_major_axis = self.satrec.a * earth_radius
+        self.semi_minor_axis = self.semi_major_axis * np.sqrt(1 - self.eccentricity**2)
+        self.perigee = self.semi_major_axis * (1 - self.eccentricity)
+        self.apogee = self.semi_major_axis * (1 + self.eccentricity)
+
+
+class SatelliteRegistry:
+    """
+    Cache of `SatelliteRecord` objects keyed by NORAD ID and TLE checksum.
+
+    A lookup with the same TLE as the stored record is a hit; a new element
+    set for a known NORAD ID replaces the old record.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, norad_id, tle_line1, tle_line2):
+        key = str(norad_id).strip()
+        checksum = tle_checksum(tle_line1, tle_line2)
+
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record.checksum == checksum:
+                self.hits += 1
+                self._records.move_to_end(key)
+                return record
+            self.misses += 1
+
+        # Parse outside the lock; a duplicate parse under a race is harmless
+        record = SatelliteRecord(key, tle_line1, tle_line2, checksum)
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+        return record
+
+    def get_tle(self, norad_id, tle_data):
+        """Look up a record from the raw two-line text returned by n2yo."""
+        tle_line1, tle_line2 = tle_data.strip().splitlines()
+        return self.get(norad_id, tle_line1, tle_line2)
+
+    def peek(self, norad_id):
+        with self._lock:
+            return self._records.get(str(norad_id).strip())
+
+    def discard(self, norad_id):
+        with self._lock:
+            self._records.pop(str(norad_id).strip(), None)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._records)}
+
+
+default_registry = SatelliteRegistry()
@@ -0,0 +1,38 @@
+# The satellite API as one importable package. Nothing heavy is imported
+# here: TensorFlow is only loaded by the risk endpoints, on first use.
+from flask import Flask
+from flask_cors import CORS
+
+from service.conjunctions import conjunctions_api, start_screening
+from service.monitoring import monitoring_api
+from service.passes import passes_api
+from service.positions import positions_api
+from service.risk import preload_models, risk_api
+from service.tracks import tracks_api
+from service.tles import get_catalog, start_refresher
+
+
+def preload():
+    """
+    Load shared read-only state before a preforking server (e.g. gunicorn
+    --preload) forks its workers: the TLE catalog and the risk model archives.
+    """
+    get_catalog()
+    preload_models()
+
+
+def create_app(preload_state=False):
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(conjunctions_api)
+    app.register_blueprint(monitoring_api)
+    app.register_blueprint(positions_api)
+    app.register_blueprint(passes_api)
+    app.register_blueprint(risk_api)
+    app.register_blueprint(tracks_api)
+    # Started lazily in each process, so they run in a preforking server's workers
+    app.before_request(start_refresher)
+    app.before_request(start_screening)
+    if preload_state:
+        preload()
+    return app
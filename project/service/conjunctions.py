@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+
+from conjunction import ConjunctionScreening
+from service.tles import get_catalog, get_catalog_registry, get_refresher
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process screens for itself
+    fcntl = None
+
+SCREENING_HORIZON = 86400  # seconds
+SCREENING_STEP = 60  # seconds
+SCREENING_THRESHOLD = 10.0  # km
+SCREENING_MAX_AGE = 6 * 3600  # Rescreen from scratch once the window has slid this far
+MAX_CONJUNCTIONS = 10000  # Conjunctions per /api/conjunctions response
+SCREENING_RETRY_INTERVAL = 60  # seconds before retrying a failed screening build
+SCREENING_PUBLISH_INTERVAL = 60  # seconds between checks for refresher updates to publish
+
+conjunctions_api = Blueprint('conjunctions', __name__)
+
+_screening = None
+_screening_error = None
+_screening_thread = None
+_screening_lock = threading.Lock()
+_published = (None, None)  # (mtime_ns, results) of the results file last read
+
+
+def screening_path(suffix):
+    """
+    Lock or results file shared by the processes screening the catalog in
+    TLE_CATALOG, in SCREENING_DIR (default: the temporary directory).
+    """
+    catalog = os.path.abspath(os.environ.get('TLE_CATALOG', ''))
+    name = f"conjunctions-{hashlib.sha1(catalog.encode('utf-8')).hexdigest()[:12]}{suffix}"
+    return os.path.join(os.environ.get('SCREENING_DIR') or tempfile.gettempdir(), name)
+
+
+def get_screening():
+    """
+    Latest published screening of the whole local catalog, as the
+    /api/conjunctions response without the limit, or None until the first
+    one has been built. Results whose window has ended, e.g. left by an
+    earlier run, are ignored.
+    """
+    global _published
+    path = screening_path('.json')
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _screening_lock:
+        if _published[0] != mtime:
+            with open(path, 'r') as f:
+                _published = (mtime, json.load(f))
+        results = _published[1]
+    end = datetime.fromisoformat(results['start'].rstrip('Z')) + timedelta(seconds=results['horizon'])
+    return results if datetime.utcnow() < end else None
+
+
+def start_screening():
+    """
+    Start this process's screening thread when there is a local catalog.
+
+    Screening the catalog takes seconds and its position store grows with
+    catalog x window, so one process, the holder of a lock file, builds it
+    off the request path, keeps it current through its TLE refresher and
+    publishes the results to a file every worker serves. The others retry
+    the lock in case the holder exits. Called before every request, as
+    threads do not survive a preforking server's fork.
+    """
+    global _screening_thread
+    if _screening_thread is None and get_catalog() is not None:
+        with _screening_lock:
+            if _screening_thread is None:
+                _screening_thread = threading.Thread(target=_screen, name='conjunction-screening', daemon=True)
+                _screening_thread.start()
+    # The refresher may start after a screening has been built
+    refresher = get_refresher()
+    if refresher is not None and refresher.screening is None:
+        refresher.screening = _screening
+
+
+def _screen():
+    lock = open(screening_path('.lock'), 'a')
+    while fcntl is not None:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(SCREENING_RETRY_INTERVAL)
+    _build_screenings()
+
+
+def _build_screenings():
+    # Rebuild from scratch once the window has slid SCREENING_MAX_AGE, and
+    # republish whenever the refresher has updated the screening
+    global _screening, _screening_error
+    while True:
+        try:
+            screening = ConjunctionScreening(get_catalog().records(get_catalog_registry()), datetime.utcnow(),
+                                             SCREENING_HORIZON, SCREENING_STEP, SCREENING_THRESHOLD)
+        except Exception as e:
+            _screening_error = str(e)
+            time.sleep(SCREENING_RETRY_INTERVAL)
+            continue
+        _screening, _screening_error = screening, None
+        refresher = get_refresher()
+        if refresher is not None:
+            refresher.screening = screening
+
+        published = None
+        while (datetime.utcnow() - screening.start).total_seconds() < SCREENING_MAX_AGE:
+            if screening.version != published:
+                published = screening.version
+                try:
+                    _publish(screening)
+                except OSError as e:
+                    _screening_error, published = f"Publishing the screening failed: {e}", None
+            time.sleep(SCREENING_PUBLISH_INTERVAL)
+
+
+def _publish(screening):
+    # Write the results to a temporary file and rename it into place, so
+    # readers never see a partial file
+    conjunctions = screening.conjunctions(MAX_CONJUNCTIONS)
+    for conjunction in conjunctions:
+        # Screening refines every conjunction to its time of closest approach
+        conjunction['tca'] = (screening.start + timedelta(seconds=conjunction['timeOffset'])).isoformat() + 'Z'
+    results = {'start': screening.start.isoformat() + 'Z', 'horizon': screening.horizon,
+               'step': screening.step, 'threshold': screening.threshold,
+               'satellites': len(screening), 'conjunctions': conjunctions}
+
+    path = screening_path('.json')
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(results, f)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+@conjunctions_api.route('/api/conjunctions', methods=['GET'])
+def get_conjunctions():
+    try:
+        limit = request.args.get('limit', 100, type=int)
+        if not 0 < limit <= MAX_CONJUNCTIONS:
+            return jsonify({'error': f'limit must be between 1 and {MAX_CONJUNCTIONS}'}), 400
+
+        if get_catalog() is None:
+            return jsonify({'error': 'Conjunction screening requires a local TLE catalog'}), 503
+        screening = get_screening()
+        if screening is None:
+            # The first screening is still being built in the background
+            response = jsonify({'status': 'warming', 'error': _screening_error})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+
+        return jsonify(dict(screening, conjunctions=screening['conjunctions'][:limit]))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
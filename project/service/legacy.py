@@ -0,0 +1,26 @@
+# Helpers with the signatures of the per-app modules the service replaced
+# (integrate.py, backend_project/tle_data.py), taking TLE text and an n2yo key,
+# for callers written against those modules
+from satellite_registry import SatelliteRecord
+from service import positions, tles
+from tle_client import client_for
+
+
+# Function to fetch TLE data; without an API key it is looked up like the
+# service does, from the local catalog first
+def fetch_tle_data(norad_id, api_key=None):
+    if api_key is None:
+        return tles.fetch_tle_data(norad_id)
+    return client_for(api_key).fetch(norad_id)
+
+# Function to calculate satellite position from the two TLE lines
+def calculate_position(tle_line1, tle_line2, timestamp):
+    return positions.calculate_position(_record(tle_line1, tle_line2), timestamp)
+
+# Function to get the orbital equation from the two TLE lines
+def get_orbital_equation(tle_line1, tle_line2):
+    return positions.get_orbital_equation(_record(tle_line1, tle_line2))
+
+def _record(tle_line1, tle_line2):
+    # The NORAD ID is columns 3-7 of line 1
+    return SatelliteRecord(tle_line1[2:7], tle_line1, tle_line2)
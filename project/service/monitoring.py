@@ -0,0 +1,68 @@
+import time
+
+from flask import Blueprint, Response, g, request
+
+from metrics import StageTimer, default_metrics
+from satellite_registry import default_registry
+from service.tles import get_refresher
+from tle_cache import default_cache
+from tle_client import default_client
+
+monitoring_api = Blueprint('monitoring', __name__)
+
+
+def register_collectors():
+    # Counters kept by the shared client, cache and registry are read when /metrics is scraped
+    default_metrics.collector('tle_upstream_calls_total', 'Requests sent to n2yo, including retries', 'counter',
+                              lambda: [({}, default_client.upstream_calls)])
+    default_metrics.collector('tle_cache_lookups_total', 'TLE cache lookups by result', 'counter',
+                              lambda: [({'result': 'hit'}, default_cache.hits),
+                                       ({'result': 'miss'}, default_cache.misses)])
+    default_metrics.collector('satellite_registry_lookups_total', 'Parsed TLE record lookups by result', 'counter',
+                              lambda: [({'result': 'hit'}, default_registry.hits),
+                                       ({'result': 'miss'}, default_registry.misses)])
+    default_metrics.collector('tle_refresh_total', 'Background TLE refreshes by result', 'counter',
+                              refresh_counts)
+    default_metrics.collector('tle_refresh_queue_depth', 'Satellites waiting for a background refresh', 'gauge',
+                              refresh_queue_depth)
+
+
+# Functions to read the background refresher's counters, empty when it is not running
+def refresh_counts():
+    refresher = get_refresher()
+    return [({'result': result}, count) for result, count in refresher.counts.items()] if refresher else []
+
+def refresh_queue_depth():
+    refresher = get_refresher()
+    return [({}, refresher.stats()['queued'])] if refresher else []
+
+
+register_collectors()
+
+# Function to tell whether the caller asked for a per-stage timing breakdown
+def profiling_requested():
+    return request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+
+@monitoring_api.before_app_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    g.timer = StageTimer(request.endpoint or 'unknown')
+
+@monitoring_api.after_app_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.started
+    endpoint = request.endpoint or 'unknown'
+    default_metrics.histogram('api_request_seconds', 'API request latency until the response is returned',
+                              endpoint=endpoint).observe(elapsed)
+    default_metrics.counter('api_requests_total', 'API requests by endpoint and status',
+                            endpoint=endpoint, status=response.status_code).inc()
+    if profiling_requested():
+        # Server-Timing is shown by browser dev tools next to the request
+        stages = g.timer.server_timing()
+        total = f'total;dur={elapsed * 1e3:.3f}'
+        response.headers['Server-Timing'] = f'{stages}, {total}' if stages else total
+    return response
+
+@monitoring_api.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(default_metrics.render(), mimetype='text/plain; version=0.0.4')
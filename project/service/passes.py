@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+
+from passes import GroundStation, predict_passes
+from service.tles import get_catalog, get_catalog_registry, lookup_tles, parse_tles
+
+MAX_STATIONS = 100  # Ground stations per /api/passes request
+MAX_PASS_HORIZON = 7 * 86400  # seconds
+
+passes_api = Blueprint('passes', __name__)
+
+# Function to build GroundStations from the request, raising ValueError on bad input
+def parse_stations(stations, min_elevation):
+    parsed = []
+    for index, station in enumerate(stations):
+        latitude = float(station['latitude'])
+        longitude = float(station['longitude'])
+        elevation = float(station.get('minElevation', min_elevation))
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 360:
+            raise ValueError(f"Station {index} has an invalid latitude or longitude")
+        if not 0 <= elevation < 90:
+            raise ValueError(f"Station {index} has an invalid minElevation")
+        parsed.append(GroundStation(station.get('name', f'station{index}'), latitude, longitude,
+                                    float(station.get('altitude', 0.0)), elevation))
+    return parsed
+
+@passes_api.route('/api/passes', methods=['POST'])
+def get_passes():
+    try:
+        data = request.json
+        stations = data.get('stations', [])
+        if not stations:
+            return jsonify({'error': 'stations must be a non-empty list'}), 400
+        if len(stations) > MAX_STATIONS:
+            return jsonify({'error': f'At most {MAX_STATIONS} stations per request'}), 400
+        try:
+            stations = parse_stations(stations, float(data.get('minElevation', 0.0)))
+        except KeyError as e:
+            return jsonify({'error': f'Invalid station: {e} is required'}), 400
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid station: {e}'}), 400
+
+        horizon = float(data.get('horizon', 86400))
+        step = float(data.get('step', 60))
+        if not 0 < step <= horizon <= MAX_PASS_HORIZON:
+            return jsonify({'error': f'step must be positive and horizon between step and '
+                                     f'{MAX_PASS_HORIZON} seconds'}), 400
+
+        # Named satellites, or everything in the local catalog
+        norad_ids = data.get('noradIds')
+        errors = {}
+        if norad_ids:
+            tles, errors = lookup_tles(list(dict.fromkeys(str(norad_id).strip() for norad_id in norad_ids)))
+            satellites = parse_tles(tles, errors)
+        else:
+            catalog = get_catalog()
+            if catalog is None:
+                return jsonify({'error': 'noradIds is required when no local TLE catalog is configured'}), 400
+            satellites = catalog.records(get_catalog_registry())
+
+        current_time = datetime.utcnow()
+        passes = predict_passes(satellites, stations, current_time, horizon, step)
+        for contact in passes:
+            for key in ('aos', 'tca', 'los'):
+                contact[key] = contact[key].isoformat() + 'Z'
+
+        return jsonify({'start': current_time.isoformat() + 'Z', 'satellites': len(satellites),
+                        'passes': passes, 'errors': errors})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
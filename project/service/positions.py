@@ -0,0 +1,295 @@
+import json
+from datetime import datetime
+
+import numpy as np
+from flask import Blueprint, Response, g, request, jsonify
+from sgp4.api import jday
+
+from ephemeris import default_ephemerides
+from propagation import (propagate_window, propagate_chunks, positions_to_dicts, sample_count, time_grid,
+                         MAX_STREAM_SAMPLES)
+from satellite_registry import default_registry
+from service.tles import lookup_tles, parse_tles
+from tle_cache import cache_key
+from trajectory_format import ENCODINGS, MIMETYPE, compress, encode_trajectory
+
+MAX_BATCH_SIZE = 500  # Satellites per /api/positions/batch request
+MAX_BATCH_SAMPLES = 500000  # Satellites x samples per batch request; larger windows can be streamed
+MAX_CHUNK_SIZE = 3600  # Samples per streamed trajectory chunk
+MAX_CHUNK_SAMPLES = 36000  # Satellites x samples per streamed chunk, about 10 MB as Python lists
+EPHEMERIS_MIN_SAMPLES = 500  # Samples per satellite from which ephemeris tables beat SGP4
+
+positions_api = Blueprint('positions', __name__)
+
+# Function to calculate satellite position from a parsed SatelliteRecord
+def calculate_position(satellite, timestamp):
+    # Convert the timestamp to Julian date
+    jd, fr = jday(timestamp.year, timestamp.month, timestamp.day,
+                  timestamp.hour, timestamp.minute, timestamp.second)
+
+    # Compute the satellite's position (x, y, z) in kilometers
+    error_code, position, _ = satellite.satrec.sgp4(jd, fr)
+
+    if error_code == 0:
+        x, y, z = position
+        return {'x': x, 'y': y, 'z': z}
+    else:
+        raise Exception(f"Error in satellite position calculation: {error_code}")
+
+# Function to get the orbital equation (using a simplified approximation)
+def get_orbital_equation(satellite):
+    # Semi-major and semi-minor axes (km) are derived once when the TLE is parsed
+    return f"(x / {satellite.semi_major_axis:.2f})^2 + (y / {satellite.semi_minor_axis:.2f})^2 = 1"
+
+# Function to check a window against a budget of satellites x samples,
+# returning an error message or None
+def check_sample_budget(satellite_count, horizon, step, limit):
+    try:
+        samples = sample_count(horizon, step)
+    except ValueError as e:
+        return str(e)
+    if satellite_count * samples > limit:
+        return (f'{satellite_count} satellites x {samples} samples exceeds the limit of {limit} per request; '
+                'use /api/trajectory/stream for larger windows')
+    return None
+
+# Function to tell whether to interpolate a window from the shared ephemeris
+# tables instead of SGP4. Interpolation only pays off on dense windows (below a
+# few hundred samples per satellite SGP4 is faster) of satellites looked up
+# repeatedly, so one-off lookups stay on exact SGP4. Windows are held to half
+# a table, so a table keeps answering lookups that start up to that much later
+def use_ephemerides(satellites, start, horizon, step):
+    if horizon > default_ephemerides.horizon / 2 or len(satellites) > default_ephemerides.max_entries:
+        return False
+    count = sample_count(horizon, step, MAX_STREAM_SAMPLES)
+    if count < EPHEMERIS_MIN_SAMPLES:
+        return False
+    return default_ephemerides.admit(satellites, start, np.arange(count, dtype=np.float64) * step)
+
+# Function to propagate a window like propagate_window, interpolating from the
+# shared ephemeris tables for dense repeated lookups
+def propagate_positions(satellites, start, horizon, step):
+    if not use_ephemerides(satellites, start, horizon, step):
+        return propagate_window(satellites, start, horizon, step)
+    offsets, _, _ = time_grid(start, horizon, step)
+    errors, positions, velocities = default_ephemerides.propagate(satellites, start, offsets)
+    return offsets, positions, velocities, errors
+
+# Function to yield a window chunk_size samples at a time like propagate_chunks,
+# from the shared ephemeris tables for dense repeated lookups
+def trajectory_chunks(satellites, start, horizon, step, chunk_size):
+    if not use_ephemerides(satellites, start, horizon, step):
+        yield from propagate_chunks(satellites, start, horizon, step, chunk_size)
+        return
+    count = sample_count(horizon, step, MAX_STREAM_SAMPLES)
+    for first in range(0, count, chunk_size):
+        offsets = np.arange(first, min(first + chunk_size, count), dtype=np.float64) * step
+        errors, positions, velocities = default_ephemerides.propagate(satellites, start, offsets)
+        yield offsets, positions, velocities, errors
+
+# Function to check whether the client asked for the binary trajectory format;
+# JSON stays the default, including for Accept: */*
+def binary_requested():
+    return request.accept_mimetypes.best_match(['application/json', MIMETYPE]) == MIMETYPE
+
+# Function to build a binary trajectory response, compressed when the client accepts it
+def trajectory_response(positions, start, step, norad_ids, metadata, encoding):
+    body, content_encoding = compress(encode_trajectory(positions, start, step, norad_ids, metadata, encoding),
+                                      request.accept_encodings)
+    response = Response(body, mimetype=MIMETYPE)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
+
+@positions_api.route('/api/positions', methods=['POST'])
+def get_positions():
+    try:
+        data = request.json
+        try:
+            sat1_id = cache_key(data.get('sat1Id'))
+            sat2_id = cache_key(data.get('sat2Id'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        binary = binary_requested()
+        encoding = data.get('encoding', 'float32')
+        if binary and encoding not in ENCODINGS:
+            return jsonify({'error': f"encoding must be one of {', '.join(ENCODINGS)}"}), 400
+
+        # Fetch TLE data for two satellites concurrently
+        with g.timer.stage('fetch'):
+            tles, errors = lookup_tles([sat1_id, sat2_id])
+        if errors:
+            raise Exception(next(iter(errors.values())))
+        tle_data_sat1 = tles[sat1_id]
+        tle_data_sat2 = tles[sat2_id]
+
+        # Parse the TLE data, reusing records for element sets seen before
+        with g.timer.stage('parse'):
+            sat1 = default_registry.get_tle(sat1_id, tle_data_sat1)
+            sat2 = default_registry.get_tle(sat2_id, tle_data_sat2)
+
+        # Define the current time and the window (seconds) for future positions
+        current_time = datetime.utcnow()
+        horizon = float(data.get('horizon', 600))  # Next 10 minutes by default
+        step = float(data.get('step', 60))  # Increment by 1 minute
+
+        # Propagate both satellites over the whole window, from cached tables when they fit
+        with g.timer.stage('propagate'):
+            _, positions, _, errors = propagate_positions([sat1, sat2], current_time, horizon, step)
+            if errors.any():
+                raise Exception(f"Error in satellite position calculation: {errors[errors != 0][0]}")
+
+        # Get the orbital equations
+        with g.timer.stage('equation'):
+            orbital_equation_sat1 = get_orbital_equation(sat1)
+            orbital_equation_sat2 = get_orbital_equation(sat2)
+
+        # Return the positions and orbital equations, packed or as JSON
+        with g.timer.stage('serialize'):
+            if binary:
+                return trajectory_response(positions, current_time, step, [sat1.norad_id, sat2.norad_id], {
+                    'orbitalEquations': {sat1.norad_id: orbital_equation_sat1, sat2.norad_id: orbital_equation_sat2},
+                }, encoding)
+
+            response = jsonify({
+                'currentPositionSat1': positions_to_dicts(positions[0, :1])[0],
+                'currentPositionSat2': positions_to_dicts(positions[1, :1])[0],
+                'futurePositionsSat1': positions_to_dicts(positions[0, 1:]),
+                'futurePositionsSat2': positions_to_dicts(positions[1, 1:]),
+                'orbitalEquationSat1': orbital_equation_sat1,
+                'orbitalEquationSat2': orbital_equation_sat2
+            })
+            response.vary.add('Accept')
+            return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@positions_api.route('/api/positions/batch', methods=['POST'])
+def get_batch_positions():
+    try:
+        data = request.json
+        norad_ids = list(dict.fromkeys(str(norad_id).strip() for norad_id in data.get('noradIds', [])))
+
+        if not norad_ids:
+            return jsonify({'error': 'noradIds must be a non-empty list'}), 400
+        if len(norad_ids) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} satellites per request'}), 400
+
+        binary = binary_requested()
+        encoding = data.get('encoding', 'float32')
+        if binary and encoding not in ENCODINGS:
+            return jsonify({'error': f"encoding must be one of {', '.join(ENCODINGS)}"}), 400
+
+        # The window (seconds) for future positions, checked before any TLE is fetched
+        horizon = float(data.get('horizon', 600))
+        step = float(data.get('step', 60))
+        error = check_sample_budget(len(norad_ids), horizon, step, MAX_BATCH_SAMPLES)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Fetch TLE data concurrently; cached satellites return immediately
+        tles, errors = lookup_tles(norad_ids)
+        satellites = parse_tles(tles, errors)
+        current_time = datetime.utcnow()
+
+        positions = np.empty((0, sample_count(horizon, step), 3))
+        succeeded = []
+        if satellites:
+            # Propagate every satellite over the whole window, from cached tables when they fit
+            _, positions, _, error_codes = propagate_positions(satellites, current_time, horizon, step)
+            for i, satellite in enumerate(satellites):
+                failed = error_codes[i][error_codes[i] != 0]
+                if failed.size:
+                    errors[satellite.norad_id] = f"Error in satellite position calculation: {failed[0]}"
+                else:
+                    succeeded.append(i)
+
+        if binary:
+            return trajectory_response(positions[succeeded], current_time, step,
+                                       [satellites[i].norad_id for i in succeeded], {
+                'orbitalEquations': {satellites[i].norad_id: get_orbital_equation(satellites[i]) for i in succeeded},
+                'errors': errors,
+            }, encoding)
+
+        results = {}
+        for i in succeeded:
+            results[satellites[i].norad_id] = {
+                'currentPosition': positions_to_dicts(positions[i, :1])[0],
+                'futurePositions': positions_to_dicts(positions[i, 1:]),
+                'orbitalEquation': get_orbital_equation(satellites[i]),
+            }
+
+        response = jsonify({'satellites': results, 'errors': errors})
+        response.vary.add('Accept')
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Function to convert a state array to nested lists, with failed samples as null
+def states_to_lists(states):
+    if np.isfinite(states).all():
+        return states.tolist()
+    return np.where(np.isfinite(states), states, None).tolist()
+
+# Generator of encoded trajectory chunks; the WSGI server only pulls the next
+# chunk once the previous one has been written, which gives us backpressure
+def generate_trajectory(satellites, errors, start, horizon, step, chunk_size, sse):
+    def encode(event, payload):
+        if sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(dict(payload, event=event)) + "\n"
+
+    norad_ids = [satellite.norad_id for satellite in satellites]
+    yield encode('meta', {'start': start.isoformat() + 'Z', 'step': step, 'satellites': norad_ids, 'errors': errors})
+    try:
+        if satellites:
+            for offsets, positions, velocities, _ in trajectory_chunks(satellites, start, horizon, step, chunk_size):
+                yield encode('chunk', {
+                    'offsets': offsets.tolist(),
+                    'positions': dict(zip(norad_ids, states_to_lists(positions))),
+                    'velocities': dict(zip(norad_ids, states_to_lists(velocities))),
+                })
+        yield encode('end', {})
+    except Exception as e:
+        yield encode('error', {'error': str(e)})
+
+@positions_api.route('/api/trajectory/stream', methods=['GET', 'POST'])
+def stream_trajectory():
+    try:
+        # EventSource can only issue GET requests, so accept query parameters too
+        if request.method == 'POST':
+            data = request.json
+            norad_ids = data.get('noradIds', [])
+        else:
+            data = request.args
+            norad_ids = data.get('noradIds', '').split(',')
+        norad_ids = list(dict.fromkeys(str(norad_id).strip() for norad_id in norad_ids if str(norad_id).strip()))
+
+        if not norad_ids:
+            return jsonify({'error': 'noradIds must be a non-empty list'}), 400
+        if len(norad_ids) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} satellites per request'}), 400
+
+        horizon = float(data.get('horizon', 86400))
+        step = float(data.get('step', 10))
+        # Chunks of many satellites get fewer samples, so one chunk's lists stay bounded
+        chunk_size = min(max(int(data.get('chunkSize', 360)), 1), MAX_CHUNK_SIZE,
+                         max(MAX_CHUNK_SAMPLES // len(norad_ids), 1))
+        sample_count(horizon, step, MAX_STREAM_SAMPLES)
+
+        tles, errors = lookup_tles(norad_ids)
+        satellites = parse_tles(tles, errors)
+
+        sse = data.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream'
+        lines = generate_trajectory(satellites, errors, datetime.utcnow(), horizon, step, chunk_size, sse)
+        response = Response(lines, mimetype='text/event-stream' if sse else 'application/x-ndjson')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
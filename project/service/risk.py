@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+import numpy as np
+from flask import Blueprint, request, jsonify
+
+from metrics import default_metrics
+from service.tles import conjunction_satellites
+
+MAX_RISK_ROWS = 10000  # Conjunctions per /api/risk request
+SCORER_RETRY_INTERVAL = 60  # seconds before retrying models that failed to load
+
+risk_api = Blueprint('risk', __name__)
+
+_archives = {}
+_scorer = None
+_scorer_error = None
+_scorer_failed_at = None
+_scorer_lock = threading.Lock()
+
+
+def model_paths():
+    return (os.environ.get('RISK_MODEL', 'risk_factor.keras.zip'),
+            os.environ.get('HOHMANN_MODEL', 'risk_vs_hohhman.keras.zip'))
+
+
+def preload_models():
+    """
+    Read both model archives into memory without importing TensorFlow.
+
+    TensorFlow is not fork-safe once it has run, so a preforking server can
+    only share the archive bytes; each worker builds the models from them on
+    its first risk request.
+    """
+    for path in model_paths():
+        try:
+            with open(path, 'rb') as f:
+                _archives[path] = f.read()
+        except OSError:
+            pass  # Reported by get_scorer when the models are first needed
+
+
+def get_scorer():
+    """
+    The shared RiskScorer, created on first use so TensorFlow is only
+    imported by workers that score risk. A failed load is reported for
+    SCORER_RETRY_INTERVAL seconds and then retried, so the service recovers
+    once the models become available.
+
+    Returns:
+        (scorer, error) where scorer is None if the models could not be loaded
+    """
+    global _scorer, _scorer_error, _scorer_failed_at
+    if _scorer is None and not _scorer_backing_off():
+        with _scorer_lock:
+            if _scorer is None and not _scorer_backing_off():
+                try:
+                    from risk_service import RiskScorer
+
+                    risk_path, hohmann_path = model_paths()
+                    scorer = RiskScorer(_archives.get(risk_path, risk_path),
+                                        _archives.get(hohmann_path, hohmann_path))
+                    default_metrics.register('risk_scoring_seconds',
+                                             'Time from submitting rows to receiving risk scores',
+                                             scorer.batcher.latency)
+                    default_metrics.register('risk_batch_size', 'Rows per risk model call',
+                                             scorer.batcher.batch_sizes)
+                    _scorer, _scorer_error, _scorer_failed_at = scorer, None, None
+                except Exception as e:
+                    _scorer_error, _scorer_failed_at = str(e), time.monotonic()
+    return _scorer, _scorer_error
+
+
+def _scorer_backing_off():
+    return _scorer_failed_at is not None and time.monotonic() - _scorer_failed_at < SCORER_RETRY_INTERVAL
+
+@risk_api.route('/api/risk', methods=['POST'])
+def score_risk():
+    risk_scorer, error = get_scorer()
+    if risk_scorer is None:
+        return jsonify({'error': f'Risk scoring is unavailable: {error}'}), 503
+    try:
+        data = request.json
+        conjunctions = data.get('conjunctions')
+        features = data.get('features')
+        rows = conjunctions if conjunctions is not None else features
+
+        if not rows:
+            return jsonify({'error': 'conjunctions or features must be a non-empty list'}), 400
+        if len(rows) > MAX_RISK_ROWS:
+            return jsonify({'error': f'At most {MAX_RISK_ROWS} conjunctions per request'}), 400
+
+        errors = {}
+        if conjunctions is None:
+            # Precomputed model inputs, e.g. from conjunction.risk_features
+            features = np.asarray(features, dtype=np.float32)
+            if features.size != len(rows) * 10:
+                return jsonify({'error': 'Each features row must hold 10 values'}), 400
+            scored = list(range(len(rows)))
+            risk_factors, combined_risks = risk_scorer.score(features, data.get('hohmannCosts'))
+        else:
+            # Conjunctions from screening; skip those whose TLEs are unavailable
+            for conjunction in conjunctions:
+                conjunction['sat1'] = str(conjunction['sat1']).strip()
+                conjunction['sat2'] = str(conjunction['sat2']).strip()
+            satellites, missing = conjunction_satellites(conjunctions)
+            scored = []
+            for index, conjunction in enumerate(conjunctions):
+                failed = [missing[key] for key in (conjunction['sat1'], conjunction['sat2']) if key in missing]
+                if failed:
+                    errors[str(index)] = failed[0]
+                else:
+                    scored.append(index)
+            threshold = float(data.get('threshold', 10.0))
+            risk_factors, combined_risks = risk_scorer.score_conjunctions(
+                [conjunctions[index] for index in scored], satellites, threshold)
+
+        scores = [None] * len(rows)
+        for index, risk_factor, combined_risk in zip(scored, risk_factors.tolist(), combined_risks.tolist()):
+            scores[index] = {'riskFactor': risk_factor, 'combinedRisk': combined_risk}
+        return jsonify({'scores': scores, 'errors': errors})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@risk_api.route('/api/risk/stats', methods=['GET'])
+def risk_stats():
+    risk_scorer, error = get_scorer()
+    if risk_scorer is None:
+        return jsonify({'error': f'Risk scoring is unavailable: {error}'}), 503
+    return jsonify(risk_scorer.stats())
@@ -0,0 +1,157 @@
+import os
+import threading
+
+from catalog import load_catalog
+from satellite_registry import SatelliteRegistry, default_registry
+from tle_cache import default_cache
+from tle_client import default_client
+from tle_refresher import DEFAULT_BUDGET, TLERefresher
+
+_catalog = None
+_catalog_loaded = False
+_catalog_lock = threading.Lock()
+_catalog_registry = None
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Local TLE catalog (.npy store or TLE/3LE text) named by TLE_CATALOG, or
+    None. Opened once; a .npy store is memory-mapped, so workers forked after
+    `service.preload` share its pages.
+    """
+    global _catalog, _catalog_loaded
+    if not _catalog_loaded:
+        with _catalog_lock:
+            if not _catalog_loaded:
+                path = os.environ.get('TLE_CATALOG')
+                _catalog = load_catalog(path) if path else None
+                _catalog_loaded = True
+    return _catalog
+
+
+def get_catalog_registry():
+    """
+    SatelliteRegistry for passes over the whole local catalog (screening,
+    catalog-wide pass prediction), sized to hold all of it and kept apart
+    from default_registry so those passes neither evict the records
+    requests reuse nor reparse the catalog each time.
+    """
+    global _catalog_registry
+    catalog = get_catalog()
+    if _catalog_registry is None and catalog is not None:
+        with _catalog_lock:
+            if _catalog_registry is None:
+                _catalog_registry = SatelliteRegistry(max_entries=max(len(catalog), 1))
+    return _catalog_registry
+
+
+def offline():
+    # n2yo is never asked when TLE_OFFLINE=1
+    return os.environ.get('TLE_OFFLINE') == '1'
+
+
+def get_refresher():
+    return _refresher
+
+
+def worker_count():
+    # Server processes sharing the n2yo quota, as gunicorn and most hosts set it
+    try:
+        return max(int(os.environ.get('WEB_CONCURRENCY', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def start_refresher():
+    """
+    Start this process's background TLE refresher when TLE_REFRESH_INTERVAL
+    (seconds) is set, tracking the local catalog and every satellite looked
+    up since. TLE_REFRESH_BUDGET caps the n2yo requests per interval of the
+    whole service; each of the WEB_CONCURRENCY worker processes runs its own
+    refresher and spends an equal share of it. Called before every request,
+    as threads do not survive a preforking server's fork.
+    """
+    global _refresher
+    interval = os.environ.get('TLE_REFRESH_INTERVAL')
+    if _refresher is not None or not interval or offline():
+        return
+    with _refresher_lock:
+        if _refresher is None:
+            catalog = get_catalog()
+            budget = int(os.environ.get('TLE_REFRESH_BUDGET', DEFAULT_BUDGET))
+            refresher = TLERefresher(default_client, catalog, interval=float(interval),
+                                     budget=max(budget // worker_count(), 1))
+            if catalog is not None:
+                refresher.track(catalog.norad_ids.tolist())
+            refresher.start()
+            _refresher = refresher
+
+
+# Function to look up TLE data for many satellites, from the local catalog first
+# and then through the pooled n2yo client and shared cache
+def lookup_tles(norad_ids):
+    catalog = get_catalog()
+    tles = {}
+    missing = []
+    invalid = {}
+    for norad_id in norad_ids:
+        key = str(norad_id).strip()
+        if not key.isdigit():
+            invalid[key] = "Invalid NORAD ID"
+            continue
+        tle_data = catalog.tle(key) if catalog is not None else None
+        if tle_data is None:
+            missing.append(key)
+        else:
+            tles[key] = tle_data
+
+    # Satellites the refresher keeps current are served from the cache even
+    # past expiry, so they never wait on n2yo
+    refresher = get_refresher()
+    if refresher is not None:
+        refreshed = {key: default_cache.peek(key) for key in missing if refresher.tracks(key)}
+        tles.update((key, tle_data) for key, tle_data in refreshed.items() if tle_data is not None)
+        missing = [key for key in missing if key not in tles]
+
+    errors = {}
+    if missing and offline():
+        errors = {key: "Satellite not found in the local catalog" for key in missing}
+    elif missing:
+        fetched, errors = default_client.fetch_many(missing)
+        tles.update(fetched)
+        if refresher is not None:
+            refresher.track(fetched)
+    errors.update(invalid)
+    return tles, errors
+
+
+# Function to fetch TLE data for one satellite
+def fetch_tle_data(norad_id):
+    tles, errors = lookup_tles([norad_id])
+    if errors:
+        raise Exception(next(iter(errors.values())))
+    return next(iter(tles.values()))
+
+
+# Function to parse fetched TLE data into SatelliteRecords, adding parse
+# failures to `errors`
+def parse_tles(tles, errors):
+    satellites = []
+    for norad_id, tle_data in tles.items():
+        try:
+            satellites.append(default_registry.get_tle(norad_id, tle_data))
+        except Exception as e:
+            errors[norad_id] = f"Invalid TLE data: {e}"
+    return satellites
+
+
+# Function to look up SatelliteRecords for every satellite named in the conjunctions
+def conjunction_satellites(conjunctions):
+    norad_ids = list(dict.fromkeys(str(conjunction[key]).strip()
+                                   for conjunction in conjunctions for key in ('sat1', 'sat2')))
+    tles, errors = lookup_tles(norad_ids)
+    satellites = parse_tles(tles, errors)
+    return {satellite.norad_id: satellite for satellite in satellites}, errors
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import numpy as np
+from flask import Blueprint, request, jsonify
+
+from frames import ground_tracks
+from propagation import sample_count
+from service.positions import (MAX_BATCH_SIZE, MAX_BATCH_SAMPLES, binary_requested, check_sample_budget,
+                               states_to_lists, trajectory_response)
+from service.tles import lookup_tles, parse_tles
+
+tracks_api = Blueprint('tracks', __name__)
+
+@tracks_api.route('/api/groundtrack', methods=['POST'])
+def get_ground_tracks():
+    try:
+        data = request.json
+        norad_ids = list(dict.fromkeys(str(norad_id).strip() for norad_id in data.get('noradIds', [])))
+
+        if not norad_ids:
+            return jsonify({'error': 'noradIds must be a non-empty list'}), 400
+        if len(norad_ids) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} satellites per request'}), 400
+
+        # The delta encoding quantises kilometres and assumes a smooth path;
+        # longitude is in degrees and wraps at the antimeridian
+        binary = binary_requested()
+        encoding = data.get('encoding', 'float32')
+        if binary and encoding != 'float32':
+            return jsonify({'error': 'Ground tracks are only available in the float32 encoding'}), 400
+
+        # One orbit of a low satellite at one-minute steps by default
+        horizon = float(data.get('horizon', 5400))
+        step = float(data.get('step', 60))
+        error = check_sample_budget(len(norad_ids), horizon, step, MAX_BATCH_SAMPLES)
+        if error:
+            return jsonify({'error': error}), 400
+
+        tles, errors = lookup_tles(norad_ids)
+        satellites = parse_tles(tles, errors)
+        current_time = datetime.utcnow()
+
+        tracks = np.empty((0, sample_count(horizon, step), 3))
+        if satellites:
+            _, latitude, longitude, altitude, error_codes = ground_tracks(satellites, current_time, horizon, step)
+            tracks = np.stack([latitude, longitude, altitude], axis=2)
+            # Samples that failed to propagate are NaN and come back as null
+            for satellite, codes in zip(satellites, error_codes):
+                if codes.all():
+                    errors[satellite.norad_id] = f"Error in satellite position calculation: {codes[0]}"
+
+        succeeded = [i for i, satellite in enumerate(satellites) if satellite.norad_id not in errors]
+
+        # The binary format carries [latitude, longitude, altitude] in place of [x, y, z]
+        if binary:
+            return trajectory_response(tracks[succeeded], current_time, step,
+                                       [satellites[i].norad_id for i in succeeded],
+                                       {'components': ['latitude', 'longitude', 'altitude'], 'errors': errors},
+                                       encoding)
+
+        results = {}
+        for i in succeeded:
+            latitude, longitude, altitude = states_to_lists(tracks[i].T)
+            results[satellites[i].norad_id] = {'latitude': latitude, 'longitude': longitude, 'altitude': altitude}
+
+        response = jsonify({'start': current_time.isoformat() + 'Z', 'step': step,
+                            'satellites': results, 'errors': errors})
+        response.vary.add('Accept')
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
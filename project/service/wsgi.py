@@ -0,0 +1,6 @@
+# Entry point for multi-worker serving, e.g.
+#   gunicorn --preload --workers 4 service.wsgi:app
+# Shared state is loaded once in the master and inherited by every worker.
+from service import create_app
+
+app = create_app(preload_state=True)
@@ -0,0 +1,195 @@
+from datetime import timedelta
+
+import numpy as np
+
+from propagation import propagate, propagate_samples, start_jday, time_grid
+
+
+def _relative(satrecs, first, second, jd0, fr0, offsets):
+    jd = np.full(offsets.size, jd0)
+    fr = fr0 + offsets / 86400.0
+    r1, v1 = propagate_samples(satrecs, first, jd, fr)
+    r2, v2 = propagate_samples(satrecs, second, jd, fr)
+    return r1 - r2, v1 - v2
+
+
+def _refine(satrecs, first, second, jd0, fr0, t_lo, t_hi, f_lo, f_hi, tolerance, max_iterations):
+    """
+    Find roots of the range-rate function dr.dv inside [t_lo, t_hi] brackets
+    with the Illinois variant of regula falsi, all brackets at once.
+    """
+    t_lo, t_hi, f_lo, f_hi = t_lo.copy(), t_hi.copy(), f_lo.copy(), f_hi.copy()
+    t = 0.5 * (t_lo + t_hi)
+    side = np.zeros(t.size, dtype=np.int8)
+    active = np.ones(t.size, dtype=bool)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        denominator = f_hi[idx] - f_lo[idx]
+        secant = t_hi[idx] - f_hi[idx] * (t_hi[idx] - t_lo[idx]) / np.where(denominator == 0, 1, denominator)
+        midpoint = 0.5 * (t_lo[idx] + t_hi[idx])
+        inside = np.isfinite(secant) & (secant > t_lo[idx]) & (secant < t_hi[idx])
+        t_new = np.where(inside, secant, midpoint)
+
+        dr, dv = _relative(satrecs, first[idx], second[idx], jd0, fr0, t_new)
+        f = np.einsum('ij,ij->i', dr, dv)
+
+        # Range is decreasing at t_lo (f < 0) and increasing at t_hi (f >= 0)
+        lower = f < 0
+        t_lo[idx[lower]] = t_new[lower]
+        f_lo[idx[lower]] = f[lower]
+        t_hi[idx[~lower]] = t_new[~lower]
+        f_hi[idx[~lower]] = f[~lower]
+
+        # Illinois step: halve the stale endpoint if the same side moved twice
+        new_side = np.where(lower, -1, 1).astype(np.int8)
+        repeated = new_side == side[idx]
+        f_hi[idx[repeated & lower]] *= 0.5
+        f_lo[idx[repeated & ~lower]] *= 0.5
+        side[idx] = new_side
+
+        converged = (np.abs(t_new - t[idx]) < tolerance) | (t_hi[idx] - t_lo[idx] < tolerance) | ~np.isfinite(f)
+        t[idx] = t_new
+        active[idx[converged]] = False
+    return t
+
+
+def _report(satrecs, first, second, jd0, fr0, offsets):
+    dr, dv = _relative(satrecs, first, second, jd0, fr0, offsets)
+    return np.linalg.norm(dr, axis=1), dv
+
+
+def find_tca(pairs, start, horizon=86400, step=60, tolerance=1e-3, max_iterations=50):
+    """
+    Find every local minimum of range for pairs of SatelliteRecords.
+
+    Minima are bracketed where the range-rate changes sign from negative to
+    positive on the coarse `step` grid, then refined on SGP4 positions and
+    velocities to `tolerance` seconds.
+
+    Returns:
+        List of dicts with 'pair' (index into `pairs`), 'sat1', 'sat2',
+        'tca' (datetime), 'timeOffset' (s), 'missDistance' (km),
+        'relativeSpeed' (km/s) and 'relativeVelocity' (km/s, TEME)
+    """
+    if not pairs:
+        return []
+    satellites = list({id(satellite): satellite for pair in pairs for satellite in pair}.values())
+    position = {id(satellite): k for k, satellite in enumerate(satellites)}
+    first = np.array([position[id(sat1)] for sat1, _ in pairs])
+    second = np.array([position[id(sat2)] for _, sat2 in pairs])
+    satrecs = [satellite.satrec for satellite in satellites]
+
+    offsets, jd, fr = time_grid(start, horizon, step)
+    _, positions, velocities = propagate(satellites, jd, fr)
+    range_rate = np.einsum('ptk,ptk->pt', positions[first] - positions[second], velocities[first] - velocities[second])
+
+    # Brackets [t_k, t_k+1] where the range stops decreasing
+    pair_index, k = np.nonzero((range_rate[:, :-1] < 0) & (range_rate[:, 1:] >= 0))
+    if pair_index.size == 0:
+        return []
+    t = _refine(satrecs, first[pair_index], second[pair_index], jd[0], fr[0],
+                offsets[k], offsets[k + 1], range_rate[pair_index, k], range_rate[pair_index, k + 1],
+                tolerance, max_iterations)
+    miss, relative_velocity = _report(satrecs, first[pair_index], second[pair_index], jd[0], fr[0], t)
+
+    return [
+        {
+            'pair': int(p),
+            'sat1': pairs[p][0].norad_id,
+            'sat2': pairs[p][1].norad_id,
+            'tca': start + timedelta(seconds=float(offset)),
+            'timeOffset': float(offset),
+            'missDistance': float(distance),
+            'relativeSpeed': float(np.linalg.norm(velocity)),
+            'relativeVelocity': velocity.tolist(),
+        }
+        for p, offset, distance, velocity in zip(pair_index, t, miss, relative_velocity)
+    ]
+
+
+def closest_approach(sat1, sat2, start, horizon=86400, step=60, tolerance=1e-3):
+    """
+    The closest of all approaches between two SatelliteRecords in the window,
+    or None if their range has no minimum inside it.
+    """
+    approaches = find_tca([(sat1, sat2)], start, horizon, step, tolerance)
+    return min(approaches, key=lambda approach: approach['missDistance'], default=None)
+
+
+def refine_samples(satrecs, first, second, jd0, fr0, offsets, step, window=None, tolerance=1e-3,
+                   max_iterations=50):
+    """
+    Refine pairs (satrecs[first[k]], satrecs[second[k]]) sampled at
+    `offsets` seconds after (jd0, fr0) to their time of closest approach,
+    searching within one `step` either side of each sample. With `window`
+    (first, last offset), approaches are clamped to it.
+
+    Returns:
+        (offsets (s), miss distances (km), relative speeds (km/s)) at the
+        closest approach; a pair whose range has no minimum near its sample
+        keeps the sample
+    """
+    sample = np.asarray(offsets, dtype=np.float64)
+    f = {}
+    for shift in (-step, 0, step):
+        dr, dv = _relative(satrecs, first, second, jd0, fr0, sample + shift)
+        f[shift] = np.einsum('ij,ij->i', dr, dv)
+
+    # The minimum lies after the sample if range is still decreasing there
+    after = (f[0] < 0) & (f[step] >= 0)
+    before = ~after & (f[-step] < 0) & (f[0] >= 0)
+    t_lo = np.where(after, sample, sample - step)
+    t_hi = np.where(after, sample + step, sample)
+    f_lo = np.where(after, f[0], f[-step])
+    f_hi = np.where(after, f[step], f[0])
+
+    t = sample.copy()
+    bracketed = np.flatnonzero(after | before)
+    if bracketed.size:
+        t[bracketed] = _refine(satrecs, first[bracketed], second[bracketed], jd0, fr0,
+                               t_lo[bracketed], t_hi[bracketed], f_lo[bracketed], f_hi[bracketed],
+                               tolerance, max_iterations)
+    if window is not None:
+        t = np.clip(t, *window)
+    miss, relative_velocity = _report(satrecs, first, second, jd0, fr0, t)
+    return t, miss, np.linalg.norm(relative_velocity, axis=1)
+
+
+def refine(conjunctions, satellites, start, step, tolerance=1e-3, max_iterations=50):
+    """
+    Refine sampled conjunctions to their true time of closest approach.
+
+    Each conjunction is searched within one `step` either side of its
+    sample, as in `refine_samples`.
+
+    Args:
+        conjunctions: Conjunction dicts with 'sat1', 'sat2' and 'timeOffset'
+        satellites: Mapping of NORAD ID to SatelliteRecord
+        start: Start of the screening window
+
+    Returns:
+        New conjunction dicts with refined 'tca', 'timeOffset',
+        'missDistance' and 'relativeSpeed', ranked by miss distance
+    """
+    if not conjunctions:
+        return []
+    ids = list(dict.fromkeys(norad_id for c in conjunctions for norad_id in (c['sat1'], c['sat2'])))
+    position = {norad_id: k for k, norad_id in enumerate(ids)}
+    satrecs = [satellites[norad_id].satrec for norad_id in ids]
+    first = np.array([position[c['sat1']] for c in conjunctions])
+    second = np.array([position[c['sat2']] for c in conjunctions])
+    sample = np.array([c['timeOffset'] for c in conjunctions], dtype=np.float64)
+
+    jd0, fr0 = start_jday(start)
+    t, miss, speed = refine_samples(satrecs, first, second, jd0, fr0, sample, step,
+                                    tolerance=tolerance, max_iterations=max_iterations)
+
+    refined = [
+        dict(c, tca=start + timedelta(seconds=float(offset)), timeOffset=float(offset),
+             missDistance=float(distance), relativeSpeed=float(relative_speed))
+        for c, offset, distance, relative_speed in zip(conjunctions, t, miss, speed)
+    ]
+    return sorted(refined, key=lambda c: c['missDistance'])
@@ -0,0 +1,9 @@
+from catalog import line_checksum
+
+
+def make_tle(norad_id, epoch, mean_motion=15.5, inclination=51.6):
+    """Checksummed two-line text for a near-circular LEO object with the given epoch (UTC datetime)."""
+    day = epoch.timetuple().tm_yday + (epoch.hour * 3600 + epoch.minute * 60 + epoch.second) / 86400
+    line1 = f"1 {norad_id:05d}U 98067A   {epoch:%y}{day:012.8f}  .00001000  00000-0  10000-3 0  999"
+    line2 = f"2 {norad_id:05d} {inclination:8.4f} 120.0000 0005000  90.0000 270.0000 {mean_motion:11.8f}{12345:5d}"
+    return f"{line1}{line_checksum(line1)}\n{line2}{line_checksum(line2)}"
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from benchmark import canned_tles
+from conjunction import ConjunctionScreening, close_pairs, screen_catalog
+from propagation import propagate_window
+from satellite_registry import SatelliteRegistry
+
+START = datetime(2026, 1, 1)
+HORIZON = 1800  # s
+THRESHOLD = 100.0  # km, wide enough that a small catalog has conjunctions
+
+
+@pytest.fixture(scope='module')
+def satellites():
+    registry = SatelliteRegistry()
+    return [registry.get(norad_id, *tle_data.split('\r\n')) for norad_id, tle_data in canned_tles(200).items()]
+
+
+@pytest.fixture(scope='module')
+def dense_minimum(satellites):
+    # Brute force: every pair's closest separation at one-second samples
+    _, positions, _, _ = propagate_window(satellites, START, HORIZON, 1)
+    minimum = np.full((len(satellites), len(satellites)), np.inf)
+    for i in range(len(satellites) - 1):
+        minimum[i, i + 1:] = np.linalg.norm(positions[i + 1:] - positions[i], axis=2).min(axis=1)
+    return minimum
+
+
+def conjunction_pairs(conjunctions, satellites):
+    row = {satellite.norad_id: k for k, satellite in enumerate(satellites)}
+    return {(row[c['sat1']], row[c['sat2']]): c for c in conjunctions}
+
+
+def test_close_pairs_matches_brute_force():
+    positions = np.random.default_rng(0).uniform(-100, 100, (500, 3))
+    positions[7] = np.nan
+    i, j, distance = close_pairs(positions, 10.0)
+
+    separation = np.linalg.norm(positions[:, np.newaxis] - positions, axis=2)
+    expected = {(a, b) for a, b in zip(*np.nonzero(separation <= 10.0)) if a < b}
+    assert set(zip(i.tolist(), j.tolist())) == expected
+    np.testing.assert_allclose(distance, separation[i, j])
+
+
+def test_coarse_screen_finds_every_dense_conjunction(satellites, dense_minimum):
+    found = conjunction_pairs(screen_catalog(satellites, START, HORIZON, 60, THRESHOLD), satellites)
+    expected = set(zip(*np.nonzero(dense_minimum <= THRESHOLD)))
+
+    assert len(expected) > 5
+    assert set(found) == expected
+    for pair, conjunction in found.items():
+        # Refined to closest approach: never further than the closest dense sample
+        assert conjunction['missDistance'] <= dense_minimum[pair] + 1e-6
+        assert 0 <= conjunction['timeOffset'] <= HORIZON
+
+
+def test_screening_update_matches_full_screen(satellites):
+    screening = ConjunctionScreening(satellites, START, HORIZON, 60, THRESHOLD)
+    registry = SatelliteRegistry()
+    replacements = canned_tles(200, seed=1)
+    changed = [registry.get(norad_id, *replacements[norad_id].split('\r\n'))
+               for norad_id in [satellite.norad_id for satellite in satellites[:20]]]
+    screening.update(changed)
+
+    expected = screen_catalog(screening.satellites, START, HORIZON, 60, THRESHOLD)
+    assert ({(c['sat1'], c['sat2']): round(c['missDistance'], 6) for c in screening.conjunctions()}
+            == {(c['sat1'], c['sat2']): round(c['missDistance'], 6) for c in expected})
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from equation import MU_EARTH, elements_to_state, get_orbit, propagate_states, sample_orbits
+
+# (mean motion rev/day, eccentricity, raan, inclination, argument of perigee, initial anomaly), degrees
+ORBITS = [
+    (15.5, 0.0005, 206.9, 51.6, 5.7, 96.6),  # LEO
+    (2.0, 0.7, 10.0, 63.4, 270.0, 0.0),  # Molniya
+    (1.00270383, 0.0002945, 206.8784, 0.0135, 5.6523, 96.6140),  # GEO, the module's default elements
+]
+
+
+def test_sample_orbits_matches_two_body_propagation():
+    a = np.array([7000.0, 26600.0, 42164.0])
+    e = np.array([0.001, 0.7, 0.0003])
+    i, raan, argp, nu = (np.radians(values) for values in ([51.6, 63.4, 0.01], [206.9, 10.0, 206.9],
+                                                           [5.7, 270.0, 5.7], [96.6, 0.0, 96.6]))
+    positions = sample_orbits(a, e, i, raan, argp, nu, num_points=50)
+
+    # The same points by advancing the initial state evenly over one period
+    r, v = elements_to_state(a, e, i, raan, argp, nu)
+    period = 2 * np.pi * np.sqrt(a**3 / MU_EARTH)
+    for k, fraction in enumerate(np.linspace(0, 1, 50)):
+        expected, _ = propagate_states(r, v, fraction * period)
+        np.testing.assert_allclose(positions[:, k], expected, atol=1e-6)
+
+
+@pytest.mark.parametrize('elements', ORBITS)
+def test_get_orbit_matches_poliastro(elements):
+    pytest.importorskip('poliastro')
+    from astropy import units as u
+
+    from equation import get_orbit_poliastro
+
+    mean_motion, eccentricity, raan, inclination, arg_perigee, anomaly = elements
+    arguments = (mean_motion * 2 * np.pi * u.rad / u.day, eccentricity * u.one, raan * u.deg, inclination * u.deg,
+                 arg_perigee * u.deg, anomaly * u.deg)
+    positions, a, semi_minor_axis = get_orbit(*arguments, num_points=20)
+    reference, reference_a, reference_b = get_orbit_poliastro(*arguments, num_points=20)
+
+    reference = np.stack([r.to_value(u.km) for r in reference])
+    assert np.abs(positions.to_value(u.km) - reference).max() < 0.01  # km
+    assert abs((a - reference_a).to_value(u.km)) < 1e-6
+    assert semi_minor_axis == pytest.approx(reference_b)
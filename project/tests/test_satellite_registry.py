@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from conftest import make_tle
+from satellite_registry import SatelliteRegistry
+
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_same_element_set_is_a_hit():
+    registry = SatelliteRegistry()
+    first = registry.get_tle('25544', make_tle(25544, EPOCH))
+    assert registry.get_tle('25544', make_tle(25544, EPOCH)) is first
+    assert registry.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+def test_new_element_set_replaces_the_record():
+    registry = SatelliteRegistry()
+    old = registry.get_tle('25544', make_tle(25544, EPOCH))
+    new = registry.get_tle('25544', make_tle(25544, EPOCH, mean_motion=15.6))
+    assert new is not old
+    assert registry.peek('25544') is new
+    assert registry.stats()['entries'] == 1
+
+
+def test_least_recently_used_records_are_evicted():
+    registry = SatelliteRegistry(max_entries=2)
+    for norad_id in (1, 2):
+        registry.get_tle(norad_id, make_tle(norad_id, EPOCH))
+    registry.get_tle(1, make_tle(1, EPOCH))  # A hit moves 1 ahead of 2
+    registry.get_tle(3, make_tle(3, EPOCH))
+    assert registry.peek('2') is None
+    assert registry.peek('1') is not None and registry.peek('3') is not None
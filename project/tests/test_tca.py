@@ -0,0 +1,67 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import tca
+from propagation import start_jday
+
+START = datetime(2026, 1, 1)
+JD0, FR0 = start_jday(START)
+
+
+class LinearSatrec:
+    """Straight-line motion r0 + v t, t in seconds after START, with the sgp4_array interface."""
+
+    def __init__(self, r0, v):
+        self.r0, self.v = np.asarray(r0, dtype=float), np.asarray(v, dtype=float)
+
+    def sgp4_array(self, jd, fr):
+        t = ((jd - JD0) + (fr - FR0)) * 86400.0
+        r = self.r0 + np.outer(t, self.v)
+        return np.zeros(t.size, dtype=np.uint8), r, np.broadcast_to(self.v, r.shape).copy()
+
+
+def linear_propagate(satellites, jd, fr):
+    states = [satellite.satrec.sgp4_array(jd, fr) for satellite in satellites]
+    return tuple(np.stack(arrays) for arrays in zip(*states))
+
+
+@pytest.fixture(autouse=True)
+def linear_motion(monkeypatch):
+    monkeypatch.setattr(tca, 'propagate', linear_propagate)
+
+
+def satellite(norad_id, r0, v):
+    return SimpleNamespace(norad_id=norad_id, satrec=LinearSatrec(r0, v))
+
+
+@pytest.mark.parametrize('r0, v', [
+    ([7000.0, -3000.0, 20.0], [0.1, 7.5, 0.0]),
+    ([7000.0, 1234.5, -4.0], [-0.3, -7.2, 1.1]),  # Between grid samples
+    ([7000.0, -40000.0, 0.0], [0.0, 14.9, 0.002]),  # Head-on, minimum late in the window
+])
+def test_linear_encounter(r0, v):
+    sat1 = satellite('1', [7000.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+    sat2 = satellite('2', r0, v)
+    # Relative motion dr(t) = dr0 + dv t is closest at t* = -dr0.dv / |dv|^2
+    dr0, dv = np.array([7000.0, 0.0, 0.0]) - r0, -np.array(v)
+    t_star = -dr0 @ dv / (dv @ dv)
+    miss = np.linalg.norm(dr0 + dv * t_star)
+
+    (approach,) = tca.find_tca([(sat1, sat2)], START, horizon=3600, step=60)
+
+    assert approach['pair'] == 0 and (approach['sat1'], approach['sat2']) == ('1', '2')
+    assert approach['timeOffset'] == pytest.approx(t_star, abs=1e-3)
+    # A TCA within 1 ms misses the minimum by at most |dv|^2 (1 ms)^2 / (2 miss)
+    assert approach['missDistance'] == pytest.approx(miss, abs=(dv @ dv) * 1e-6 / (2 * miss) + 1e-9)
+    assert approach['relativeSpeed'] == pytest.approx(np.linalg.norm(dv))
+    assert (approach['tca'] - START).total_seconds() == pytest.approx(t_star, abs=1e-3)
+
+
+def test_receding_pairs_have_no_approach():
+    sat1 = satellite('1', [7000.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+    sat2 = satellite('2', [7000.0, 10.0, 0.0], [0.0, 7.5, 0.0])
+    assert tca.find_tca([(sat1, sat2)], START, horizon=3600, step=60) == []
+    assert tca.closest_approach(sat1, sat2, START, horizon=3600, step=60) is None
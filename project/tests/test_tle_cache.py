@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import make_tle
+from tle_cache import MAX_TTL, MIN_TTL, TLECache, tle_epoch
+
+EPOCH = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def counting_loader(tle_data):
+    calls = []
+
+    def loader(norad_id):
+        calls.append(norad_id)
+        return tle_data
+    return loader, calls
+
+
+def test_fresh_entry_is_served_until_it_expires():
+    tle_data = make_tle(25544, EPOCH)
+    assert tle_epoch(tle_data.splitlines()[0]) == EPOCH
+    clock = Clock(EPOCH.timestamp() - 3600)
+    cache = TLECache(clock=clock)
+    loader, calls = counting_loader(tle_data)
+
+    assert cache.get('25544', loader) == tle_data
+    clock.now += MAX_TTL - 1
+    assert cache.get(25544, loader) == tle_data
+    assert calls == ['25544']
+
+    clock.now += 2
+    cache.get('25544', loader)
+    assert calls == ['25544', '25544']
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_old_element_sets_are_kept_for_the_minimum_ttl():
+    clock = Clock(EPOCH.timestamp() + 30 * 86400)
+    cache = TLECache(clock=clock)
+    loader, calls = counting_loader(make_tle(25544, EPOCH))
+
+    cache.get('25544', loader)
+    clock.now += MIN_TTL - 1
+    cache.get('25544', loader)
+    clock.now += 2
+    cache.get('25544', loader)
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    tle_data = make_tle(25544, EPOCH)
+    cache = TLECache(clock=Clock(EPOCH.timestamp()))
+    release = threading.Event()
+    calls = []
+
+    def loader(norad_id):
+        calls.append(norad_id)
+        release.wait(5)
+        return tle_data
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('25544', loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.misses < 8 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ['25544']
+    assert results == [tle_data] * 8
+
+
+def test_a_failed_load_reaches_every_waiter_and_is_not_cached():
+    cache = TLECache(clock=Clock(EPOCH.timestamp()))
+
+    def failing(norad_id):
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get('25544', failing)
+    loader, calls = counting_loader(make_tle(25544, EPOCH))
+    cache.get('25544', loader)
+    assert calls == ['25544']
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TLECache(max_entries=2, clock=Clock(EPOCH.timestamp()))
+    for norad_id in (1, 2):
+        cache.put(norad_id, make_tle(norad_id, EPOCH))
+    cache.get('1', None)  # Touch 1, so 2 is the oldest
+    cache.put(3, make_tle(3, EPOCH))
+    assert cache.peek('2') is None
+    assert cache.peek('1') is not None and cache.peek('3') is not None
+
+
+def test_entries_persist_on_disk(tmp_path):
+    clock = Clock(EPOCH.timestamp())
+    TLECache(cache_dir=str(tmp_path), clock=clock).put('25544', make_tle(25544, EPOCH))
+    restarted = TLECache(cache_dir=str(tmp_path), clock=clock)
+    assert restarted.get('25544', None) == make_tle(25544, EPOCH)
+
+
+@pytest.mark.parametrize('norad_id', ['../etc/passwd', '25544.json', '', '-1'])
+def test_non_numeric_keys_are_rejected(norad_id):
+    with pytest.raises(ValueError):
+        TLECache().get(norad_id, lambda key: 'unused')
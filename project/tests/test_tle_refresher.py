@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import make_tle
+from ephemeris import EphemerisCache
+from satellite_registry import SatelliteRegistry
+from tle_cache import TLECache
+from tle_refresher import TLERefresher
+
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def refresher(clock):
+    return TLERefresher(client=None, cache=TLECache(clock=lambda: EPOCH.timestamp()), registry=SatelliteRegistry(),
+                        ephemerides=EphemerisCache(), interval=60, budget=4, clock=clock)
+
+
+def test_budget_allows_a_burst_then_refills_at_its_rate(refresher, clock):
+    assert [refresher._acquire(wait=False) for _ in range(5)] == [True] * 4 + [False]
+    assert refresher.stats()['budgetRemaining'] == 0
+
+    clock.now += 15  # One request's worth at 4 per minute
+    assert refresher._acquire(wait=False)
+    assert not refresher._acquire(wait=False)
+
+    clock.now += 3600  # Idle time never banks more than one budget
+    assert refresher.stats()['budgetRemaining'] == 4
+
+
+def test_batches_are_limited_by_the_budget(refresher):
+    refresher.enqueue(range(1, 11))
+    assert refresher._next_batch() == ['1', '2', '3', '4']
+    assert not refresher._acquire(wait=False)
+    assert refresher.stats()['queued'] == 6
+
+
+def test_enqueue_skips_queued_satellites(refresher):
+    assert refresher.enqueue(['1', '2']) == 2
+    assert refresher.enqueue([2, 3]) == 1
+
+
+def test_apply_diffs_by_checksum_and_epoch(refresher):
+    current = make_tle(25544, EPOCH)
+    assert refresher.apply('25544', current) == 'new'
+    assert refresher.apply('25544', current) == 'unchanged'
+    assert refresher.apply('25544', make_tle(25544, EPOCH - timedelta(days=1))) == 'stale'
+    assert refresher.apply('25544', make_tle(25544, EPOCH + timedelta(hours=6))) == 'changed'
+    assert refresher.apply('25544', current.replace('51.6000', '51.7000')) == 'invalid'
+    assert refresher.cache.peek('25544') == make_tle(25544, EPOCH + timedelta(hours=6))
+    assert refresher.stats()['pending'] == 1
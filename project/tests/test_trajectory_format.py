@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from trajectory_format import decode_trajectory, encode_trajectory
+
+START = datetime(2026, 1, 1, 12, 30, 15, 500000)
+
+
+def orbit_positions(n_sats=3, n_times=200):
+    # Circular orbits from LEO to GEO radius, sampled every minute
+    radius = np.linspace(6800, 42164, n_sats)[:, np.newaxis]
+    angle = np.sqrt(398600.4418 / radius**3) * np.arange(n_times) * 60.0
+    return np.stack([radius * np.cos(angle), radius * np.sin(angle), 0.1 * radius * np.sin(2 * angle)], axis=2)
+
+
+@pytest.mark.parametrize('encoding, tolerance', [('float32', 0.01), ('delta', 0.002)])
+def test_round_trip(encoding, tolerance):
+    positions = orbit_positions()
+    data = encode_trajectory(positions, START, 60.0, ['1', '2', '3'], {'errors': {}}, encoding)
+    decoded = decode_trajectory(data)
+
+    assert decoded['noradIds'] == ['1', '2', '3']
+    assert decoded['errors'] == {}
+    assert decoded['step'] == 60.0
+    assert decoded['start'] == pytest.approx(START.replace(tzinfo=timezone.utc).timestamp())
+    np.testing.assert_allclose(decoded['positions'], positions, atol=tolerance)
+
+
+@pytest.mark.parametrize('encoding', ['float32', 'delta'])
+def test_failed_samples_decode_as_nan(encoding):
+    positions = orbit_positions()
+    positions[0, :5] = np.nan  # Failed from the start
+    positions[1, 50:60] = np.nan  # A gap
+    positions[2, -1] = np.nan  # The last sample
+    decoded = decode_trajectory(encode_trajectory(positions, START, 60.0, ['1', '2', '3'], encoding=encoding))
+
+    assert np.array_equal(np.isnan(decoded['positions']), np.isnan(positions))
+    valid = np.isfinite(positions)
+    np.testing.assert_allclose(decoded['positions'][valid], positions[valid], atol=0.01)
+
+
+def test_delta_encoding_rejects_positions_beyond_its_range():
+    with pytest.raises(ValueError):
+        encode_trajectory(np.full((1, 2, 3), 1e6), START, 60.0, ['1'], encoding='delta')
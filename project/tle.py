@@ -1,24 +1,20 @@
-import requests
 from sgp4.api import Satrec, jday
+from tle_client import client_for
 
-# Function to fetch TLE data from the API
+# Function to fetch TLE data, served from the shared cache when fresh
 
 
 def fetch_tle_data(norad_id, api_key):
-    url = f"https://api.n2yo.com/rest/v1/satellite/tle/{norad_id}?apiKey={api_key}"
-    response = requests.get(url)
+    tle_data = client_for(api_key).fetch(norad_id)
+    tle_line1, tle_line2 = tle_data.strip().splitlines()
 
-    if response.status_code == 200:
-        try:
-            tle_data = response.json()['tle']
-            tle_line1, tle_line2 = tle_data.strip().splitlines()
+    return tle_line1.split(), tle_line2.split()
 
-            return tle_line1.split(), tle_line2.split()
-        except KeyError:
-            raise Exception("TLE data not found in the response")
-    else:
-        raise Exception(
-            f"Failed to fetch TLE data. Status Code: {response.status_code}")
+# Function to fetch TLE data from the API, with the pooled client's timeouts and retries
+
+
+def request_tle_data(norad_id, api_key):
+    return client_for(api_key).request_tle(str(norad_id).strip())
 
 # Function to calculate satellite position
 
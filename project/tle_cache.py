@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+# A TLE is usually superseded within a day of its epoch, so an entry stays
+# valid until EPOCH_TTL after the epoch, clamped between MIN_TTL and MAX_TTL
+# after the fetch (stale objects would otherwise be refetched on every call).
+EPOCH_TTL = 12 * 3600
+MIN_TTL = 15 * 60
+MAX_TTL = 6 * 3600
+
+
+def tle_epoch(tle_line1):
+    """
+    Parse the epoch field (columns 19-32, YYDDD.DDDDDDDD) of TLE line 1.
+
+    Returns:
+        Timezone-aware UTC datetime of the element set epoch
+    """
+    field = tle_line1[18:32].strip()
+    year = int(field[:2])
+    year += 2000 if year < 57 else 1900
+    day_of_year = float(field[2:])
+    return datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=day_of_year - 1)
+
+
+def tle_expiry(tle_data, fetched_at):
+    """Unix time at which a TLE fetched at `fetched_at` should be refetched."""
+    try:
+        epoch = tle_epoch(tle_data.strip().splitlines()[0]).timestamp()
+    except (ValueError, IndexError):
+        return fetched_at + MIN_TTL
+    expires_at = min(epoch + EPOCH_TTL, fetched_at + MAX_TTL)
+    return max(expires_at, fetched_at + MIN_TTL)
+
+
+def cache_key(norad_id):
+    """NORAD ID as a cache key; anything but digits is rejected, as keys name files on disk."""
+    key = str(norad_id).strip()
+    if not key.isdigit():
+        raise ValueError(f"Invalid NORAD ID: {key!r}")
+    return key
+
+
+class _Flight:
+    # An upstream fetch in progress that other callers can wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TLECache:
+    """
+    Two-level TLE cache keyed by NORAD ID.
+
+    Entries live in an in-memory LRU and, when `cache_dir` is set, in one
+    JSON file per satellite so they survive restarts. Concurrent misses for
+    the same NORAD ID share a single call to the loader.
+    """
+
+    def __init__(self, max_entries=1024, cache_dir=None, clock=time.time):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, norad_id, loader):
+        """
+        Return the raw TLE text for `norad_id`, calling `loader(norad_id)`
+        only when no fresh copy is cached and no other thread is fetching it.
+        """
+        key = cache_key(norad_id)
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry['tle']
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader(key)
+            self.put(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def put(self, norad_id, tle_data, fetched_at=None):
+        key = cache_key(norad_id)
+        fetched_at = self.clock() if fetched_at is None else fetched_at
+        entry = {
+            'tle': tle_data,
+            'fetched_at': fetched_at,
+            'expires_at': tle_expiry(tle_data, fetched_at),
+        }
+        with self._lock:
+            self._remember(key, entry)
+        if self.cache_dir:
+            self._write_disk(key, entry)
+
+    def peek(self, norad_id):
+        """Cached TLE text for `norad_id` even if it has expired, or None; not counted as a lookup."""
+        key = cache_key(norad_id)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.cache_dir:
+            entry = self._read_disk(key)
+        return entry['tle'] if entry is not None else None
+
+    def invalidate(self, norad_id):
+        key = cache_key(norad_id)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    # Must be called with the lock held
+    def _lookup(self, key):
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry['expires_at'] > now:
+                self._entries.move_to_end(key)
+                return entry
+            del self._entries[key]
+        if self.cache_dir:
+            entry = self._read_disk(key)
+            if entry is not None and entry['expires_at'] > now:
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, entry):
+        # Write to a temporary file first so readers never see a partial entry
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+# Process-wide cache shared by every fetch_tle_data; set TLE_CACHE_DIR to
+# persist entries across restarts
+default_cache = TLECache(
+    max_entries=int(os.environ.get('TLE_CACHE_SIZE', 1024)),
+    cache_dir=os.environ.get('TLE_CACHE_DIR') or None,
+)
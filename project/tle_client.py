@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tle_cache import cache_key, default_cache
+
+N2YO_BASE_URL = "https://api.n2yo.com/rest/v1/satellite"
+
+# Longest Retry-After we wait out before retrying; longer ones fail the fetch
+MAX_RETRY_AFTER = 30  # s
+
+
+class TLEFetchError(Exception):
+    pass
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TLEClient:
+    """
+    HTTP client for the n2yo TLE endpoint.
+
+    One keep-alive `requests.Session` is shared by a bounded thread pool, so
+    fetching N satellites costs about as long as the slowest single fetch.
+    Point `base_url` at a local stub server to run without n2yo.
+    """
+
+    def __init__(self, api_key, base_url=N2YO_BASE_URL, max_workers=16, timeout=(3.05, 10),
+                 retries=3, backoff=0.5, cache=default_cache):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tle-fetch')
+
+    def request_tle(self, norad_id):
+        """
+        Fetch the raw TLE text for one satellite from upstream, retrying
+        connection errors, 429 and 5xx responses with exponential backoff.
+        """
+        url = f"{self.base_url}/tle/{norad_id}"
+        for attempt in range(self.retries + 1):
+            retryable = None
+            delay = self.backoff * 2 ** attempt
+            try:
+                with self._lock:
+                    self.upstream_calls += 1
+                response = self.session.get(url, params={'apiKey': self.api_key}, timeout=self.timeout)
+                if response.status_code == 200:
+                    tle_data = response.json().get('tle')
+                    if not tle_data:
+                        raise TLEFetchError("TLE data not found in the response")
+                    return tle_data
+                if response.status_code != 429 and response.status_code < 500:
+                    raise TLEFetchError(f"Failed to fetch TLE data. Status Code: {response.status_code}")
+                retryable = TLEFetchError(f"Failed to fetch TLE data. Status Code: {response.status_code}")
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    if retry_after > MAX_RETRY_AFTER:
+                        raise retryable
+                    delay = max(delay, retry_after)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retryable = TLEFetchError(f"Failed to fetch TLE data: {e}")
+
+            if attempt < self.retries:
+                time.sleep(delay)
+        raise retryable
+
+    def fetch(self, norad_id, cached=True):
+        """Return the raw TLE text for one satellite, through the cache unless `cached` is False."""
+        # Validated on every path, as the ID is interpolated into the upstream URL
+        key = cache_key(norad_id)
+        if self.cache is None or not cached:
+            return self.request_tle(key)
+        return self.cache.get(key, self.request_tle)
+
+    def fetch_many(self, norad_ids, cached=True):
+        """
+        Fetch several satellites concurrently.
+
+        Returns:
+            (tles, errors) dicts keyed by NORAD ID string
+        """
+        futures = {str(norad_id).strip(): self._executor.submit(self.fetch, norad_id, cached)
+                   for norad_id in norad_ids}
+        tles = {}
+        errors = {}
+        for norad_id, future in futures.items():
+            try:
+                tles[norad_id] = future.result()
+            except Exception as e:
+                errors[norad_id] = str(e)
+        return tles, errors
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+# Shared client for the API; N2YO_BASE_URL lets tests substitute a stub server
+default_client = TLEClient(
+    api_key=os.environ.get('N2YO_API_KEY', 'AVZC8R-BJMGXU-RVBHGP-5C1S'),
+    base_url=os.environ.get('N2YO_BASE_URL', N2YO_BASE_URL),
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_for(api_key):
+    """Pooled client for `api_key`: the shared default_client when it is that key's."""
+    if api_key is None or api_key == default_client.api_key:
+        return default_client
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = TLEClient(api_key, base_url=default_client.base_url)
+        return _clients[api_key]
@@ -0,0 +1,263 @@
+import math
+import queue
+import threading
+import time
+
+from catalog import valid_tle
+from ephemeris import default_ephemerides
+from satellite_registry import default_registry, tle_checksum
+from tle_cache import default_cache, tle_epoch
+from tle_client import default_client
+
+# n2yo allows 1000 TLE requests an hour; leave some for cache misses on the request path
+DEFAULT_INTERVAL = 3600  # s
+DEFAULT_BUDGET = 900  # upstream requests per interval, across all processes of the service
+
+# Changed satellites are re-screened in groups of at most this many, or when the queue drains
+FLUSH_SIZE = 256
+
+
+class TLERefresher:
+    """
+    Keeps tracked TLEs current in the background.
+
+    A scheduler thread queues every tracked NORAD ID once per `interval`,
+    least recently checked first, into a bounded queue; IDs that do not fit
+    wait for the next cycle. A worker fetches them from upstream, spending
+    at most `budget` requests per `interval` (a token bucket, so up to
+    `budget` at once), and diffs each element set by checksum and epoch
+    against the stored one:
+
+    - unchanged: the cache entry is renewed, nothing else is touched
+    - older than stored: ignored
+    - changed: written to the cache and catalog and re-parsed; its cached
+      ephemeris is rebuilt and its conjunctions re-screened
+
+    Requests then find current TLEs in the cache or catalog and never wait
+    on upstream for tracked satellites.
+    """
+
+    def __init__(self, client=default_client, catalog=None, cache=default_cache, registry=default_registry,
+                 ephemerides=default_ephemerides, screening=None, interval=DEFAULT_INTERVAL,
+                 budget=DEFAULT_BUDGET, queue_size=1000, batch_size=16, clock=time.monotonic):
+        self.client = client
+        self.catalog = catalog
+        self.cache = cache
+        self.registry = registry
+        self.ephemerides = ephemerides
+        # A ConjunctionScreening, or None; may be set once one has been built
+        self.screening = screening
+        self.interval = interval
+        self.budget = budget
+        self.batch_size = batch_size
+        self.clock = clock
+
+        self.counts = {result: 0 for result in
+                       ('changed', 'new', 'unchanged', 'stale', 'invalid', 'failed', 'dropped')}
+        self.cycles = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._queued = set()
+        self._tracked = set()
+        self._stored = {}  # NORAD ID -> (epoch, checksum) of the element set in use
+        self._checked = {}  # NORAD ID -> clock time of the last upstream check
+        self._pending = {}  # NORAD ID -> changed SatelliteRecord awaiting re-screening
+        self._tokens = float(budget)
+        self._refilled = clock()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def track(self, norad_ids):
+        """Add satellites to the refresh rotation."""
+        with self._lock:
+            self._tracked.update(str(norad_id).strip() for norad_id in norad_ids)
+
+    def tracks(self, norad_id):
+        with self._lock:
+            return str(norad_id).strip() in self._tracked
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._schedule, name='tle-refresh-scheduler', daemon=True),
+            threading.Thread(target=self._work, name='tle-refresh-worker', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_cycle(self):
+        """Queue every tracked satellite, least recently checked first."""
+        with self._lock:
+            norad_ids = sorted(self._tracked, key=lambda key: self._checked.get(key, -math.inf))
+            self.cycles += 1
+        return self.enqueue(norad_ids)
+
+    def enqueue(self, norad_ids):
+        """
+        Queue satellites for a refresh, skipping those already queued. When
+        the queue is full the rest are dropped until the next cycle.
+
+        Returns:
+            Number of satellites queued
+        """
+        queued = 0
+        norad_ids = [str(norad_id).strip() for norad_id in norad_ids]
+        for position, key in enumerate(norad_ids):
+            with self._lock:
+                if key in self._queued:
+                    continue
+                try:
+                    self._queue.put_nowait(key)
+                except queue.Full:
+                    self.counts['dropped'] += len(norad_ids) - position
+                    break
+                self._queued.add(key)
+            queued += 1
+        return queued
+
+    def apply(self, norad_id, tle_data):
+        """
+        Diff a freshly fetched element set against the stored one and
+        propagate it if it changed.
+
+        Returns:
+            'changed', 'new', 'unchanged', 'stale' or 'invalid'
+        """
+        key = str(norad_id).strip()
+        lines = tle_data.strip().splitlines()
+        if len(lines) != 2 or not valid_tle(lines[0].strip(), lines[1].strip()):
+            return 'invalid'
+        tle_line1, tle_line2 = lines[0].strip(), lines[1].strip()
+        epoch, checksum = tle_epoch(tle_line1), tle_checksum(tle_line1, tle_line2)
+
+        stored = self._stored_version(key)
+        if stored is not None and stored[1] == checksum:
+            self.cache.put(key, tle_data)
+            return 'unchanged'
+        if stored is not None and epoch < stored[0]:
+            return 'stale'
+
+        with self._lock:
+            self._stored[key] = (epoch, checksum)
+        self.cache.put(key, tle_data)
+        if self.catalog is not None and key in self.catalog:
+            self.catalog.update(key, tle_data)
+        satellite = self.registry.get(key, tle_line1, tle_line2)
+        self.ephemerides.refresh(satellite)
+        with self._lock:
+            self._pending[key] = satellite
+        return 'changed' if stored is not None else 'new'
+
+    def flush(self):
+        """Re-screen the conjunctions of satellites that changed since the last flush."""
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        screening = self.screening
+        if screening is None:
+            return 0
+        changed = [satellite for satellite in pending if satellite.norad_id in screening]
+        return screening.update(changed) if changed else 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts, cycles=self.cycles, tracked=len(self._tracked),
+                         queued=self._queue.qsize(), pending=len(self._pending), lastError=self.last_error)
+            self._refill()
+            stats['budgetRemaining'] = int(self._tokens)
+        return stats
+
+    def _stored_version(self, key):
+        with self._lock:
+            stored = self._stored.get(key)
+        if stored is not None:
+            return stored
+        tle_data = self.catalog.tle(key) if self.catalog is not None else None
+        if tle_data is None:
+            tle_data = self.cache.peek(key)
+        if tle_data is None:
+            return None
+        try:
+            tle_line1, tle_line2 = (line.strip() for line in tle_data.strip().splitlines())
+            stored = (tle_epoch(tle_line1), tle_checksum(tle_line1, tle_line2))
+        except ValueError:
+            return None
+        with self._lock:
+            self._stored.setdefault(key, stored)
+        return stored
+
+    # Must be called with the lock held
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.budget, self._tokens + (now - self._refilled) * self.budget / self.interval)
+        self._refilled = now
+
+    def _acquire(self, wait=True):
+        # Take one upstream request from the budget, waiting for it to refill if `wait`
+        while not self._stop.is_set():
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) * self.interval / self.budget
+            if not wait:
+                return False
+            self._stop.wait(delay)
+        return False
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+        if not self._acquire():
+            return []
+        while len(batch) < self.batch_size and self._acquire(wait=False):
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                with self._lock:
+                    self._tokens += 1
+                break
+        return batch
+
+    def _schedule(self):
+        while not self._stop.is_set():
+            self.run_cycle()
+            self._stop.wait(self.interval)
+
+    def _work(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                tles, errors = self.client.fetch_many(batch, cached=False)
+                now = self.clock()
+                with self._lock:
+                    self._queued.difference_update(batch)
+                    self._checked.update((key, now) for key in batch)
+                    self.counts['failed'] += len(errors)
+                for key, tle_data in tles.items():
+                    try:
+                        result = self.apply(key, tle_data)
+                    except Exception as e:
+                        result, self.last_error = 'invalid', f"{key}: {e}"
+                    with self._lock:
+                        self.counts[result] += 1
+
+            # Re-screening costs about the same for one satellite as for
+            # hundreds, so changes are collected until the queue drains or
+            # the budget runs out
+            with self._lock:
+                self._refill()
+                pending, waiting = len(self._pending), self._tokens < 1
+            if pending and (pending >= FLUSH_SIZE or waiting or self._queue.empty()):
+                try:
+                    self.flush()
+                except Exception as e:
+                    self.last_error = f"Re-screening failed: {e}"
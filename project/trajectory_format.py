@@ -0,0 +1,163 @@
+import calendar
+import gzip
+import json
+import struct
+
+import numpy as np
+
+# Content type of the binary trajectory format, negotiated through Accept
+MIMETYPE = 'application/x-trajectory'
+
+MAGIC = b'TRAJ'
+VERSION = 1
+
+# Sample encodings
+FLOAT32 = 0  # Positions as packed float32 km, viewable in place
+DELTA = 1  # Second differences of positions quantised to `quantum` km, see _delta_encode
+ENCODINGS = {'float32': FLOAT32, 'delta': DELTA}
+
+# Default quantum of the delta encoding: 1 m
+DEFAULT_QUANTUM = 0.001
+
+# Little-endian header: magic, version, encoding, reserved, satellite count,
+# sample count, metadata length, quantum (km), start (Unix seconds) and step (s)
+HEADER = struct.Struct('<4sBBHIIIddd')
+
+# Compressing small payloads costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+
+
+def _delta_encode(positions, quantum):
+    """
+    Encode (n_sats, n_times, 3) positions as second differences in time.
+
+    Positions are quantised to integers first, so decoding is exact and
+    rounding never accumulates. Along a smooth orbit the second difference
+    is small, so most of the high bytes are 0 or 0xff. The int32 values are
+    stored axis-major per satellite and split into four byte planes (all
+    low bytes, then the next byte, ...), which gzip and brotli compress far
+    better than float32. A bitmap of valid samples follows. Failed (NaN)
+    samples hold the last valid position, so they cost no large deltas.
+    """
+    valid = np.isfinite(positions).all(axis=2)
+    quantised = np.zeros(positions.shape, dtype=np.int64)
+    quantised[valid] = np.rint(positions[valid] / quantum)
+    # Second differences are at most four times the largest value
+    if np.abs(quantised).max(initial=0) >= 2**29:
+        raise ValueError(f"Positions do not fit the delta encoding at a quantum of {quantum} km")
+    if not valid.all():
+        times = np.arange(positions.shape[1])
+        last = np.maximum.accumulate(np.where(valid, times, -1), axis=1)
+        quantised = np.take_along_axis(quantised, np.maximum(last, 0)[:, :, np.newaxis], axis=1)
+        quantised[last < 0] = 0
+
+    # Two leading zeros, so the first samples are differenced against the origin
+    axes = np.zeros((positions.shape[0], 3, positions.shape[1] + 2), dtype=np.int64)
+    axes[:, :, 2:] = quantised.transpose(0, 2, 1)
+    deltas = np.diff(axes, n=2, axis=2).astype('<i4')
+    planes = deltas.view(np.uint8).reshape(-1, 4).T
+    return planes.tobytes() + np.packbits(valid).tobytes()
+
+
+def _delta_decode(data, offset, shape, quantum):
+    count = np.prod(shape)
+    planes = np.frombuffer(data, np.uint8, 4 * count, offset).reshape(4, count)
+    deltas = np.ascontiguousarray(planes.T).view('<i4').reshape(shape[0], 3, shape[1])
+    quantised = deltas.astype(np.int64).cumsum(axis=2).cumsum(axis=2)
+    positions = (quantised.transpose(0, 2, 1) * quantum).astype(np.float32)
+    valid = np.unpackbits(np.frombuffer(data, np.uint8, -(-shape[0] * shape[1] // 8), offset + 4 * count),
+                          count=shape[0] * shape[1]).reshape(shape[:2])
+    positions[valid == 0] = np.nan
+    return positions
+
+
+def encode_trajectory(positions, start, step, norad_ids, metadata=None, encoding='float32',
+                      quantum=DEFAULT_QUANTUM):
+    """
+    Pack positions into the binary trajectory format.
+
+    The header is followed by a JSON metadata block (the NORAD IDs plus
+    `metadata`), padded so the samples start 4-byte aligned. float32
+    samples are satellite-major, each satellite's (n_times, 3) positions
+    contiguous, so they can be viewed in place as a Float32Array and handed
+    to a BufferAttribute. delta samples are laid out as in _delta_encode.
+
+    Args:
+        positions: (n_sats, n_times, 3) positions in km, NaN where propagation failed
+        start: datetime of the first sample, in UTC
+        step: seconds between samples
+        norad_ids: NORAD ID of each satellite
+        metadata: JSON-serialisable dict added to the metadata block
+        encoding: 'float32' or 'delta'
+        quantum: resolution of the delta encoding in km
+
+    Returns:
+        bytes
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown trajectory encoding {encoding!r}, expected one of {', '.join(ENCODINGS)}")
+    positions = np.asarray(positions, dtype=np.float64)
+
+    meta = json.dumps(dict(metadata or {}, noradIds=list(norad_ids))).encode('utf-8')
+    meta += b' ' * (-(HEADER.size + len(meta)) % 4)
+
+    if ENCODINGS[encoding] == DELTA:
+        samples = _delta_encode(positions, quantum)
+    else:
+        samples = positions.astype('<f4').tobytes()
+        quantum = 0.0
+
+    # Naive datetimes are taken as UTC, like datetime.utcnow() in the API
+    timestamp = calendar.timegm(start.utctimetuple()) + start.microsecond / 1e6
+    header = HEADER.pack(MAGIC, VERSION, ENCODINGS[encoding], 0, positions.shape[0], positions.shape[1],
+                         len(meta), quantum, timestamp, step)
+    return header + meta + samples
+
+
+def decode_trajectory(data):
+    """
+    Unpack the binary trajectory format.
+
+    Returns:
+        Dict with the metadata block's keys plus 'start' (Unix seconds),
+        'step' and 'positions' as an (n_sats, n_times, 3) float32 array
+    """
+    magic, version, encoding, _, sat_count, sample_count, meta_length, quantum, start, step = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version 1 trajectory payload")
+    trajectory = json.loads(bytes(data[HEADER.size:HEADER.size + meta_length]))
+
+    shape = (sat_count, sample_count, 3)
+    offset = HEADER.size + meta_length
+    if encoding == DELTA:
+        positions = _delta_decode(data, offset, shape, quantum)
+    else:
+        positions = np.frombuffer(data, '<f4', np.prod(shape), offset).reshape(shape)
+    trajectory.update(start=start, step=step, positions=positions)
+    return trajectory
+
+
+def compress(payload, accept_encodings):
+    """
+    Compress `payload` with the best coding the client accepts: brotli when
+    the optional brotli package is installed, then gzip.
+
+    Args:
+        accept_encodings: the request's parsed Accept-Encoding header
+
+    Returns:
+        (body, content coding or None)
+    """
+    if len(payload) < MIN_COMPRESS_SIZE:
+        return payload, None
+    if accept_encodings['br']:
+        try:
+            import brotli
+        except ImportError:
+            pass
+        else:
+            return brotli.compress(payload, quality=5), 'br'
+    if accept_encodings['gzip']:
+        return gzip.compress(payload, compresslevel=5, mtime=0), 'gzip'
+    return payload, None
@@ -2,6 +2,103 @@
 import React, { useRef, useEffect } from 'react';
 import * as THREE from 'three';
 
+// Binary trajectory format, served by /api/positions and /api/positions/batch
+// when requested with this Accept header (see project/trajectory_format.py)
+export const TRAJECTORY_MIMETYPE = 'application/x-trajectory';
+
+const HEADER_SIZE = 44;
+const FLOAT32 = 0;
+const DELTA = 1;
+
+// Rebuild positions from second differences stored as four byte planes,
+// followed by a bitmap of valid samples
+const decodeDelta = (buffer, offset, satCount, sampleCount, quantum) => {
+  const count = satCount * sampleCount * 3;
+  const bytes = new Uint8Array(buffer, offset, 4 * count);
+  const valid = new Uint8Array(buffer, offset + 4 * count, Math.ceil((satCount * sampleCount) / 8));
+  const positions = new Float32Array(count);
+
+  for (let sat = 0; sat < satCount; sat++) {
+    for (let axis = 0; axis < 3; axis++) {
+      const first = (sat * 3 + axis) * sampleCount;
+      let difference = 0;
+      let value = 0;
+      for (let t = 0; t < sampleCount; t++) {
+        const k = first + t;
+        // `|` yields a signed 32-bit integer, as stored
+        difference += bytes[k] | (bytes[count + k] << 8) | (bytes[2 * count + k] << 16) | (bytes[3 * count + k] << 24);
+        value += difference;
+        positions[(sat * sampleCount + t) * 3 + axis] = value * quantum;
+      }
+    }
+  }
+
+  for (let i = 0; i < satCount * sampleCount; i++) {
+    if (!(valid[i >> 3] & (0x80 >> (i & 7)))) {
+      positions.fill(NaN, i * 3, i * 3 + 3);
+    }
+  }
+  return positions;
+};
+
+// Decode a binary trajectory response body into its metadata and one
+// Float32Array of [x, y, z] positions in km, satellite after satellite.
+// float32 payloads are viewed in place, without copying.
+export const decodeTrajectory = (buffer) => {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'TRAJ' || view.getUint8(4) !== 1) {
+    throw new Error('Not a version 1 trajectory payload');
+  }
+  const encoding = view.getUint8(5);
+  const satCount = view.getUint32(8, true);
+  const sampleCount = view.getUint32(12, true);
+  const metadataLength = view.getUint32(16, true);
+  const quantum = view.getFloat64(20, true);
+  const start = view.getFloat64(28, true);
+  const step = view.getFloat64(36, true);
+
+  const metadata = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, HEADER_SIZE, metadataLength)));
+  const offset = HEADER_SIZE + metadataLength;
+  let positions;
+  if (encoding === FLOAT32) {
+    positions = new Float32Array(buffer, offset, satCount * sampleCount * 3);
+  } else if (encoding === DELTA) {
+    positions = decodeDelta(buffer, offset, satCount, sampleCount, quantum);
+  } else {
+    throw new Error(`Unknown trajectory encoding ${encoding}`);
+  }
+
+  return {
+    ...metadata,
+    start: new Date(start * 1000),
+    step,
+    sampleCount,
+    positions,
+    // Positions of the satellite at `index` in noradIds, as a view
+    satellite: (index) => positions.subarray(index * sampleCount * 3, (index + 1) * sampleCount * 3),
+  };
+};
+
+// A BufferAttribute over one satellite's positions, e.g. for a THREE.Line
+export const trajectoryAttribute = (trajectory, index) =>
+  new THREE.BufferAttribute(trajectory.satellite(index), 3);
+
+// POST to a positions endpoint asking for the binary format; the browser
+// undoes any gzip or brotli Content-Encoding before we see the bytes
+export const fetchTrajectory = async (url, body, encoding = 'float32') => {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: TRAJECTORY_MIMETYPE },
+    body: JSON.stringify({ ...body, encoding }),
+  });
+  if (!response.ok) {
+    const data = await response.json();
+    throw new Error(data.error);
+  }
+  return decodeTrajectory(await response.arrayBuffer());
+};
+
 const Coordinate3D = ({ positions }) => {
   const mountRef = useRef(null);
 